@@ -1,16 +1,26 @@
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
+import numpy as np
 import pytest
 
 from timescale_vector.client import (
+    SEARCH_RESULT_COLUMNS,
+    SEARCH_RESULT_CONTENTS_IDX,
+    SEARCH_RESULT_DISTANCE_IDX,
+    SEARCH_RESULT_EMBEDDING_IDX,
     SEARCH_RESULT_METADATA_IDX,
     Async,
     DiskAnnIndex,
     DiskAnnIndexParams,
     HNSWIndex,
+    HNSWIndexParams,
     IvfflatIndex,
     Predicates,
+    QueryParams,
+    SearchCache,
+    SearchResultBatch,
+    UpsertResult,
     UUIDTimeRange,
     uuid_from_time,
 )
@@ -396,3 +406,922 @@ async def test_vector(service_url: str, schema: str) -> None:
     assert len(rec) == 2
     await vec.drop_table()
     await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2)
+    await vec.drop_table()
+    await vec.create_tables()
+
+    result = await vec.bulk_upsert([])
+    assert result == UpsertResult()
+
+    ids = [uuid.uuid4() for _ in range(100)]
+    result = await vec.bulk_upsert(
+        [(id, {"key": "val", "n": i}, "the brown\tfox\n", [1.0, float(i)]) for i, id in enumerate(ids)]
+    )
+    assert result == UpsertResult(inserted=100, skipped=0)
+    rec = await vec.search([1.0, 2.0], limit=1)
+    assert rec[0]["metadata"] == {"key": "val", "n": 2}
+    assert rec[0]["contents"] == "the brown\tfox\n"
+
+    # existing ids are skipped, like upsert
+    result = await vec.bulk_upsert(
+        [
+            (ids[0], """{"key":"changed"}""", "the brown fox", [1.0, 1.0]),
+            (uuid.uuid4(), """{"key":"val"}""", "the brown fox", [1.0, 1.0]),
+        ]
+    )
+    assert result == UpsertResult(inserted=1, skipped=1)
+    rec = await vec.search(limit=10, filter={"key": "changed"})
+    assert len(rec) == 0
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_upsert_stream(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2)
+    await vec.drop_table()
+    await vec.create_tables()
+
+    def records():
+        for i in range(250):
+            yield (uuid.uuid4(), {"n": i}, "the brown fox", [1.0, float(i)])
+
+    progress = []
+    result = await vec.upsert_stream(records(), batch_size=40, max_in_flight=2, on_progress=progress.append)
+    assert result == UpsertResult(inserted=250, skipped=0)
+    assert len(progress) == 7
+    assert [p.total for p in progress] == sorted(p.total for p in progress)
+    assert progress[-1] == result
+
+    async def async_records():
+        for i in range(30):
+            yield (uuid.uuid4(), {"n": i}, "the brown fox", [1.0, float(i)])
+
+    result = await vec.upsert_stream(async_records(), batch_size=7)
+    assert result == UpsertResult(inserted=30, skipped=0)
+    assert await vec._get_approx_count() == 280
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("id_type", ["UUID", "TEXT"])
+async def test_upsert_columns(service_url: str, id_type: str) -> None:
+    vec = Async(service_url, "data_table", 3, id_type=id_type)
+    await vec.drop_table()
+    await vec.create_tables()
+
+    embeddings = np.random.default_rng(0).random((50, 3), dtype=np.float32)
+    ids = [str(uuid.uuid4()) for _ in range(50)]
+    metadata = [{"n": i} for i in range(49)] + [None]
+    contents = [f"the brown fox {i}" for i in range(49)] + [None]
+    result = await vec.upsert_columns(ids, metadata, contents, embeddings)
+    assert result == UpsertResult(inserted=50, skipped=0)
+
+    rec = await vec.search(embeddings[7], limit=1)
+    assert str(rec[0]["id"]) == ids[7]
+    assert rec[0]["metadata"] == {"n": 7}
+    assert rec[0]["contents"] == "the brown fox 7"
+    assert np.allclose(np.array(rec[0]["embedding"]), embeddings[7])
+
+    result = await vec.upsert_columns(ids[:2], ["{}", "{}"], ["a", "b"], embeddings[:2].astype(np.float64))
+    assert result == UpsertResult(inserted=0, skipped=2)
+    assert await vec.upsert_columns([], [], [], np.empty((0, 3))) == UpsertResult()
+    # uuid.UUID ids are accepted for either id type
+    uuid_ids = [uuid.uuid4() for _ in range(2)]
+    result = await vec.upsert_columns(uuid_ids, [{}, {}], ["c", "d"], embeddings[:2])
+    assert result == UpsertResult(inserted=2, skipped=0)
+    assert len(await vec.search(limit=100)) == 52
+    await vec.delete_by_ids([str(id) for id in uuid_ids])
+
+    with pytest.raises(ValueError):
+        await vec.upsert_columns(ids[:2], metadata[:2], contents[:2], np.zeros((2, 4)))
+    with pytest.raises(ValueError):
+        await vec.upsert_columns(ids[:2], metadata[:1], contents[:2], embeddings[:2])
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_vector_codec(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 3)
+    await vec.drop_table()
+    await vec.create_tables()
+    await vec.upsert(
+        [
+            (uuid.uuid4(), {}, "list", [1.0, 2.0, 3.0]),
+            (uuid.uuid4(), {}, "float32", np.array([1.5, 2.5, 3.5], dtype=np.float32)),
+            (uuid.uuid4(), {}, "float64", np.array([0.25, 0.5, 0.75])),
+        ]
+    )
+    rec = await vec.search(np.array([1.5, 2.5, 3.5], dtype=np.float32), limit=3)
+    assert rec[0]["contents"] == "float32"
+    embedding = rec[0]["embedding"]
+    assert isinstance(embedding, np.ndarray)
+    assert embedding.dtype.kind == "f" and embedding.dtype.itemsize == 4
+    assert embedding.tolist() == [1.5, 2.5, 3.5]
+    assert {r["contents"]: r["embedding"].tolist() for r in rec}["float64"] == [0.25, 0.5, 0.75]
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "embedding_type, distance_type, embeddings",
+    [
+        ("halfvec", "cosine", [[1.0, 2.0, 3.0], [1.5, 2.5, 3.5], [-1.0, 0.5, 0.0]]),
+        ("sparsevec", "euclidean", [[1.0, 0.0, 3.0], [0.0, 2.5, 0.0], [-4.0, 0.0, 0.0]]),
+        ("bit", "hamming", [[1, 0, 1], [1, 1, 1], [0, 0, 0]]),
+    ],
+)
+async def test_embedding_types(
+    service_url: str, embedding_type: str, distance_type: str, embeddings: list[list[float]]
+) -> None:
+    vec = Async(service_url, "data_table", 3, distance_type, embedding_type=embedding_type)
+    await vec.drop_table()
+    await vec.create_tables()
+    await vec.upsert([(uuid.uuid4(), {"key": "val"}, "upsert", embeddings[0])])
+    await vec.bulk_upsert([(uuid.uuid4(), {"key": "val"}, "bulk", np.array(embeddings[1]))])
+    await vec.upsert_columns([uuid.uuid4()], [{"key": "val"}], ["columns"], np.array([embeddings[2]]))
+
+    rec = await vec.search(embeddings[1], limit=3)
+    assert [r["contents"] for r in rec] == ["bulk", "upsert", "columns"]
+    assert rec[0]["embedding"].tolist() == embeddings[1]
+    assert rec[2]["embedding"].tolist() == embeddings[2]
+    assert rec[0]["distance"] == 0
+
+    if embedding_type == "sparsevec":
+        rec = await vec.search({1: 2.5}, limit=1)
+        assert rec[0]["contents"] == "bulk"
+
+    await vec.drop_table()
+    await vec.close()
+
+    with pytest.raises(ValueError):
+        Async(service_url, "data_table", 3, "cosine", embedding_type="bit")
+    with pytest.raises(ValueError):
+        HNSWIndex().create_index_query("t", "embedding", "idx", "<=>", lambda: 0, embedding_type="bit")
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_update(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2)
+    await vec.drop_table()
+    await vec.create_tables()
+
+    ids = [uuid.uuid4() for _ in range(4)]
+    records = [(id, {"n": i}, "contents", [1.0, float(i)]) for i, id in enumerate(ids)]
+    assert await vec.bulk_upsert(records, on_conflict="update") == UpsertResult(inserted=4)
+
+    # only rows whose metadata, contents or embedding changed are rewritten
+    result = await vec.bulk_upsert(
+        [
+            records[0],
+            (ids[1], {"n": 1, "changed": True}, "contents", [1.0, 1.0]),
+            (ids[2], {"n": 2}, "changed", [1.0, 2.0]),
+            (ids[3], {"n": 3}, "contents", [1.0, 30.0]),
+            (uuid.uuid4(), {"n": 4}, "contents", [1.0, 4.0]),
+        ],
+        on_conflict="update",
+    )
+    assert result == UpsertResult(inserted=1, updated=3, skipped=1)
+    assert result.total == 5
+    rec = await vec.search([1.0, 30.0], limit=1)
+    assert rec[0]["id"] == ids[3]
+    assert len(await vec.search(limit=10, filter={"changed": True})) == 1
+
+    # the first record for a new id is inserted without updates, the last one wins with them
+    new_id = uuid.uuid4()
+    result = await vec.upsert_columns(
+        [new_id, new_id], [{"n": 5, "first": True}, {"n": 5}], ["contents", "contents"], np.array([[1.0, 5.0]] * 2)
+    )
+    assert result == UpsertResult(inserted=1, skipped=1)
+    assert len(await vec.search(limit=10, filter={"first": True})) == 1
+    await vec.delete_by_ids([new_id])
+    result = await vec.upsert_columns(
+        [ids[0], ids[0]], [{"n": 0}, {"n": 0, "last": True}], ["contents", "contents"], np.array([[1.0, 0.0]] * 2)
+    )
+    assert result == UpsertResult(skipped=2)
+    result = await vec.upsert_columns(
+        [ids[0], ids[0]],
+        [{"n": 0}, {"n": 0, "last": True}],
+        ["contents", "contents"],
+        np.array([[1.0, 0.0]] * 2),
+        on_conflict="update",
+    )
+    assert result == UpsertResult(updated=1, skipped=1)
+    assert len(await vec.search(limit=10, filter={"last": True})) == 1
+
+    await vec.upsert([(ids[0], {"n": 0}, "upsert", [1.0, 0.0])], on_conflict="update")
+    assert len(await vec.search(limit=10, filter={"last": True})) == 0
+
+    with pytest.raises(ValueError):
+        await vec.bulk_upsert(records, on_conflict="replace")
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_search_many(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2)
+    await vec.drop_table()
+    await vec.create_tables()
+    await vec.upsert_columns(
+        [uuid.uuid4() for _ in range(20)],
+        [{"parity": i % 2} for i in range(20)],
+        [f"{i}" for i in range(20)],
+        np.array([[1.0, float(i)] for i in range(20)]),
+    )
+
+    queries = np.array([[1.0, 3.0], [1.0, 15.0], [1.0, 7.0]])
+    results = await vec.search_many(queries, limit=3, filter={"parity": 1})
+    assert len(results) == 3
+    for query, result in zip(queries, results, strict=True):
+        expected = await vec.search(query, limit=3, filter={"parity": 1})
+        assert [r["id"] for r in result] == [r["id"] for r in expected]
+        assert [r[SEARCH_RESULT_METADATA_IDX] for r in result] == [r["metadata"] for r in expected]
+    assert [r["query_idx"] for r in results[1]] == [1, 1, 1]
+
+    results = await vec.search_many([[1.0, 3.0]], limit=2, query_params=HNSWIndexParams(10))
+    assert [r["contents"] for r in results[0]] == ["3", "4"]
+    assert await vec.search_many([]) == []
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_statement_cache(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2, max_db_connections=1, statement_cache_size=8)
+    await vec.drop_table()
+    await vec.create_tables()
+    await vec.upsert([(uuid.uuid4(), {"key": "val", "n": i}, "contents", [1.0, float(i)]) for i in range(10)])
+
+    async def prepared_searches() -> int:
+        async with await vec.connect() as conn:
+            query = "SELECT count(*) FROM pg_prepared_statements WHERE strpos(statement, $1) > 0"
+            return await conn.fetchval(query, "as distance")
+
+    # the limit and filter values are parameters, so the same statement is reused
+    assert len(await vec.search([1.0, 2.0], limit=1)) == 1
+    assert len(await vec.search([1.0, 3.0], limit=5)) == 5
+    assert await prepared_searches() == 1
+    assert len(await vec.search([1.0, 2.0], filter={"key": "val"})) == 10
+    assert len(await vec.search([1.0, 2.0], filter={"n": 1})) == 1
+    assert await prepared_searches() == 2
+    assert (vec.statement_cache_stats.hits, vec.statement_cache_stats.misses) == (2, 2)
+    for n in range(8):
+        await vec.search([1.0, 2.0], predicates=Predicates(f"key{n}", "==", "val"))
+    assert vec.statement_cache_stats.evictions == 2
+
+    # statements prepared before the table was recreated are prepared again
+    await vec.drop_table()
+    vec.builder.num_dimensions = 3
+    await vec.create_tables()
+    await vec.upsert([(uuid.uuid4(), {"key": "val"}, "contents", [1.0, 2.0, 3.0])])
+    assert len(await vec.search([1.0, 2.0, 3.0], limit=3)) == 1
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_search_include(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2)
+    await vec.drop_table()
+    await vec.create_tables()
+    ids = [uuid.uuid4() for _ in range(3)]
+    await vec.upsert([(id, {"n": i}, f"{i}", [1.0, float(i)]) for i, id in enumerate(ids)])
+
+    rec = await vec.search([1.0, 1.0], limit=2, include=("id", "metadata", "distance"))
+    assert [r["id"] for r in rec] == [ids[1], ids[2]]
+    assert rec[0][SEARCH_RESULT_METADATA_IDX] == {"n": 1}
+    assert rec[0][SEARCH_RESULT_DISTANCE_IDX] == pytest.approx(0.0, abs=1e-6)
+    assert rec[0][SEARCH_RESULT_CONTENTS_IDX] is None
+    assert rec[0][SEARCH_RESULT_EMBEDDING_IDX] is None
+    assert list(rec[0].keys()) == list(SEARCH_RESULT_COLUMNS)
+
+    rec = await vec.search(limit=1, filter={"n": 2}, include="contents")
+    assert (rec[0]["id"], rec[0]["contents"], rec[0]["distance"]) == (None, "2", None)
+
+    results = await vec.search_many([[1.0, 0.0], [1.0, 2.0]], limit=2, include=["id"])
+    assert [[r["id"] for r in result] for result in results] == [[ids[0], ids[1]], [ids[2], ids[1]]]
+    assert results[0][0]["embedding"] is None
+
+    with pytest.raises(ValueError):
+        await vec.search([1.0, 1.0], include=("id", "vector"))
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_search_as_arrays(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2)
+    await vec.drop_table()
+    await vec.create_tables()
+    ids = [uuid.uuid4() for _ in range(3)]
+    await vec.upsert([(id, {"n": i}, f"{i}", [1.0, float(i)]) for i, id in enumerate(ids)])
+
+    batch = await vec.search([1.0, 1.0], limit=2, as_arrays=True)
+    assert isinstance(batch, SearchResultBatch)
+    assert len(batch) == 2
+    assert batch.ids == [ids[1], ids[2]]
+    assert batch.distances.dtype == np.float32
+    assert batch.distances[0] == pytest.approx(0.0, abs=1e-6)
+    assert batch.embeddings.shape == (2, 2)
+    assert batch.embeddings.flags.c_contiguous and batch.embeddings.dtype.isnative
+    assert batch.embeddings.tolist() == [[1.0, 1.0], [1.0, 2.0]]
+    assert batch.contents == ["1", "2"]
+    assert batch.metadata == [{"n": 1}, {"n": 2}]
+
+    batch = await vec.search([1.0, 1.0], limit=2, as_arrays=True, include=("id", "distance"))
+    assert batch.embeddings is None
+    assert batch.metadata == [None, None]
+
+    batches = await vec.search_many([[1.0, 0.0], [1.0, 2.0]], limit=2, as_arrays=True)
+    assert [batch.ids for batch in batches] == [[ids[0], ids[1]], [ids[2], ids[1]]]
+    assert batches[1].metadata == [{"n": 2}, {"n": 1}]
+
+    batch = await vec.search([1.0, 1.0], limit=2, as_arrays=True, include=("id", "embedding"))
+    assert batch.distances is None
+    assert batch.embeddings.shape == (2, 2)
+
+    batch = await vec.search([1.0, 1.0], filter={"n": 5}, as_arrays=True)
+    assert len(batch) == 0
+    assert batch.distances.shape == (0,)
+    assert batch.embeddings.shape == (0, 2) and batch.embeddings.dtype == np.float32
+
+    batches = await vec.search_many([[1.0, 0.0]], filter={"n": 5}, as_arrays=True, include="id")
+    assert len(batches[0]) == 0
+    assert batches[0].distances is None and batches[0].embeddings is None
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_iter_search(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2)
+    await vec.drop_table()
+    await vec.create_tables()
+    await vec.upsert_columns(
+        [uuid.uuid4() for _ in range(50)],
+        [{"parity": i % 2} for i in range(50)],
+        [f"{i}" for i in range(50)],
+        np.array([[1.0, float(i)] for i in range(50)]),
+    )
+
+    # a filter-only scan without a limit returns all matching records
+    records = [r async for r in vec.iter_search(filter={"parity": 0}, fetch_size=7)]
+    assert len(records) == 25
+    assert all(r["metadata"]["parity"] == 0 for r in records)
+
+    expected = await vec.search([1.0, 10.0], limit=20)
+    records = [r async for r in vec.iter_search([1.0, 10.0], limit=20, fetch_size=3, include=("id", "distance"))]
+    assert [r["id"] for r in records] == [r["id"] for r in expected]
+    assert records[0]["embedding"] is None
+
+    # stopping early releases the connection
+    async for record in vec.iter_search([1.0, 10.0], fetch_size=5, query_params=HNSWIndexParams(100)):
+        assert record["contents"] == "10"
+        break
+    assert not await vec.table_is_empty()
+
+    # an exact stream is not cut off at the candidate window of the index
+    await vec.create_embedding_index(HNSWIndex())
+    query_params = QueryParams({"hnsw.ef_search": 10, "enable_seqscan": "off"})
+    records = [r async for r in vec.iter_search([1.0, 10.0], query_params=query_params, max_distance=1.0, exact=True)]
+    assert len(records) == 50
+    distances = [r["distance"] for r in records]
+    assert distances == sorted(distances)
+    assert "+ 0" in vec.builder.search_query([1.0, 10.0], None, exact=True)[0]
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_search_cache(service_url: str) -> None:
+    cache = SearchCache(max_size=2, ttl=60)
+    vec = Async(service_url, "data_table", 2, search_cache=cache)
+    await vec.drop_table()
+    await vec.create_tables()
+    ids = [uuid.uuid4() for _ in range(3)]
+    await vec.upsert([(id, {"n": i, "key": "val"}, f"{i}", [1.0, float(i)]) for i, id in enumerate(ids)])
+
+    rec = await vec.search([1.0, 1.0], limit=2, filter={"n": 1, "key": "val"})
+    assert await vec.search(np.array([1.0, 1.0]), limit=2, filter={"key": "val", "n": 1}) is rec
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+    assert len(await vec.search([1.0, 1.0], limit=1)) == 1
+    assert len(await vec.search([1.0, 1.0], limit=1, predicates=Predicates("n", ">", 0))) == 1
+    assert cache.stats.evictions == 1
+
+    # writes through the client clear the cache
+    await vec.delete_by_ids([ids[2]])
+    assert len(cache) == 0
+    assert len(await vec.search([1.0, 1.0], limit=3)) == 2
+    await vec.upsert([(ids[2], {"n": 2}, "2", [1.0, 2.0])])
+    assert len(await vec.search([1.0, 1.0], limit=3)) == 3
+
+    expired = SearchCache(ttl=0)
+    vec.search_cache = expired
+    await vec.search([1.0, 1.0], limit=3)
+    await vec.search([1.0, 1.0], limit=3)
+    assert (expired.stats.hits, expired.stats.misses) == (0, 2)
+
+    with pytest.raises(ValueError):
+        SearchCache(max_size=0)
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2, text_search_config="english")
+    await vec.drop_table()
+    await vec.create_tables()
+    ids = [uuid.uuid4() for _ in range(4)]
+    await vec.upsert(
+        [
+            (ids[0], {"kind": "a"}, "the quick brown fox", [1.0, 0.0]),
+            (ids[1], {"kind": "a"}, "a lazy dog", [1.0, 1.0]),
+            (ids[2], {"kind": "b"}, "quick, quick dog", [0.0, 1.0]),
+            (ids[3], {"kind": "b"}, "something else", [1.0, 0.1]),
+        ]
+    )
+
+    rec = await vec.hybrid_search("quick", [1.0, 0.0], limit=3, num_candidates=2)
+    assert [r["id"] for r in rec] == [ids[0], ids[2], ids[3]]
+    assert rec[0]["score"] == pytest.approx(1 / 61 + 1 / 62)
+    assert rec[0]["contents"] == "the quick brown fox"
+    assert rec[1]["distance"] is None
+    assert rec[2]["distance"] is not None
+
+    rec = await vec.hybrid_search("quick", [1.0, 0.0], num_candidates=2, fusion="weighted", vector_weight=0.0)
+    assert [r["id"] for r in rec[:2]] == [ids[2], ids[0]]
+    assert rec[0]["score"] == pytest.approx(1.0)
+
+    rec = await vec.hybrid_search(
+        "dog", [1.0, 0.0], filter={"kind": "a"}, include="id", query_params=HNSWIndexParams(10)
+    )
+    assert [r["id"] for r in rec] == [ids[1], ids[0]]
+    assert rec[0]["metadata"] is None
+
+    with pytest.raises(ValueError):
+        await vec.hybrid_search("quick", [1.0, 0.0], fusion="max")
+    with pytest.raises(ValueError):
+        await Async(service_url, "data_table", 2).hybrid_search("quick", [1.0, 0.0])
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_search_rerank(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2, distance_type="euclidean")
+    await vec.drop_table()
+    await vec.create_tables()
+    rng = np.random.default_rng(0)
+    embeddings = rng.random((200, 2), dtype=np.float32)
+    ids = [uuid.uuid4() for _ in range(len(embeddings))]
+    await vec.upsert_columns(ids, [{"n": i} for i in range(len(ids))], ["c"] * len(ids), embeddings)
+    await vec.create_embedding_index(HNSWIndex(m=4, ef_construction=8))
+
+    query = np.array([0.5, 0.5], dtype=np.float32)
+    exact = [ids[i] for i in np.argsort(np.linalg.norm(embeddings - query, axis=1))[:5]]
+    rec = await vec.search(query, limit=5, rerank_factor=4, query_params=HNSWIndexParams(40))
+    assert [r["id"] for r in rec] == exact
+    assert [r["distance"] for r in rec] == sorted(r["distance"] for r in rec)
+
+    rec = await vec.search(query, limit=5, rerank_factor=4, include="id")
+    assert len(rec) == 5
+    assert rec[0]["distance"] is None
+
+    # without a query embedding there is nothing to rerank
+    assert len(await vec.search(limit=5, rerank_factor=4)) == 5
+    with pytest.raises(ValueError):
+        await vec.search(query, rerank_factor=0)
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_search_expansions(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2, distance_type="euclidean")
+    await vec.drop_table()
+    await vec.create_tables()
+    rng = np.random.default_rng(0)
+    embeddings = rng.random((500, 2), dtype=np.float32)
+    ids = [uuid.uuid4() for _ in range(len(embeddings))]
+    # only the records farthest from the query are in the rare tenant
+    rare = set(np.argsort(np.linalg.norm(embeddings, axis=1))[-5:].tolist())
+    metadata = [{"tenant": "rare" if i in rare else "common", "n": i} for i in range(len(ids))]
+    await vec.upsert_columns(ids, metadata, ["c"] * len(ids), embeddings)
+    await vec.create_embedding_index(HNSWIndex(m=4, ef_construction=16))
+
+    # forces the index scan, which the planner avoids for a table this small
+    query_params = QueryParams({"enable_seqscan": "off", "enable_bitmapscan": "off", "hnsw.ef_search": 10})
+    rec = await vec.search([0.0, 0.0], limit=5, filter={"tenant": "rare"}, query_params=query_params)
+    assert len(rec) < 5
+    rec = await vec.search([0.0, 0.0], limit=5, filter={"tenant": "rare"}, query_params=query_params, max_expansions=3)
+    assert {r["id"] for r in rec} == {ids[i] for i in rare}
+    # a filter matching fewer records than the limit is retried until a retry finds no more of them
+    nearest = np.argsort(np.linalg.norm(embeddings, axis=1))[:2].tolist()
+    searches = vec.statement_cache_stats.hits + vec.statement_cache_stats.misses
+    rec = await vec.search(
+        [0.0, 0.0], limit=5, filter=[{"n": i} for i in nearest], query_params=query_params, max_expansions=3
+    )
+    assert len(rec) == 2
+    assert vec.statement_cache_stats.hits + vec.statement_cache_stats.misses - searches == 2
+
+    # only the window of the index the table has is expanded
+    assert await vec._get_embedding_index_type() == "hnsw"
+    assert HNSWIndexParams(400).expanded(4, "hnsw").params == {"hnsw.ef_search": 1000}
+    assert HNSWIndexParams(1000).expanded(4, "hnsw") is None
+    assert QueryParams({}).expanded(4, "ivfflat").params == {"ivfflat.probes": 4}
+    assert QueryParams({}).expanded(4, "") is None
+    await vec.drop_embedding_index()
+    assert await vec._get_embedding_index_type() == ""
+    assert HNSWIndexParams(40, iterative_scan="strict_order").get_statements() == [
+        "SET LOCAL hnsw.ef_search = 40",
+        "SET LOCAL hnsw.iterative_scan = strict_order",
+    ]
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_search_after(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2, distance_type="euclidean")
+    await vec.drop_table()
+    await vec.create_tables()
+    ids = [uuid.uuid4() for _ in range(10)]
+    # records 4 to 7 are at the same distance
+    embeddings = [[0.0, 0.0], [0.0, 1.0], [0.0, 2.0], [0.0, 3.0], [0.0, 4.0], [0.0, -4.0], [4.0, 0.0], [-4.0, 0.0]]
+    embeddings += [[0.0, 8.0], [0.0, 9.0]]
+    await vec.upsert([(id, {"n": i}, "c", embeddings[i]) for i, id in enumerate(ids)])
+
+    pages = []
+    token = None
+    while True:
+        page = await vec.search([0.0, 0.0], limit=3, search_after=token)
+        if len(page) == 0:
+            break
+        pages.append([r["id"] for r in page])
+        token = page.next_page_token
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+    assert sorted(id for page in pages for id in page) == sorted(ids)
+    assert set(pages[1][1:] + pages[2][:2]) == set(ids[4:8])
+
+    batch = await vec.search([0.0, 0.0], limit=5, as_arrays=True, filter={"n": 9})
+    assert batch.ids == [ids[9]]
+    assert len(await vec.search([0.0, 0.0], search_after=batch.next_page_token, filter={"n": 9})) == 0
+
+    assert (await vec.search([0.0, 0.0], include="id")).next_page_token is None
+    with pytest.raises(ValueError):
+        await vec.search([0.0, 0.0], search_after="not a token")
+
+    # pages past the default ef_search of 40 are not cut off by the index scan
+    await vec.upsert([(uuid.uuid4(), {"n": i}, "c", [1.0, float(i)]) for i in range(10, 100)])
+    await vec.create_embedding_index(HNSWIndex())
+    query_params = QueryParams({"enable_seqscan": "off"})
+    page = await vec.search([0.0, 0.0], limit=25, query_params=query_params)
+    returned = len(page)
+    while len(page) > 0:
+        page = await vec.search([0.0, 0.0], limit=25, query_params=query_params, search_after=page.next_page_token)
+        returned += len(page)
+    assert returned == 100
+    plan = await vec.explain_search([0.0, 0.0], limit=25, query_params=query_params, search_after=token)
+    assert plan.indexes == ["data_table_embedding_idx"]
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_search_max_distance(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2, distance_type="euclidean")
+    await vec.drop_table()
+    await vec.create_tables()
+    ids = [uuid.uuid4() for _ in range(100)]
+    await vec.upsert([(id, {"n": i}, "c", [0.0, float(i)]) for i, id in enumerate(ids)])
+    await vec.create_embedding_index(HNSWIndex())
+
+    rec = await vec.search([0.0, 10.0], limit=10, max_distance=2.0)
+    assert sorted(r["id"] for r in rec) == sorted(ids[8:13])
+    assert all(r["distance"] <= 2.0 for r in rec)
+    assert len(await vec.search([0.0, 10.0], limit=2, max_distance=2.0)) == 2
+
+    stream = vec.iter_search([0.0, 50.0], max_distance=20.0, fetch_size=8, include="id", exact=True)
+    assert {r["id"] async for r in stream} == set(ids[30:71])
+    # without exact the stream scans the index iteratively, which needs pgvector 0.8
+    stream = vec.iter_search([0.0, 50.0], max_distance=20.0, fetch_size=8, include="id")
+    if tuple(map(int, (await vec._get_pgvector_version()).split(".")[:2])) >= (0, 8):
+        assert {r["id"] async for r in stream} == set(ids[30:71])
+    else:
+        with pytest.raises(ValueError):
+            [r async for r in stream]
+
+    with pytest.raises(ValueError):
+        await vec.search(max_distance=1.0)
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_mmr_search(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2)
+    await vec.drop_table()
+    await vec.create_tables()
+    ids = [uuid.uuid4() for _ in range(4)]
+    # three near duplicates close to the query and one record in another direction
+    embeddings = [[1.0, 0.1], [1.0, 0.11], [1.0, 0.12], [1.0, 1.0]]
+    await vec.upsert(
+        [(id, {"n": i}, "c", embedding) for i, (id, embedding) in enumerate(zip(ids, embeddings, strict=True))]
+    )
+
+    rec = await vec.mmr_search([1.0, 0.0], limit=2, fetch_k=4, lambda_mult=0.25)
+    assert [r["id"] for r in rec] == [ids[0], ids[3]]
+    rec = await vec.mmr_search([1.0, 0.0], limit=2, fetch_k=4, lambda_mult=1.0)
+    assert [r["id"] for r in rec] == [ids[0], ids[1]]
+    assert await vec.mmr_search([1.0, 0.0], filter={"n": 10}) == []
+
+    with pytest.raises(ValueError):
+        await vec.mmr_search([1.0, 0.0], lambda_mult=2.0)
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_search_group_by(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2, distance_type="euclidean")
+    await vec.drop_table()
+    await vec.create_tables()
+    # documents 0 to 4, with 4 chunks each, farther from the origin as the document number grows
+    ids = [uuid.uuid4() for _ in range(20)]
+    await vec.upsert([(id, {"doc_id": i // 4, "chunk": i % 4}, "c", [float(i), 0.0]) for i, id in enumerate(ids)])
+
+    rec = await vec.search([0.0, 0.0], limit=20, group_by="doc_id", per_group=2, groups=3)
+    assert [(r["group_key"], r["metadata"]["chunk"]) for r in rec] == [
+        ("0", 0),
+        ("0", 1),
+        ("1", 0),
+        ("1", 1),
+        ("2", 0),
+        ("2", 1),
+    ]
+    assert [r["id"] for r in rec[:2]] == ids[:2]
+
+    rec = await vec.search([19.0, 0.0], limit=6, group_by="doc_id", include=("id", "distance"))
+    assert [(r["group_key"], r["distance"]) for r in rec] == [("4", 0.0), ("3", 4.0)]
+
+    with pytest.raises(ValueError):
+        await vec.search([0.0, 0.0], group_by="doc_id", rerank_factor=2)
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_search_fan_out(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2, time_partition_interval=timedelta(hours=1), max_db_connections=4)
+    await vec.drop_table()
+    await vec.create_tables()
+    start = datetime(2024, 1, 1, 0, 30)
+    records = [
+        (uuid_from_time(start + timedelta(minutes=20 * i)), {"n": i}, "c", [1.0, float(i % 7)]) for i in range(24)
+    ]
+    await vec.upsert(records)
+
+    time_range = UUIDTimeRange(start, start + timedelta(hours=7))
+    expected = await vec.search([1.0, 3.0], limit=8, uuid_time_filter=time_range)
+    rec = await vec.search([1.0, 3.0], limit=8, uuid_time_filter=time_range, fan_out=4)
+    assert [r["distance"] for r in rec] == [r["distance"] for r in expected]
+    assert {r["id"] for r in rec[:3]} == {r["id"] for r in expected[:3]}
+    batch = await vec.search([1.0, 3.0], limit=3, uuid_time_filter=time_range, fan_out=4, as_arrays=True)
+    assert batch.metadata[0]["n"] % 7 == 3
+
+    slices = time_range.split(timedelta(hours=1), 3)
+    assert [(s.start_date.hour, s.start_date.minute) for s in slices] == [(0, 30), (2, 0), (5, 0)]
+    assert slices[-1].end_date == time_range.end_date
+    assert len(time_range.split(timedelta(hours=1), 100)) == 8
+
+    with pytest.raises(ValueError):
+        await vec.search([1.0, 3.0], uuid_time_filter=time_range, fan_out=4, include="id")
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_search_recency(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2, time_partition_interval=timedelta(days=7))
+    await vec.drop_table()
+    await vec.create_tables()
+    now = datetime.now()
+    old_id = uuid_from_time(now - timedelta(days=30))
+    new_id = uuid_from_time(now - timedelta(hours=1))
+    await vec.upsert(
+        [
+            (old_id, {"age": "old"}, "c", [1.0, 0.0]),
+            (new_id, {"age": "new"}, "c", [1.0, 0.1]),
+        ]
+    )
+
+    rec = await vec.search([1.0, 0.0], limit=2)
+    assert [r["id"] for r in rec] == [old_id, new_id]
+    rec = await vec.search([1.0, 0.0], limit=2, recency_weight=0.1, half_life=timedelta(days=1))
+    assert [r["id"] for r in rec] == [new_id, old_id]
+    assert rec[1]["distance"] == pytest.approx(0.0, abs=1e-6)
+    rec = await vec.search([1.0, 0.0], limit=1, recency_weight=0.1, half_life=timedelta(days=1), include="id")
+    assert [r["id"] for r in rec] == [new_id]
+
+    with pytest.raises(ValueError):
+        await vec.search([1.0, 0.0], recency_weight=0.1)
+
+    await vec.drop_table()
+    await vec.close()
+
+    # tables that are not partitioned by time need the indexed uuid timestamp
+    vec = Async(service_url, "data_table", 2)
+    with pytest.raises(ValueError):
+        await vec.search([1.0, 0.0], recency_weight=0.1, half_life=timedelta(days=1))
+    vec = Async(service_url, "data_table", 2, indexed_metadata_fields={"__uuid_timestamp": "timestamptz"})
+    await vec.drop_table()
+    await vec.create_tables()
+    await vec.upsert([(old_id, {"age": "old"}, "c", [1.0, 0.0]), (new_id, {"age": "new"}, "c", [1.0, 0.1])])
+    query, _ = vec.builder.search_query(
+        [1.0, 0.0], 2, None, None, None, None, recency_weight=0.1, half_life=timedelta(1)
+    )
+    assert '"id_timestamp" AS id_time' in query
+    rec = await vec.search([1.0, 0.0], limit=2, recency_weight=0.1, half_life=timedelta(days=1))
+    assert [r["id"] for r in rec] == [new_id, old_id]
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_explain_search(service_url: str) -> None:
+    vec = Async(service_url, "data_table", 2)
+    await vec.drop_table()
+    await vec.create_tables()
+    await vec.upsert([(uuid.uuid4(), {"n": i}, "c", [1.0, float(i)]) for i in range(100)])
+
+    plan = await vec.explain_search([1.0, 2.0], limit=5, predicates=Predicates("n", ">", 90))
+    assert plan.sequential_scans == ["data_table"]
+    assert plan.indexes == []
+    assert plan.rows_removed_by_filter == 91
+    assert plan.chunks_scanned == 0
+    assert plan.shared_hit_blocks + plan.shared_read_blocks > 0
+    assert plan.execution_time > 0
+    assert plan.plan["Plan"]["Node Type"] == "Limit"
+
+    await vec.create_embedding_index(HNSWIndex())
+    plan = await vec.explain_search(
+        [1.0, 2.0], limit=5, query_params=QueryParams({"enable_seqscan": "off", "hnsw.ef_search": 10})
+    )
+    assert plan.indexes == ["data_table_embedding_idx"]
+    assert plan.sequential_scans == []
+
+    # searches can be planned for their parameter values every time, like explain_search does
+    custom_plans = QueryParams({"plan_cache_mode": "force_custom_plan"})
+    for n in range(90, 97):
+        rec = await vec.search([1.0, 2.0], limit=5, predicates=Predicates("n", ">", n), query_params=custom_plans)
+        assert len(rec) == min(5, 99 - n)
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_compiled_predicates(service_url: str) -> None:
+    compiled = (Predicates("n", "<", 3) | ~Predicates(("tag", "a"), ("tags", "@>", ["x"]))).compile()
+    other = Predicates("n", "<", 7) | ~Predicates(("tag", "b"), ("tags", "@>", ["y", "z"]))
+    assert other.compile() is compiled
+    assert Predicates("n", "<", 3.5).compile() is not Predicates("n", "<", 3).compile()
+    assert compiled.num_params == 3
+    assert compiled.parameters(other) == [7, "b", '["y", "z"]']
+    assert compiled.sql(2) == (
+        "((metadata->>'n')::int < $2) OR (TRUE IS DISTINCT FROM (((metadata->>'tag') = $3 AND "
+        "metadata @> jsonb_build_object('tags', $4::jsonb))))"
+    )
+    assert other.build_query(["embedding"]) == (compiled.sql(2), ["embedding", 7, "b", '["y", "z"]'])
+    # the template follows clauses added after compiling, also to predicates nested in a combination
+    predicates = Predicates("n", "<", 3)
+    assert predicates.compile() is predicates.compile()
+    predicates.add_clause("tag", "==", "a")
+    assert predicates.compile().parameters(predicates) == [3, "a"]
+    assert predicates.build_query([]) == ("(metadata->>'n')::int < $1 AND (metadata->>'tag') = $2", [3, "a"])
+    child = Predicates("n", "<", 3)
+    combined = ~child
+    assert combined.build_query([]) == ("TRUE IS DISTINCT FROM (((metadata->>'n')::int < $1))", [3])
+    child.add_clause("tag", "==", "a")
+    assert combined.build_query([]) == (
+        "TRUE IS DISTINCT FROM (((metadata->>'n')::int < $1 AND (metadata->>'tag') = $2))",
+        [3, "a"],
+    )
+
+    vec = Async(service_url, "data_table", 2)
+    await vec.drop_table()
+    await vec.create_tables()
+    await vec.upsert([(uuid.uuid4(), {"n": i, "tag": "a", "tags": ["x"]}, "c", [1.0, float(i)]) for i in range(10)])
+    rec = await vec.search(limit=10, predicates=other)
+    assert sorted(r["metadata"]["n"] for r in rec) == list(range(10))
+    rec = await vec.search(
+        limit=10, predicates=Predicates("n", "<", 2) | ~Predicates(("tag", "a"), ("tags", "@>", ["x"]))
+    )
+    assert sorted(r["metadata"]["n"] for r in rec) == [0, 1]
+
+    await vec.drop_table()
+    await vec.close()
+
+
+@pytest.mark.asyncio
+async def test_indexed_metadata_fields(service_url: str) -> None:
+    with pytest.raises(ValueError):
+        Async(service_url, "data_table", 2, indexed_metadata_fields={"year": "date"})
+    with pytest.raises(ValueError):
+        Async(
+            service_url,
+            "data_table",
+            2,
+            time_partition_interval=timedelta(days=1),
+            indexed_metadata_fields={"__uuid_timestamp": "timestamptz"},
+        )
+
+    fields = {
+        "year": "int",
+        "score": "numeric",
+        "published": "timestamptz",
+        "tag": "text",
+        "__uuid_timestamp": "timestamptz",
+    }
+    vec = Async(service_url, "data_table", 2, indexed_metadata_fields=fields)
+    await vec.drop_table()
+    await vec.create_tables()
+    # creating the tables again is a no-op
+    await vec.create_tables()
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    records = [
+        (
+            uuid_from_time(start + timedelta(days=i)),
+            {
+                "year": 2000 + i,
+                "score": i / 2,
+                "published": (start + timedelta(hours=i)).isoformat(),
+                "tag": "even" if i % 2 == 0 else "odd",
+            },
+            "c",
+            [1.0, float(i)],
+        )
+        for i in range(20)
+    ]
+    await vec.upsert(records)
+
+    query, _ = vec.builder.search_query(
+        None, 10, None, Predicates("year", ">", 2010) & Predicates("tag", "==", "odd"), UUIDTimeRange(start), None
+    )
+    assert '"metadata_year" > $1' in query
+    assert '"metadata_tag" = $2' in query
+    assert '"id_timestamp" >= $3' in query
+    # values of another type than the field keep the cast of the metadata
+    query, _ = vec.builder.search_query(None, 10, None, Predicates("year", ">", 2010.5), None, None)
+    assert "(metadata->>'year')::numeric > $1" in query
+
+    def years(rec):
+        return sorted(r["metadata"]["year"] for r in rec)
+
+    assert years(await vec.search(limit=20, predicates=Predicates("year", ">=", 2017))) == [2017, 2018, 2019]
+    assert years(await vec.search(limit=20, predicates=Predicates("score", "<", 1.0))) == [2000, 2001]
+    rec = await vec.search(limit=20, predicates=Predicates("published", ">", start + timedelta(hours=17, minutes=30)))
+    assert years(rec) == [2018, 2019]
+    rec = await vec.search(limit=20, predicates=Predicates("tag", "==", "odd") & Predicates("year", "<", 2005))
+    assert years(rec) == [2001, 2003]
+    rec = await vec.search(limit=20, uuid_time_filter=UUIDTimeRange(start + timedelta(days=18)))
+    assert years(rec) == [2018, 2019]
+    rec = await vec.search(limit=20, predicates=Predicates("__uuid_timestamp", "<", start + timedelta(days=1)))
+    assert years(rec) == [2000]
+
+    plan = await vec.explain_search(
+        limit=5, predicates=Predicates("year", ">", 2015), query_params=QueryParams({"enable_seqscan": "off"})
+    )
+    assert plan.indexes == ["data_table_metadata_year_idx"]
+
+    await vec.drop_table()
+    await vec.close()
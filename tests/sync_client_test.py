@@ -1,7 +1,9 @@
 import uuid
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
 import numpy as np
+import psycopg2
 import pytest
 
 from timescale_vector.client import (
@@ -12,9 +14,13 @@ from timescale_vector.client import (
     DiskAnnIndex,
     DiskAnnIndexParams,
     HNSWIndex,
+    HNSWIndexParams,
     IvfflatIndex,
     Predicates,
+    QueryParams,
+    SearchCache,
     Sync,
+    UpsertResult,
     UUIDTimeRange,
     uuid_from_time,
 )
@@ -310,3 +316,553 @@ def test_sync_client(service_url: str, schema: str) -> None:
     assert len(rec) == 2
     vec.drop_table()
     vec.close()
+
+
+@pytest.mark.parametrize("method", ["values", "copy"])
+def test_sync_bulk_upsert(service_url: str, method: str) -> None:
+    vec = Sync(service_url, "data_table", 2)
+    vec.drop_table()
+    vec.create_tables()
+
+    assert vec.bulk_upsert([], method=method) == UpsertResult()
+
+    ids = [uuid.uuid4() for _ in range(100)]
+    result = vec.bulk_upsert(
+        [(id, {"key": "val", "n": i}, "the brown\tfox\\\n", [1.0, float(i)]) for i, id in enumerate(ids)],
+        method=method,
+        page_size=30,
+    )
+    assert result == UpsertResult(inserted=100, skipped=0)
+    rec = vec.search([1.0, 2.0], limit=1)
+    assert rec[0]["metadata"] == {"key": "val", "n": 2}
+    assert rec[0]["contents"] == "the brown\tfox\\\n"
+
+    # existing ids are skipped, like upsert
+    result = vec.bulk_upsert(
+        [
+            (ids[0], """{"key":"changed"}""", "the brown fox", np.array([1.0, 1.0])),
+            (uuid.uuid4(), """{"key":"val"}""", None, np.array([1.0, 1.0])),
+        ],
+        method=method,
+    )
+    assert result == UpsertResult(inserted=1, skipped=1)
+    assert len(vec.search(limit=10, filter={"key": "changed"})) == 0
+
+    # only rows whose metadata, contents or embedding changed are rewritten, the last record for an id wins
+    result = vec.bulk_upsert(
+        [
+            (ids[0], {"key": "val", "n": 0}, "the brown\tfox\\\n", [1.0, 0.0]),
+            (ids[1], {"key": "val", "n": 1}, "the brown fox", [1.0, 1.0]),
+            (ids[2], {"key": "val", "n": 2}, "the brown\tfox\\\n", [1.0, 20.0]),
+            (ids[2], {"key": "val", "n": 2, "last": True}, "the brown\tfox\\\n", [1.0, 20.0]),
+            (uuid.uuid4(), {"key": "val"}, "the brown fox", [1.0, 1.0]),
+        ],
+        method=method,
+        on_conflict="update",
+    )
+    assert result == UpsertResult(inserted=1, updated=2, skipped=2)
+    assert vec.search(limit=10, filter={"n": 2})[0]["metadata"] == {"key": "val", "n": 2, "last": True}
+    assert vec.search(limit=10, filter={"n": 1})[0]["contents"] == "the brown fox"
+
+    assert vec.bulk_delete_by_ids(ids[:50] + [uuid.uuid4()], method=method, page_size=20) == 50
+    assert vec._get_approx_count() == 52
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_upsert_stream(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 2)
+    vec.drop_table()
+    vec.create_tables()
+
+    ids = [uuid.uuid4() for _ in range(250)]
+    progress = []
+    result = vec.upsert_stream(
+        ((id, {"n": i}, "the brown fox", [1.0, float(i)]) for i, id in enumerate(ids)),
+        batch_size=40,
+        max_in_flight=3,
+        on_progress=progress.append,
+    )
+    assert result == UpsertResult(inserted=250, skipped=0)
+    assert len(progress) == 7
+    assert progress[-1] == result
+
+    result = vec.upsert_stream(
+        ((id, {"n": i}, "the brown fox", [1.0, float(i)]) for i, id in enumerate(ids[:10])),
+        batch_size=4,
+        method="copy",
+    )
+    assert result == UpsertResult(inserted=0, skipped=10)
+    assert vec._get_approx_count() == 250
+
+    vec.drop_table()
+    vec.close()
+
+    # the workers and concurrent searches wait for a connection of a small pool instead of failing
+    vec = Sync(service_url, "data_table", 2, max_db_connections=2)
+    vec.create_tables()
+    records = ((uuid.uuid4(), {"n": i}, "c", [1.0, float(i)]) for i in range(200))
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        searches = [executor.submit(vec.search, [1.0, 0.0], limit=1) for _ in range(8)]
+        result = vec.upsert_stream(records, batch_size=10, max_in_flight=4)
+        assert all(len(search.result()) <= 1 for search in searches)
+    assert result == UpsertResult(inserted=200, skipped=0)
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_upsert_columns(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 3)
+    vec.drop_table()
+    vec.create_tables()
+
+    embeddings = np.random.default_rng(0).random((50, 3), dtype=np.float32)
+    ids = [uuid.uuid4() for _ in range(50)]
+    metadata = [{"n": i} for i in range(50)]
+    contents = [f"the brown\tfox {i}" for i in range(50)]
+    result = vec.upsert_columns(ids, metadata, contents, embeddings)
+    assert result == UpsertResult(inserted=50, skipped=0)
+
+    rec = vec.search(embeddings[7], limit=1)
+    assert rec[0]["id"] == ids[7]
+    assert rec[0]["metadata"] == {"n": 7}
+    assert rec[0]["contents"] == "the brown\tfox 7"
+    assert np.allclose(rec[0]["embedding"], embeddings[7])
+
+    result = vec.upsert_columns(ids[:2], [None, None], [None, None], embeddings[:2])
+    assert result == UpsertResult(inserted=0, skipped=2)
+
+    with pytest.raises(ValueError):
+        vec.upsert_columns(ids[:2], metadata[:2], contents[:2], embeddings[:2, :2])
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_vector_codec(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 3)
+    vec.drop_table()
+    vec.create_tables()
+    vec.upsert(
+        [
+            (uuid.uuid4(), {}, "list", [1.0, 2.0, 3.0]),
+            (uuid.uuid4(), {}, "float32", np.array([1.5, 2.5, 3.5], dtype=np.float32)),
+        ]
+    )
+    rec = vec.search(np.array([1.5, 2.5, 3.5], dtype=np.float32), limit=2)
+    assert rec[0]["contents"] == "float32"
+    assert rec[0]["embedding"].dtype == np.float32
+    assert rec[0]["embedding"].tolist() == [1.5, 2.5, 3.5]
+    assert rec[1]["embedding"].tolist() == [1.0, 2.0, 3.0]
+
+    vec.drop_table()
+    vec.close()
+
+
+@pytest.mark.parametrize(
+    "embedding_type, distance_type, embeddings",
+    [
+        ("halfvec", "cosine", [[1.0, 2.0, 3.0], [1.5, 2.5, 3.5], [-1.0, 0.5, 0.0]]),
+        ("sparsevec", "euclidean", [[1.0, 0.0, 3.0], [0.0, 2.5, 0.0], [-4.0, 0.0, 0.0]]),
+        ("bit", "hamming", [[1, 0, 1], [1, 1, 1], [0, 0, 0]]),
+    ],
+)
+def test_sync_embedding_types(
+    service_url: str, embedding_type: str, distance_type: str, embeddings: list[list[float]]
+) -> None:
+    vec = Sync(service_url, "data_table", 3, distance_type, embedding_type=embedding_type)
+    vec.drop_table()
+    vec.create_tables()
+    vec.upsert([(uuid.uuid4(), {"key": "val"}, "upsert", embeddings[0])])
+    vec.bulk_upsert([(uuid.uuid4(), {"key": "val"}, "bulk", np.array(embeddings[1]))], method="copy")
+    vec.upsert_columns([uuid.uuid4()], [{"key": "val"}], ["columns"], np.array([embeddings[2]]))
+
+    rec = vec.search(embeddings[1], limit=3)
+    assert [r["contents"] for r in rec] == ["bulk", "upsert", "columns"]
+    assert rec[0]["embedding"].tolist() == embeddings[1]
+    assert rec[2]["embedding"].tolist() == embeddings[2]
+    assert rec[0]["distance"] == 0
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_search_many(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 2)
+    vec.drop_table()
+    vec.create_tables()
+    vec.upsert_columns(
+        [uuid.uuid4() for _ in range(20)],
+        [{"parity": i % 2} for i in range(20)],
+        [f"{i}" for i in range(20)],
+        np.array([[1.0, float(i)] for i in range(20)]),
+    )
+
+    queries = np.array([[1.0, 3.0], [1.0, 15.0], [1.0, 7.0]])
+    results = vec.search_many(queries, limit=3, filter={"parity": 1})
+    assert len(results) == 3
+    for query, result in zip(queries, results, strict=True):
+        expected = vec.search(query, limit=3, filter={"parity": 1})
+        assert [r["id"] for r in result] == [r["id"] for r in expected]
+    assert [r["query_idx"] for r in results[1]] == [1, 1, 1]
+    assert vec.search_many([]) == []
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_search_include(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 2)
+    vec.drop_table()
+    vec.create_tables()
+    ids = [uuid.uuid4() for _ in range(3)]
+    vec.upsert([(id, {"n": i}, f"{i}", [1.0, float(i)]) for i, id in enumerate(ids)])
+
+    rec = vec.search([1.0, 1.0], limit=2, include=("id", "metadata", "distance"))
+    assert [r[SEARCH_RESULT_ID_IDX] for r in rec] == [ids[1], ids[2]]
+    assert rec[0][SEARCH_RESULT_METADATA_IDX] == {"n": 1}
+    assert rec[0][SEARCH_RESULT_CONTENTS_IDX] is None
+    assert rec[0]["embedding"] is None
+
+    results = vec.search_many([[1.0, 0.0], [1.0, 2.0]], limit=2, include=["id"])
+    assert [[r["id"] for r in result] for result in results] == [[ids[0], ids[1]], [ids[2], ids[1]]]
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_search_as_arrays(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 2)
+    vec.drop_table()
+    vec.create_tables()
+    ids = [uuid.uuid4() for _ in range(3)]
+    vec.upsert([(id, {"n": i}, f"{i}", [1.0, float(i)]) for i, id in enumerate(ids)])
+
+    batch = vec.search([1.0, 1.0], limit=2, as_arrays=True)
+    assert batch.ids == [ids[1], ids[2]]
+    assert batch.distances.dtype == np.float32
+    assert batch.embeddings.tolist() == [[1.0, 1.0], [1.0, 2.0]]
+    assert batch.metadata == [{"n": 1}, {"n": 2}]
+
+    batches = vec.search_many([[1.0, 0.0]], limit=1, as_arrays=True)
+    assert batches[0].ids == [ids[0]]
+
+    batch = vec.search([1.0, 1.0], filter={"n": 5}, as_arrays=True, include=("id", "embedding"))
+    assert len(batch) == 0
+    assert batch.distances is None
+    assert batch.embeddings.shape == (0, 2) and batch.embeddings.dtype == np.float32
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_iter_search(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 2)
+    vec.drop_table()
+    vec.create_tables()
+    vec.upsert_columns(
+        [uuid.uuid4() for _ in range(50)],
+        [{"parity": i % 2} for i in range(50)],
+        [f"{i}" for i in range(50)],
+        np.array([[1.0, float(i)] for i in range(50)]),
+    )
+
+    records = list(vec.iter_search(filter={"parity": 0}, fetch_size=7))
+    assert len(records) == 25
+    assert all(r["metadata"]["parity"] == 0 for r in records)
+
+    expected = vec.search([1.0, 10.0], limit=20)
+    records = list(vec.iter_search([1.0, 10.0], limit=20, fetch_size=3, query_params=HNSWIndexParams(100)))
+    assert [r["id"] for r in records] == [r["id"] for r in expected]
+    assert records[0]["embedding"].tolist() == [1.0, 10.0]
+
+    iterator = vec.iter_search([1.0, 10.0], fetch_size=5)
+    assert next(iterator)["contents"] == "10"
+    iterator.close()
+    assert not vec.table_is_empty()
+
+    # an exact stream is not cut off at the candidate window of the index
+    vec.create_embedding_index(HNSWIndex())
+    query_params = QueryParams({"hnsw.ef_search": 10, "enable_seqscan": "off"})
+    records = list(vec.iter_search([1.0, 10.0], query_params=query_params, exact=True))
+    assert len(records) == 50
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_search_cache(service_url: str) -> None:
+    cache = SearchCache(max_size=8, ttl=60)
+    vec = Sync(service_url, "data_table", 2, search_cache=cache)
+    vec.drop_table()
+    vec.create_tables()
+    ids = [uuid_from_time(datetime.now() - timedelta(hours=i)) for i in range(3)]
+    vec.upsert([(id, {"n": i}, f"{i}", [1.0, float(i)]) for i, id in enumerate(ids)])
+
+    rec = vec.search([1.0, 1.0], limit=2, uuid_time_filter=UUIDTimeRange(end_date=datetime.now() + timedelta(days=1)))
+    assert vec.search([1.0, 1.0], limit=2, uuid_time_filter=UUIDTimeRange(end_date=datetime.now())) is not rec
+    assert vec.search([1.0, 1.0], limit=2, query_params=HNSWIndexParams(10)) is not rec
+    batch = vec.search([1.0, 1.0], limit=2, as_arrays=True)
+    assert vec.search([1.0, 1.0], limit=2, as_arrays=True) is batch
+    assert cache.stats.hits == 1
+    assert cache.stats.hit_rate == pytest.approx(0.2)
+
+    vec.delete_by_metadata({"n": 1})
+    assert vec.search([1.0, 1.0], limit=2, as_arrays=True).ids == [ids[2], ids[0]]
+    vec.bulk_upsert([(ids[1], {"n": 1}, "1", [1.0, 1.0])])
+    assert vec.search([1.0, 1.0], limit=2, as_arrays=True).ids == [ids[1], ids[2]]
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_hybrid_search(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 2, text_search_config="english")
+    vec.drop_table()
+    vec.create_tables()
+    ids = [uuid.uuid4() for _ in range(3)]
+    vec.upsert(
+        [
+            (ids[0], {"n": 0}, "the quick brown fox", [1.0, 0.0]),
+            (ids[1], {"n": 1}, "a lazy dog", [1.0, 1.0]),
+            (ids[2], {"n": 2}, "quick, quick dog", [0.0, 1.0]),
+        ]
+    )
+
+    # the nearest record and the only one containing both words tie
+    rec = vec.hybrid_search("quick dog", [1.0, 1.0], limit=2, num_candidates=1)
+    assert {r["id"]: r["distance"] is None for r in rec} == {ids[1]: False, ids[2]: True}
+    assert [r["score"] for r in rec] == pytest.approx([1 / 61, 1 / 61])
+
+    rec = vec.hybrid_search(
+        "fox", [1.0, 1.0], predicates=Predicates("n", "<", 2), fusion="weighted", vector_weight=0.25
+    )
+    assert [r["id"] for r in rec] == [ids[0], ids[1]]
+    assert rec[0]["score"] == pytest.approx(0.75)
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_search_rerank(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 2)
+    vec.drop_table()
+    vec.create_tables()
+    ids = [uuid.uuid4() for _ in range(20)]
+    vec.upsert([(id, {"n": i}, "c", [1.0, float(i)]) for i, id in enumerate(ids)])
+
+    rec = vec.search([1.0, 3.0], limit=3, rerank_factor=2, as_arrays=True)
+    assert rec.ids == [ids[3], ids[4], ids[5]]
+    assert rec.distances.tolist() == sorted(rec.distances.tolist())
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_search_expansions(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 2, distance_type="euclidean")
+    vec.drop_table()
+    vec.create_tables()
+    ids = [uuid.uuid4() for _ in range(300)]
+    vec.upsert([(id, {"rare": i >= 297}, "c", [1.0, float(i)]) for i, id in enumerate(ids)])
+    vec.create_embedding_index(IvfflatIndex(num_lists=30))
+
+    query_params = QueryParams({"enable_seqscan": "off", "enable_bitmapscan": "off", "ivfflat.probes": 1})
+    rec = vec.search([1.0, 0.0], limit=3, filter={"rare": True}, query_params=query_params)
+    assert len(rec) < 3
+    # the probes of ivfflat are not expanded
+    rec = vec.search([1.0, 0.0], limit=3, filter={"rare": True}, query_params=query_params, max_expansions=3)
+    assert len(rec) < 3
+    assert vec._get_embedding_index_type() == "ivfflat"
+
+    vec.drop_embedding_index()
+    vec.create_embedding_index(HNSWIndex(m=4, ef_construction=16))
+    query_params = QueryParams({"enable_seqscan": "off", "enable_bitmapscan": "off", "hnsw.ef_search": 10})
+    assert len(vec.search([1.0, 0.0], limit=3, filter={"rare": True}, query_params=query_params)) < 3
+    rec = vec.search([1.0, 0.0], limit=3, filter={"rare": True}, query_params=query_params, max_expansions=3)
+    assert [r["id"] for r in rec] == ids[297:]
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_search_after(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 2)
+    vec.drop_table()
+    vec.create_tables()
+    ids = [uuid.uuid4() for _ in range(7)]
+    vec.upsert([(id, {"n": i}, "c", [1.0, float(i)]) for i, id in enumerate(ids)])
+
+    page = vec.search([1.0, 0.0], limit=4)
+    assert [r["id"] for r in page] == ids[:4]
+    page = vec.search([1.0, 0.0], limit=4, search_after=page.next_page_token)
+    assert [r["id"] for r in page] == ids[4:]
+    assert len(vec.search([1.0, 0.0], limit=4, search_after=page.next_page_token)) == 0
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_search_max_distance(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 2, distance_type="euclidean")
+    vec.drop_table()
+    vec.create_tables()
+    ids = [uuid.uuid4() for _ in range(20)]
+    vec.upsert([(id, {"n": i}, "c", [0.0, float(i)]) for i, id in enumerate(ids)])
+
+    rec = vec.search([0.0, 0.0], max_distance=2.5, filter={"n": 1})
+    assert [r["id"] for r in rec] == [ids[1]]
+    records = list(vec.iter_search([0.0, 19.0], max_distance=3.0, fetch_size=2))
+    assert [r["id"] for r in records] == ids[16:][::-1]
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_mmr_search(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 2)
+    vec.drop_table()
+    vec.create_tables()
+    ids = [uuid.uuid4() for _ in range(5)]
+    embeddings = [[1.0, 0.1], [1.0, 0.11], [1.0, 0.12], [1.0, 1.0], [0.0, 1.0]]
+    vec.upsert([(id, {"n": i}, "c", embedding) for i, (id, embedding) in enumerate(zip(ids, embeddings, strict=True))])
+
+    rec = vec.mmr_search([1.0, 0.0], limit=3, fetch_k=5, lambda_mult=0.1)
+    assert [r["id"] for r in rec] == [ids[0], ids[4], ids[3]]
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_search_group_by(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 2, distance_type="euclidean")
+    vec.drop_table()
+    vec.create_tables()
+    ids = [uuid.uuid4() for _ in range(12)]
+    vec.upsert([(id, {"doc_id": f"doc{i % 3}"}, "c", [float(i), 0.0]) for i, id in enumerate(ids)])
+
+    rec = vec.search([0.0, 0.0], limit=12, group_by="doc_id", per_group=3, groups=2)
+    assert [r["id"] for r in rec] == [ids[0], ids[3], ids[6], ids[1], ids[4], ids[7]]
+    assert [r["group_key"] for r in rec] == ["doc0"] * 3 + ["doc1"] * 3
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_search_recency(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 2, time_partition_interval=timedelta(days=7))
+    vec.drop_table()
+    vec.create_tables()
+    now = datetime.now()
+    ids = [uuid_from_time(now - timedelta(days=days)) for days in (60, 10, 0)]
+    vec.upsert([(id, {}, "c", [1.0, 0.01 * i]) for i, id in enumerate(ids)])
+
+    rec = vec.search([1.0, 0.0], limit=3, recency_weight=1.0, half_life=timedelta(days=10), rerank_factor=1)
+    assert [r["id"] for r in rec] == ids[::-1]
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_explain_search(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 2)
+    vec.drop_table()
+    vec.create_tables()
+    vec.upsert([(uuid.uuid4(), {"n": i}, "c", [1.0, float(i)]) for i in range(10)])
+
+    plan = vec.explain_search(
+        [1.0, 2.0], limit=5, filter={"n": 3}, query_params=QueryParams({"enable_bitmapscan": "off"})
+    )
+    assert plan.sequential_scans == ["data_table"]
+    assert plan.rows_removed_by_filter == 9
+    assert plan.execution_time > 0
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_indexed_metadata_fields(service_url: str) -> None:
+    vec = Sync(
+        service_url,
+        "data_table",
+        2,
+        time_partition_interval=timedelta(days=1),
+        indexed_metadata_fields={"year": "int"},
+    )
+    vec.drop_table()
+    vec.create_tables()
+    start = datetime(2020, 1, 1)
+    vec.upsert(
+        [(uuid_from_time(start + timedelta(days=i)), {"year": 2000 + i}, "c", [1.0, float(i)]) for i in range(10)]
+    )
+
+    rec = vec.search(limit=10, predicates=Predicates("year", ">", 2006) | Predicates("year", "==", 2001))
+    assert sorted(r["metadata"]["year"] for r in rec) == [2001, 2007, 2008, 2009]
+    rec = vec.search(
+        limit=10,
+        predicates=Predicates("year", ">", 2006),
+        uuid_time_filter=UUIDTimeRange(start, end_date=start + timedelta(days=8)),
+    )
+    assert sorted(r["metadata"]["year"] for r in rec) == [2007]
+
+    vec.drop_table()
+    vec.close()
+
+
+def test_sync_indexed_timestamptz_time_zones(service_url: str) -> None:
+    def with_time_zone(time_zone: str) -> Sync:
+        separator = "&" if "?" in service_url else "?"
+        url = f"{service_url}{separator}options=-c%20TimeZone%3D{time_zone}"
+        return Sync(url, "data_table", 2, indexed_metadata_fields={"published": "timestamptz"})
+
+    new_york = with_time_zone("America/New_York")
+    tokyo = with_time_zone("Asia/Tokyo")
+    new_york.drop_table()
+    new_york.create_tables()
+    values = [
+        "2020-01-02T03:04:05",
+        "2020-01-02T03:04:05+00:00",
+        "2020-01-01 22:04:05.000-05",
+        "2020-01-02T12:04:05+09:00",
+    ]
+    new_york.upsert([(uuid.uuid4(), {"n": i, "published": v}, "ny", [1.0, 0.0]) for i, v in enumerate(values)])
+    tokyo.upsert([(uuid.uuid4(), {"n": i, "published": v}, "tokyo", [1.0, 0.0]) for i, v in enumerate(values)])
+    with pytest.raises(psycopg2.Error):
+        tokyo.upsert([(uuid.uuid4(), {"published": "02/01/2020 03:04:05"}, "tokyo", [1.0, 0.0])])
+
+    published = datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    for vec in (new_york, tokyo):
+        rec = vec.search(limit=20, predicates=Predicates("published", "==", published))
+        assert len(rec) == 8
+        rec = vec.search(limit=20, predicates=Predicates("published", ">", published))
+        assert len(rec) == 0
+
+    new_york.drop_table()
+    new_york.close()
+    tokyo.close()
+
+
+def test_sync_jaccard_search(service_url: str) -> None:
+    vec = Sync(service_url, "data_table", 3, "jaccard", embedding_type="bit", text_search_config="english")
+    vec.drop_table()
+    vec.create_tables()
+    vec.upsert(
+        [
+            (uuid.uuid4(), {"n": 0}, "one", [1, 0, 1]),
+            (uuid.uuid4(), {"n": 1}, "two", [1, 1, 1]),
+            (uuid.uuid4(), {"n": 2}, "three", [1, 0, 0]),
+        ]
+    )
+
+    rec = vec.search([1, 1, 1], limit=3)
+    assert [r["contents"] for r in rec] == ["two", "one", "three"]
+    assert rec[0]["distance"] == 0
+    assert [r["contents"] for r in vec.search_many([[1, 0, 0]], limit=1)[0]] == ["three"]
+    assert [r["contents"] for r in vec.iter_search([1, 1, 1], fetch_size=2)] == ["two", "one", "three"]
+    assert [r["contents"] for r in vec.hybrid_search("one", [1, 1, 1], limit=1)] == ["one"]
+    assert vec.explain_search([1, 1, 1], limit=3).sequential_scans == ["data_table"]
+
+    vec.drop_table()
+    vec.close()
@@ -4,6 +4,7 @@ __all__ = [
     "SEARCH_RESULT_CONTENTS_IDX",
     "SEARCH_RESULT_EMBEDDING_IDX",
     "SEARCH_RESULT_DISTANCE_IDX",
+    "SEARCH_RESULT_COLUMNS",
     "uuid_from_time",
     "BaseIndex",
     "IvfflatIndex",
@@ -15,23 +16,40 @@ __all__ = [
     "HNSWIndexParams",
     "UUIDTimeRange",
     "Predicates",
+    "CompiledPredicates",
     "QueryBuilder",
+    "UpsertResult",
+    "SearchResults",
+    "SearchResultBatch",
+    "CacheStats",
+    "SearchCache",
+    "SearchPlan",
     "Async",
     "Sync",
 ]
 
+import asyncio
+import base64
 import calendar
+import functools
+import hashlib
+import heapq
+import io
 import json
 import math
 import random
+import struct
+import threading
+import time
 import uuid
-from collections.abc import Callable, Iterable
+from collections import OrderedDict
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Iterator
 from datetime import datetime, timedelta, timezone
+from itertools import islice
 from typing import Any, Union
 
 import asyncpg
 import numpy as np
-from pgvector.asyncpg import register_vector
 
 
 # copied from Cassandra: https://docs.datastax.com/en/drivers/python/3.2/_modules/cassandra/util.html#uuid_from_time
@@ -102,17 +120,298 @@ def uuid_from_time(time_arg=None, node=None, clock_seq=None):
     )
 
 
+def _batched(iterable: Iterable, size: int) -> Iterator[list]:
+    """
+    Splits an iterable into lists of at most `size` items.
+    """
+    if size < 1:
+        raise ValueError("batch size must be at least 1")
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+async def _abatched(iterable: Iterable | AsyncIterable, size: int) -> AsyncIterator[list]:
+    """
+    Splits an iterable or async iterable into lists of at most `size` items.
+    """
+    if not isinstance(iterable, AsyncIterable):
+        for batch in _batched(iterable, size):
+            yield batch
+        return
+
+    if size < 1:
+        raise ValueError("batch size must be at least 1")
+    batch = []
+    async for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _encode_vector(value: list[float] | np.ndarray) -> bytes:
+    """
+    Encodes a vector in pgvector's binary format: int16 dimensions, int16 unused, big-endian float32 values.
+    Values that are already encoded are passed through, see `_encode_embeddings`.
+    """
+    if isinstance(value, bytes):
+        return value
+    values = np.asarray(value, dtype=">f4")
+    if values.ndim != 1:
+        raise ValueError("expected a 1-dimensional vector")
+    return struct.pack(">HH", values.shape[0], 0) + values.tobytes()
+
+
+def _decode_vector(data: bytes) -> np.ndarray:
+    """
+    Decodes a vector from pgvector's binary format. The result is a read-only big-endian float32 view over
+    `data`, no values are copied.
+    """
+    dimensions, _ = struct.unpack_from(">HH", data)
+    return np.frombuffer(data, dtype=">f4", count=dimensions, offset=4)
+
+
+def _encode_halfvec(value: list[float] | np.ndarray) -> bytes:
+    """
+    Encodes a vector in pgvector's halfvec binary format: int16 dimensions, int16 unused, big-endian float16 values.
+    """
+    if isinstance(value, bytes):
+        return value
+    values = np.asarray(value, dtype=">f2")
+    if values.ndim != 1:
+        raise ValueError("expected a 1-dimensional vector")
+    return struct.pack(">HH", values.shape[0], 0) + values.tobytes()
+
+
+def _decode_halfvec(data: bytes) -> np.ndarray:
+    """
+    Decodes a vector from pgvector's halfvec binary format into a read-only big-endian float16 view over `data`.
+    """
+    dimensions, _ = struct.unpack_from(">HH", data)
+    return np.frombuffer(data, dtype=">f2", count=dimensions, offset=4)
+
+
+def _sparse_entries(
+    value: dict[int, float] | list[float] | np.ndarray, num_dimensions: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the 0-based indices and the values of the non-zero elements of a sparse vector. The vector is
+    either dense or a dictionary mapping indices to values.
+    """
+    if isinstance(value, dict):
+        indices = np.fromiter(value.keys(), dtype=np.int32, count=len(value))
+        values = np.fromiter(value.values(), dtype=np.float32, count=len(value))
+        order = np.argsort(indices)
+        indices, values = indices[order], values[order]
+        nonzero = values != 0
+        indices, values = indices[nonzero], values[nonzero]
+        if len(indices) > 0 and (indices[0] < 0 or indices[-1] >= num_dimensions):
+            raise ValueError(f"sparse vector indices must be between 0 and {num_dimensions - 1}")
+        return indices, values
+
+    dense = np.asarray(value, dtype=np.float32)
+    if dense.ndim != 1:
+        raise ValueError("expected a 1-dimensional vector")
+    if dense.shape[0] != num_dimensions:
+        raise ValueError(f"vector has {dense.shape[0]} dimensions, expected {num_dimensions}")
+    indices = np.flatnonzero(dense).astype(np.int32)
+    return indices, dense[indices]
+
+
+def _encode_sparsevec(value: dict[int, float] | list[float] | np.ndarray, num_dimensions: int) -> bytes:
+    """
+    Encodes a sparse vector in pgvector's sparsevec binary format: int32 dimensions, int32 number of non-zero
+    elements, int32 unused, then the big-endian int32 indices and float32 values of the non-zero elements.
+    """
+    if isinstance(value, bytes):
+        return value
+    indices, values = _sparse_entries(value, num_dimensions)
+    return (
+        struct.pack(">iii", num_dimensions, len(indices), 0)
+        + indices.astype(">i4").tobytes()
+        + values.astype(">f4").tobytes()
+    )
+
+
+def _decode_sparsevec(data: bytes) -> np.ndarray:
+    """
+    Decodes a vector from pgvector's sparsevec binary format into a dense float32 array.
+    """
+    dimensions, nnz, _ = struct.unpack_from(">iii", data)
+    indices = np.frombuffer(data, dtype=">i4", count=nnz, offset=12)
+    dense = np.zeros(dimensions, dtype=np.float32)
+    dense[indices] = np.frombuffer(data, dtype=">f4", count=nnz, offset=12 + 4 * nnz)
+    return dense
+
+
+def _bit_array(value: str | list[bool] | np.ndarray) -> np.ndarray:
+    """
+    Converts a bit string such as '1010' or a sequence of booleans to a 1-dimensional boolean array.
+    """
+    if isinstance(value, str):
+        bits = np.frombuffer(value.encode(), dtype=np.uint8) == ord("1")
+    else:
+        bits = np.asarray(value).astype(bool)
+    if bits.ndim != 1:
+        raise ValueError("expected a 1-dimensional bit vector")
+    return bits
+
+
+def _encode_bit(value: str | list[bool] | np.ndarray) -> bytes:
+    """
+    Encodes a bit vector in Postgres' bit binary format: int32 length in bits, then the bits packed into bytes.
+    """
+    if isinstance(value, bytes):
+        return value
+    bits = _bit_array(value)
+    return struct.pack(">i", bits.shape[0]) + np.packbits(bits).tobytes()
+
+
+def _decode_bit(data: bytes) -> np.ndarray:
+    """
+    Decodes a bit vector from Postgres' bit binary format into a boolean array.
+    """
+    (length,) = struct.unpack_from(">i", data)
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8, offset=4), count=length).astype(bool)
+
+
+_COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_COPY_BINARY_TRAILER = struct.pack(">h", -1)
+
+
+_pack_copy_binary_length = struct.Struct(">i").pack
+
+
+def _copy_binary_column(values: list[str | bytes | None]) -> tuple[list[bytes], list[bytes]]:
+    """
+    Encodes a column of text or binary values for binary COPY as the length prefixes of its fields, -1 for NULL,
+    and their data.
+    """
+    data = [value.encode() if isinstance(value, str) else value or b"" for value in values]
+    lengths = [-1 if value is None else length for value, length in zip(values, map(len, data), strict=True)]
+    return (list(map(_pack_copy_binary_length, lengths)), data)
+
+
+def _binary_embeddings(embeddings: np.ndarray, embedding_type: str) -> np.ndarray:
+    """
+    Encodes the rows of an embedding matrix in the binary format of a vector, halfvec or bit column, with a
+    single structured array for all rows. Returns a uint8 matrix with one encoded embedding per row.
+    """
+    num_rows, dimensions = embeddings.shape
+    if embedding_type == "bit":
+        # bit binary format: int32 number of bits, packed bits
+        packed = np.packbits(embeddings.astype(bool), axis=1)
+        field_dtype = np.dtype([("bits", ">i4"), ("values", "u1", (packed.shape[1],))])
+        fields = np.empty(num_rows, dtype=field_dtype)
+        fields["bits"] = dimensions
+        fields["values"] = packed
+    else:
+        # vector and halfvec binary format: int16 dimensions, int16 unused, big-endian float32 or float16 values
+        value_type = ">f2" if embedding_type == "halfvec" else ">f4"
+        field_dtype = np.dtype([("dim", ">u2"), ("unused", ">u2"), ("values", value_type, (dimensions,))])
+        fields = np.empty(num_rows, dtype=field_dtype)
+        fields["dim"] = dimensions
+        fields["unused"] = 0
+        fields["values"] = embeddings
+    return fields.view(np.uint8).reshape(num_rows, field_dtype.itemsize)
+
+
+def _encode_embeddings(embeddings, embedding_type: str, num_dimensions: int) -> list[bytes]:
+    """
+    Encodes a batch of embeddings in the binary format of `embedding_type`. asyncpg treats any sequence inside
+    an array parameter as a nested array, so the elements of an array of embeddings are sent pre-encoded as bytes,
+    which the embedding codecs pass through.
+    """
+    if embedding_type == "sparsevec":
+        return [_encode_sparsevec(embedding, num_dimensions) for embedding in embeddings]
+    if embedding_type == "bit" and not isinstance(embeddings, np.ndarray):
+        embeddings = [_bit_array(embedding) for embedding in embeddings]
+    matrix = np.asarray(embeddings)
+    if matrix.ndim != 2:
+        raise ValueError("expected a 2-dimensional array of embeddings")
+    return [row.tobytes() for row in _binary_embeddings(matrix, embedding_type)]
+
+
+def _copy_binary_rows(columns: list[tuple[list, list]]) -> bytes:
+    """
+    Lays out a binary COPY stream from columns given as the length prefixes and data of their fields. The fields
+    are interleaved into rows with list slice assignments, a whole column at a time, and joined once.
+    """
+    num_rows = len(columns[0][0])
+    # each row is an int16 field count, then per field an int32 length and the data
+    stride = 1 + 2 * len(columns)
+    parts: list = [None] * (num_rows * stride)
+    parts[0::stride] = [struct.pack(">h", len(columns))] * num_rows
+    for i, (prefixes, data) in enumerate(columns):
+        parts[1 + 2 * i :: stride] = prefixes
+        parts[2 + 2 * i :: stride] = data
+    return _COPY_BINARY_HEADER + b"".join(parts) + _COPY_BINARY_TRAILER
+
+
+def _copy_binary_columns(
+    ids: list[uuid.UUID] | list[str],
+    metadata: list[dict[str, Any] | str | None],
+    contents: list[str | None],
+    embeddings: np.ndarray,
+    id_type: str,
+    num_dimensions: int,
+    embedding_type: str = "vector",
+) -> bytes:
+    """
+    Encodes columns as a binary COPY stream for the (id, metadata, contents, embedding) columns of the
+    staging table. Each column is encoded as a whole and the columns are interleaved into rows by
+    `_copy_binary_rows`. For vector, halfvec and bit embeddings the fields of all rows are laid out at once in
+    a structured array, so the embedding matrix goes to the wire without creating Python objects per element.
+    Sparse vectors have a different length per row and are encoded row by row. UUID ids are written as text
+    for the text id type.
+    """
+    if not isinstance(embeddings, np.ndarray) or embeddings.ndim != 2:
+        raise ValueError("embeddings must be a 2-dimensional numpy array")
+    num_rows, dimensions = embeddings.shape
+    if dimensions != num_dimensions:
+        raise ValueError(f"embeddings have {dimensions} dimensions, expected {num_dimensions}")
+    if len(ids) != num_rows or len(metadata) != num_rows or len(contents) != num_rows:
+        raise ValueError("ids, metadata, contents and embeddings must have the same number of rows")
+
+    if id_type == "uuid":
+        id_data = [(id if isinstance(id, uuid.UUID) else uuid.UUID(id)).bytes for id in ids]
+        id_column = ([_pack_copy_binary_length(16)] * num_rows, id_data)
+    else:
+        id_column = _copy_binary_column([str(id) if isinstance(id, uuid.UUID) else id for id in ids])
+    metadata_column = _copy_binary_column([json.dumps(meta) if isinstance(meta, dict) else meta for meta in metadata])
+    if embedding_type == "sparsevec":
+        embedding_column = _copy_binary_column([_encode_sparsevec(row, num_dimensions) for row in embeddings])
+    else:
+        # the rows of the encoded matrix are passed to the join as views, without copying them
+        encoded = _binary_embeddings(embeddings, embedding_type)
+        embedding_column = ([_pack_copy_binary_length(encoded.shape[1])] * num_rows, list(encoded))
+    return _copy_binary_rows([id_column, metadata_column, _copy_binary_column(contents), embedding_column])
+
+
 class BaseIndex:
-    def get_index_method(self, distance_type: str) -> str:
+    def get_index_method(self, distance_type: str, embedding_type: str = "vector") -> str:
         index_method = "invalid"
-        if distance_type == "<->":
-            index_method = "vector_l2_ops"
-        elif distance_type == "<#>":
-            index_method = "vector_ip_ops"
-        elif distance_type == "<=>":
-            index_method = "vector_cosine_ops"
+        if embedding_type == "bit":
+            if distance_type == "<~>":
+                index_method = "bit_hamming_ops"
+            elif distance_type == "<%>":
+                index_method = "bit_jaccard_ops"
+            else:
+                raise ValueError(f"Unknown distance type {distance_type} for bit embeddings")
+        elif embedding_type in ("vector", "halfvec", "sparsevec"):
+            if distance_type == "<->":
+                index_method = f"{embedding_type}_l2_ops"
+            elif distance_type == "<#>":
+                index_method = f"{embedding_type}_ip_ops"
+            elif distance_type == "<=>":
+                index_method = f"{embedding_type}_cosine_ops"
+            else:
+                raise ValueError(f"Unknown distance type {distance_type}")
         else:
-            raise ValueError(f"Unknown distance type {distance_type}")
+            raise ValueError(f"Unknown embedding type {embedding_type}")
         return index_method
 
     def create_index_query(
@@ -122,6 +421,7 @@ class BaseIndex:
         index_name_quoted: str,
         distance_type: str,
         num_records_callback: Callable[[], int],
+        embedding_type: str = "vector",
     ) -> str:
         raise NotImplementedError()
 
@@ -158,8 +458,11 @@ class IvfflatIndex(BaseIndex):
         index_name_quoted: str,
         distance_type: str,
         num_records_callback: Callable[[], int],
+        embedding_type: str = "vector",
     ) -> str:
-        index_method = self.get_index_method(distance_type)
+        if embedding_type == "sparsevec" or distance_type == "<%>":
+            raise ValueError("ivfflat indexes do not support sparsevec embeddings or jaccard distance")
+        index_method = self.get_index_method(distance_type, embedding_type)
         num_lists = self.get_num_lists(num_records_callback)
 
         return (
@@ -183,8 +486,9 @@ class HNSWIndex(BaseIndex):
         index_name_quoted: str,
         distance_type: str,
         _num_records_callback: Callable[[], int],
+        embedding_type: str = "vector",
     ) -> str:
-        index_method = self.get_index_method(distance_type)
+        index_method = self.get_index_method(distance_type, embedding_type)
 
         with_clauses = []
         if self.m is not None:
@@ -229,7 +533,12 @@ class DiskAnnIndex(BaseIndex):
         index_name_quoted: str,
         distance_type: str,
         _num_records_callback: Callable[[], int],
+        embedding_type: str = "vector",
     ) -> str:
+        if embedding_type != "vector":
+            raise ValueError(
+                f"Timescale's vector index only supports vector embeddings, but embedding_type was {embedding_type}"
+            )
         if distance_type != "<=>":
             raise ValueError(
                 f"Timescale's vector index only supports cosine distance, but distance_type was {distance_type}"
@@ -259,6 +568,14 @@ class DiskAnnIndex(BaseIndex):
         )
 
 
+# the setting bounding the number of candidates a scan of each type of index considers, with its default and maximum
+_CANDIDATE_WINDOW_SETTINGS = {
+    "hnsw": ("hnsw.ef_search", 40, 1000),
+    "ivfflat": ("ivfflat.probes", 1, None),
+    "diskann": ("diskann.query_search_list_size", 100, None),
+}
+
+
 class QueryParams:
     def __init__(self, params: dict[str, Any]) -> None:
         self.params = params
@@ -266,6 +583,67 @@ class QueryParams:
     def get_statements(self) -> list[str]:
         return ["SET LOCAL " + key + " = " + str(value) for key, value in self.params.items()]
 
+    def expanded(self, factor: int, index_type: str | None) -> "QueryParams | None":
+        """
+        Returns a copy of the parameters with the candidate window of scans of an `index_type` index ('hnsw',
+        'ivfflat' or 'diskann') multiplied by `factor`: `hnsw.ef_search`, `ivfflat.probes` or
+        `diskann.query_search_list_size` respectively. Returns None if the window cannot grow any further or the
+        index type has none.
+        """
+        if index_type not in _CANDIDATE_WINDOW_SETTINGS:
+            return None
+        key, default, maximum = _CANDIDATE_WINDOW_SETTINGS[index_type]
+        value = self.params.get(key, default)
+        new_value = value * factor if maximum is None else min(value * factor, maximum)
+        if new_value == value:
+            return None
+        return QueryParams({**self.params, key: new_value})
+
+    def widened(self, candidates: int, index_type: str | None) -> "QueryParams":
+        """
+        Returns a copy of the parameters with the candidate window of scans of an `index_type` graph index ('hnsw' or
+        'diskann') raised to at least `candidates` records, within the maximum of the setting. The window of an
+        'ivfflat' index is a number of lists rather than of records, so it is left as is.
+        """
+        if index_type not in ("hnsw", "diskann"):
+            return self
+        key, default, maximum = _CANDIDATE_WINDOW_SETTINGS[index_type]
+        value = self.params.get(key, default)
+        new_value = max(value, candidates if maximum is None else min(candidates, maximum))
+        if new_value == value:
+            return self
+        return QueryParams({**self.params, key: new_value})
+
+
+# the iterative scan that keeps an index scan going past its candidate window, per index type
+_ITERATIVE_SCAN_SETTINGS = {
+    "hnsw": ("hnsw.iterative_scan", "strict_order"),
+    "ivfflat": ("ivfflat.iterative_scan", "relaxed_order"),
+}
+
+
+def _unbounded_stream_params(
+    query_params: QueryParams | None, index_type: str | None, pgvector_version: str
+) -> QueryParams | None:
+    """
+    Returns the parameters of a similarity query without a limit over an `index_type` index. A pgvector index scan
+    only returns its candidate window (`hnsw.ef_search`, `ivfflat.probes`), which would end the stream early, so
+    its iterative scan is turned on unless the parameters already set it. ivfflat only has a relaxed order.
+    Iterative scans need pgvector 0.8; with older versions the stream has to be `exact`.
+    """
+    if index_type not in _ITERATIVE_SCAN_SETTINGS:
+        return query_params
+    key, value = _ITERATIVE_SCAN_SETTINGS[index_type]
+    params = {} if query_params is None else query_params.params
+    if key in params:
+        return query_params
+    if tuple(int(part) for part in pgvector_version.split(".")[:2] if part.isdigit()) < (0, 8):
+        raise ValueError(
+            f"a similarity stream without a limit over a {index_type} index needs the iterative scans of "
+            f"pgvector 0.8 or later (installed: {pgvector_version}), or exact=True"
+        )
+    return QueryParams({**params, key: value})
+
 
 class DiskAnnIndexParams(QueryParams):
     def __init__(self, search_list_size: int | None = None, rescore: int | None = None) -> None:
@@ -278,13 +656,37 @@ class DiskAnnIndexParams(QueryParams):
 
 
 class IvfflatIndexParams(QueryParams):
-    def __init__(self, probes: int) -> None:
-        super().__init__({"ivfflat.probes": probes})
+    def __init__(self, probes: int, iterative_scan: str | None = None) -> None:
+        """
+        Parameters
+        ----------
+        probes
+            The number of lists to search.
+        iterative_scan
+            'relaxed_order' to keep scanning more lists until enough records pass the filters (pgvector 0.8+).
+            Records can come out slightly out of order, which `rerank_factor` corrects.
+        """
+        params: dict[str, Any] = {"ivfflat.probes": probes}
+        if iterative_scan is not None:
+            params["ivfflat.iterative_scan"] = iterative_scan
+        super().__init__(params)
 
 
 class HNSWIndexParams(QueryParams):
-    def __init__(self, ef_search: int) -> None:
-        super().__init__({"hnsw.ef_search": ef_search})
+    def __init__(self, ef_search: int, iterative_scan: str | None = None) -> None:
+        """
+        Parameters
+        ----------
+        ef_search
+            The size of the candidate list.
+        iterative_scan
+            'strict_order' or 'relaxed_order' to keep scanning the graph until enough records pass the filters
+            (pgvector 0.8+).
+        """
+        params: dict[str, Any] = {"hnsw.ef_search": ef_search}
+        if iterative_scan is not None:
+            params["hnsw.iterative_scan"] = iterative_scan
+        super().__init__(params)
 
 
 SEARCH_RESULT_ID_IDX = 0
@@ -292,6 +694,7 @@ SEARCH_RESULT_METADATA_IDX = 1
 SEARCH_RESULT_CONTENTS_IDX = 2
 SEARCH_RESULT_EMBEDDING_IDX = 3
 SEARCH_RESULT_DISTANCE_IDX = 4
+SEARCH_RESULT_COLUMNS = ("id", "metadata", "contents", "embedding", "distance")
 
 
 class UUIDTimeRange:
@@ -373,8 +776,44 @@ class UUIDTimeRange:
 
         return f"UUIDTimeRange {start_str}, {end_str}"
 
-    def build_query(self, params: list) -> tuple[str, list]:
-        column = "uuid_timestamp(id)"
+    def split(self, interval: timedelta, max_slices: int) -> list["UUIDTimeRange"]:
+        """
+        Splits the range into at most `max_slices` consecutive ranges whose inner boundaries are aligned to
+        multiples of `interval` since the Unix epoch, as TimescaleDB aligns the chunks of a hypertable. Each range
+        covers whole chunks except at the ends of this range.
+
+        Returns:
+            List[UUIDTimeRange]: The ranges, in order.
+        """
+        if self.start_date is None or self.end_date is None:
+            raise ValueError("only a range with both a start_date and an end_date can be split")
+        if max_slices < 1:
+            raise ValueError("max_slices must be at least 1")
+        epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+        edges = [self.start_date]
+        boundary = epoch + ((self.start_date - epoch) // interval + 1) * interval
+        while boundary < self.end_date:
+            edges.append(boundary)
+            boundary += interval
+        edges.append(self.end_date)
+
+        num_chunks = len(edges) - 1
+        num_slices = min(max_slices, num_chunks)
+        slices = []
+        for i in range(num_slices):
+            first = i == 0
+            last = i == num_slices - 1
+            slices.append(
+                UUIDTimeRange(
+                    edges[i * num_chunks // num_slices],
+                    edges[(i + 1) * num_chunks // num_slices],
+                    start_inclusive=self.start_inclusive if first else True,
+                    end_inclusive=self.end_inclusive if last else False,
+                )
+            )
+        return slices
+
+    def build_query(self, params: list, column: str = "uuid_timestamp(id)") -> tuple[str, list]:
         queries = []
         if self.start_date is not None:
             if self.start_inclusive:
@@ -491,19 +930,15 @@ class Predicates:
         else:
             return repr(self.clauses)
 
-    def build_query(self, params: list) -> tuple[str, list]:
+    def _shape(self) -> tuple:
         """
-        Build the SQL query string and parameters for the predicates object.
+        Returns the shape of the predicates, everything but the values that determines their SQL. Clauses that are
+        neither Predicates nor tuples are ignored, and kept as None so that the positions of the others stay the same.
         """
-        if not self.clauses:
-            return "", []
-
-        where_conditions = []
-
+        clauses: list[tuple | None] = []
         for clause in self.clauses:
             if isinstance(clause, Predicates):
-                child_where_clause, params = clause.build_query(params)
-                where_conditions.append(f"({child_where_clause})")
+                clauses.append(clause._shape())
             elif isinstance(clause, tuple):
                 if len(clause) == 2:
                     field, value = clause
@@ -516,45 +951,178 @@ class Predicates:
                 else:
                     raise ValueError("Invalid clause format")
 
-                index = len(params) + 1
-                param_name = f"${index}"
-
                 if field == "__uuid_timestamp":
-                    # convert str to timestamp in the database, it's better at it than python
-                    if isinstance(value, str):
-                        where_conditions.append(f"uuid_timestamp(id) {operator} ({param_name}::text)::timestamptz")
-                    else:
-                        where_conditions.append(f"uuid_timestamp(id) {operator} {param_name}")
-                    params.append(value)
-
+                    kind = "uuid_timestamp::text" if isinstance(value, str) else "uuid_timestamp"
                 elif operator == "@>" and (isinstance(value, list) or isinstance(value, tuple)):
                     if len(value) == 0:
                         raise ValueError("Invalid value. Empty lists and empty tuples are not supported.")
-                    json_value = json.dumps(value)
-                    where_conditions.append(f"metadata @> jsonb_build_object('{field}', {param_name}::jsonb)")
-                    params.append(json_value)
-
+                    kind = "jsonb"
+                elif isinstance(value, int):
+                    kind = "::int"
+                elif isinstance(value, float):
+                    kind = "::numeric"
+                elif isinstance(value, datetime):
+                    kind = "::timestamptz"
                 else:
-                    field_cast = ""
-                    if isinstance(value, int):
-                        field_cast = "::int"
-                    elif isinstance(value, float):
-                        field_cast = "::numeric"
-                    elif isinstance(value, datetime):
-                        field_cast = "::timestamptz"
-                    where_conditions.append(f"(metadata->>'{field}'){field_cast} {operator} {param_name}")
-                    params.append(value)
-
-        if self.operator == "NOT":
-            or_clauses = (" OR ").join(where_conditions)
-            # use IS DISTINCT FROM to treat all-null clauses as False and pass the filter
-            where_clause = f"TRUE IS DISTINCT FROM ({or_clauses})"
-        else:
-            where_clause = (" " + self.operator + " ").join(where_conditions)
+                    kind = ""
+                clauses.append((field, operator, kind))
+            else:
+                clauses.append(None)
+        return (self.operator, tuple(clauses))
+
+    def compile(self, indexed_columns: tuple = ()) -> "CompiledPredicates":
+        """
+        Compiles the predicates to a SQL template that is shared by all predicates of the same shape, i.e. with the
+        same fields, operators and value types, and only differ in their values. The shape is taken from the
+        clauses on every call, so clauses added to nested predicates after combining them are taken into account.
+
+        Parameters
+        ----------
+        indexed_columns
+            The generated columns of indexed metadata fields that clauses target instead of the metadata, as
+            `QueryBuilder.indexed_columns`.
+
+        Returns
+        -------
+            The compiled predicates.
+        """
+        return _compile_predicates(self._shape(), indexed_columns)
+
+    def build_query(self, params: list, indexed_columns: tuple = ()) -> tuple[str, list]:
+        """
+        Build the SQL query string and parameters for the predicates object.
+        """
+        if not self.clauses:
+            return "", []
+
+        compiled = self.compile(indexed_columns)
+        where_clause = compiled.sql(len(params) + 1)
+        params.extend(compiled.parameters(self))
         return where_clause, params
 
 
+class CompiledPredicates:
+    def __init__(
+        self,
+        shape: tuple,
+        fragments: tuple[str, ...],
+        getters: tuple[tuple[tuple[int, ...], int, Callable | None], ...],
+    ) -> None:
+        """
+        The SQL template of a predicate shape. The template is rendered once for each number of its first parameter,
+        so the where clause of predicates with a known shape is built by binding their values only.
+
+        Parameters
+        ----------
+        shape
+            The shape of the predicates.
+        fragments
+            The SQL around the parameters of the template, one more than there are parameters.
+        getters
+            For each parameter, the positions of the nested Predicates holding its clause, the position of the clause
+            in them and the conversion of its value (or None).
+        """
+        self.shape = shape
+        self.fragments = fragments
+        self.num_params = len(fragments) - 1
+        self._getters = getters
+        self._rendered: dict[int, str] = {}
+
+    def sql(self, start: int = 1) -> str:
+        """
+        Returns the SQL of the template with its parameters numbered from `$start`.
+        """
+        rendered = self._rendered.get(start)
+        if rendered is None:
+            parts = [self.fragments[0]]
+            for offset, fragment in enumerate(self.fragments[1:]):
+                parts.append(f"${start + offset}")
+                parts.append(fragment)
+            rendered = "".join(parts)
+            self._rendered[start] = rendered
+        return rendered
+
+    def parameters(self, predicates: Predicates) -> list:
+        """
+        Returns the values of predicates of this shape in the order of the parameters of the template. The shape is
+        not checked, use the `compile` of the predicates to get their template.
+        """
+        values = []
+        for path, index, convert in self._getters:
+            clauses = predicates.clauses
+            for position in path:
+                clauses = clauses[position].clauses
+            value = clauses[index][-1]
+            values.append(value if convert is None else convert(value))
+        return values
+
+    def __repr__(self) -> str:
+        return f"CompiledPredicates({self.sql()!r})"
+
+
+def _predicate_fragments(
+    shape: tuple,
+    fragments: list[str],
+    getters: list[tuple[tuple[int, ...], int, Callable | None]],
+    columns: dict[tuple[str, str], str],
+    path: tuple[int, ...] = (),
+) -> None:
+    operator, clauses = shape
+    if operator == "NOT":
+        # use IS DISTINCT FROM to treat all-null clauses as False and pass the filter
+        fragments[-1] += "TRUE IS DISTINCT FROM ("
+        separator = " OR "
+    else:
+        separator = f" {operator} "
+
+    first = True
+    for index, clause in enumerate(clauses):
+        if clause is None:
+            continue
+        if not first:
+            fragments[-1] += separator
+        first = False
+        if len(clause) == 2:
+            fragments[-1] += "("
+            _predicate_fragments(clause, fragments, getters, columns, path + (index,))
+            fragments[-1] += ")"
+            continue
+
+        field, operator_sql, kind = clause
+        getters.append((path, index, json.dumps if kind == "jsonb" else None))
+        if kind == "uuid_timestamp::text":
+            # convert str to timestamp in the database, it's better at it than python
+            target = columns.get((field, "uuid_timestamp"), "uuid_timestamp(id)")
+            fragments[-1] += f"{target} {operator_sql} ("
+            fragments.append("::text)::timestamptz")
+        elif kind == "uuid_timestamp":
+            target = columns.get((field, "uuid_timestamp"), "uuid_timestamp(id)")
+            fragments[-1] += f"{target} {operator_sql} "
+            fragments.append("")
+        elif kind == "jsonb":
+            fragments[-1] += f"metadata @> jsonb_build_object('{field}', "
+            fragments.append("::jsonb)")
+        else:
+            target = columns.get((field, kind), f"(metadata->>'{field}'){kind}")
+            fragments[-1] += f"{target} {operator_sql} "
+            fragments.append("")
+
+    if operator == "NOT":
+        fragments[-1] += ")"
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_predicates(shape: tuple, indexed_columns: tuple = ()) -> CompiledPredicates:
+    fragments = [""]
+    getters: list[tuple[tuple[int, ...], int, Callable | None]] = []
+    _predicate_fragments(shape, fragments, getters, dict(indexed_columns))
+    return CompiledPredicates(shape, tuple(fragments), tuple(getters))
+
+
 class QueryBuilder:
+    # the casts Predicates applies to values of each type of indexed metadata field
+    INDEXED_FIELD_CASTS = {"int": "::int", "numeric": "::numeric", "timestamptz": "::timestamptz", "text": ""}
+
     def __init__(
         self,
         table_name: str,
@@ -564,6 +1132,9 @@ class QueryBuilder:
         time_partition_interval: timedelta | None,
         infer_filters: bool,
         schema_name: str | None,
+        embedding_type: str = "vector",
+        text_search_config: str | None = None,
+        indexed_metadata_fields: dict[str, str] | None = None,
     ) -> None:
         """
         Initializes a base Vector object to generate queries for vector clients.
@@ -584,6 +1155,16 @@ class QueryBuilder:
             Whether to infer start and end times from the special __start_date and __end_date filters.
         schema_name
             The schema name for the table (optional, uses the database's default schema if not specified).
+        embedding_type
+            The type of the embedding column. Can be 'vector', 'halfvec' (half precision), 'sparsevec' or 'bit'.
+        text_search_config
+            The text search configuration (e.g. 'english') of a generated tsvector column over the contents, used by
+            hybrid search. No such column is created if None.
+        indexed_metadata_fields
+            The metadata fields kept in generated columns with btree indexes, mapped to their type: 'int', 'numeric',
+            'timestamptz' or 'text'. Predicates on a field with values of the matching type (int, float, datetime or
+            str) target the column. The special '__uuid_timestamp' field, typed 'timestamptz', indexes the timestamp
+            of the ids for tables that are not hypertables, and is targeted by UUIDTimeRange filters too.
         """
         self.table_name = table_name
         self.schema_name = schema_name
@@ -592,9 +1173,22 @@ class QueryBuilder:
             self.distance_type = "<=>"
         elif distance_type == "euclidean" or distance_type == "<->" or distance_type == "l2":
             self.distance_type = "<->"
+        elif distance_type == "hamming" or distance_type == "<~>":
+            self.distance_type = "<~>"
+        elif distance_type == "jaccard" or distance_type == "<%>":
+            self.distance_type = "<%>"
         else:
             raise ValueError(f"unrecognized distance_type {distance_type}")
 
+        if embedding_type.lower() not in ("vector", "halfvec", "sparsevec", "bit"):
+            raise ValueError(f"unrecognized embedding_type {embedding_type}")
+        self.embedding_type = embedding_type.lower()
+        if (self.embedding_type == "bit") != (self.distance_type in ("<~>", "<%>")):
+            raise ValueError(
+                f"distance_type {distance_type} is not supported for embedding_type {embedding_type}, "
+                "bit embeddings use hamming or jaccard distance"
+            )
+
         if id_type.lower() != "uuid" and id_type.lower() != "text":
             raise ValueError(f"unrecognized id_type {id_type}")
 
@@ -604,6 +1198,24 @@ class QueryBuilder:
         self.id_type = id_type.lower()
         self.time_partition_interval = time_partition_interval
         self.infer_filters = infer_filters
+        self.text_search_config = text_search_config
+
+        self.indexed_metadata_fields = dict(indexed_metadata_fields or {})
+        indexed_columns = {}
+        for field, field_type in self.indexed_metadata_fields.items():
+            if field_type not in self.INDEXED_FIELD_CASTS:
+                raise ValueError(f"unrecognized type {field_type} of indexed metadata field {field}")
+            if field == "__uuid_timestamp":
+                if field_type != "timestamptz" or self.id_type != "uuid":
+                    raise ValueError("__uuid_timestamp can only be indexed as timestamptz with the uuid id_type")
+                if time_partition_interval is not None:
+                    raise ValueError("__uuid_timestamp is already indexed by the partitioning of hypertables")
+                indexed_columns[(field, "uuid_timestamp")] = self._quote_ident(self._indexed_column_name(field))
+            else:
+                cast = self.INDEXED_FIELD_CASTS[field_type]
+                indexed_columns[(field, cast)] = self._quote_ident(self._indexed_column_name(field))
+        self.indexed_columns = tuple(sorted(indexed_columns.items()))
+        self._uuid_timestamp_column = indexed_columns.get(("__uuid_timestamp", "uuid_timestamp"), "uuid_timestamp(id)")
 
     @staticmethod
     def _quote_ident(ident):
@@ -627,6 +1239,16 @@ class QueryBuilder:
         else:
             return self._quote_ident(self.table_name)
 
+    def get_embedding_column_type(self):
+        """
+        Returns the type of the embedding column, including the number of dimensions.
+
+        Returns
+        -------
+            str: The column type.
+        """
+        return f"{self.embedding_type.upper()}({self.num_dimensions})"
+
     def get_row_exists_query(self):
         """
         Generates a query to check if any rows exist in the table.
@@ -637,15 +1259,172 @@ class QueryBuilder:
         """
         return f"SELECT 1 FROM {self._quoted_table_name()} LIMIT 1"
 
-    def get_upsert_query(self):
+    @staticmethod
+    def _on_conflict_clause(on_conflict: str):
+        """
+        Generates the conflict handling of an upsert into the table aliased as `t`. With 'nothing' existing rows
+        are left as they are. With 'update' existing rows are overwritten, but only if the metadata, contents or
+        embedding changed, so unchanged rows are not rewritten.
+        """
+        if on_conflict == "nothing":
+            return "ON CONFLICT DO NOTHING"
+        if on_conflict == "update":
+            return (
+                "ON CONFLICT (id) DO UPDATE SET "
+                "metadata = EXCLUDED.metadata, contents = EXCLUDED.contents, embedding = EXCLUDED.embedding "
+                "WHERE (t.metadata, t.contents, t.embedding) "
+                "IS DISTINCT FROM (EXCLUDED.metadata, EXCLUDED.contents, EXCLUDED.embedding)"
+            )
+        raise ValueError(f"unrecognized on_conflict {on_conflict}")
+
+    def get_upsert_query(self, on_conflict: str = "nothing"):
         """
         Generates an upsert query.
 
+        Parameters
+        ----------
+        on_conflict
+            Either 'nothing' to keep existing rows, or 'update' to overwrite existing rows that changed.
+
+        Returns
+        -------
+            str: The upsert query.
+        """
+        return (
+            f"INSERT INTO {self._quoted_table_name()} AS t (id, metadata, contents, embedding) "
+            f"VALUES ($1, $2, $3, $4) {self._on_conflict_clause(on_conflict)}"
+        )
+
+    def get_staging_table_name(self):
+        """
+        Returns the unquoted name of the temporary table used to stage bulk upserts.
+
+        Returns
+        -------
+            str: The staging table name.
+        """
+        return self.table_name + "_staging"
+
+    def get_create_staging_table_query(self):
+        """
+        Generates a query to create a temporary staging table for bulk upserts. The table is dropped at
+        the end of the transaction. Metadata is staged as text so that it can be loaded with binary COPY. The
+        `seq` identity column numbers the rows in the order they are loaded.
+
+        Returns
+        -------
+            str: The staging table creation query.
+        """
+        return (
+            f"CREATE TEMP TABLE {self._quote_ident(self.get_staging_table_name())} "
+            f"(id {self.id_type}, metadata TEXT, contents TEXT, embedding {self.get_embedding_column_type()}, "
+            "seq BIGINT GENERATED ALWAYS AS IDENTITY) ON COMMIT DROP"
+        )
+
+    def get_merge_staging_query(self, on_conflict: str = "nothing"):
+        """
+        Generates a query to merge the staging table into the main table. Uses the same conflict
+        handling as `get_upsert_query`. If an id is staged more than once, the row staged first is used with
+        'nothing', as a multi-row insert keeps the first, and the row staged last with 'update'.
+        The query returns a single row with the number of rows inserted and the number of rows updated.
+
+        Parameters
+        ----------
+        on_conflict
+            Either 'nothing' to keep existing rows, or 'update' to overwrite existing rows that changed.
+
+        Returns
+        -------
+            str: The merge query.
+        """
+        staged_order = "seq DESC" if on_conflict == "update" else "seq"
+        return (
+            f"WITH merged AS (INSERT INTO {self._quoted_table_name()} AS t (id, metadata, contents, embedding) "
+            "SELECT DISTINCT ON (id) id, metadata::jsonb, contents, embedding "
+            f"FROM {self._quote_ident(self.get_staging_table_name())} ORDER BY id, {staged_order} "
+            f"{self._on_conflict_clause(on_conflict)} RETURNING (xmax = 0) AS inserted) "
+            "SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM merged"
+        )
+
+    def get_copy_staging_query(self, columns: list[str], binary: bool = False):
+        """
+        Generates a query to load the staging table with COPY from the client.
+
+        Parameters
+        ----------
+        columns
+            The staging table columns being loaded.
+        binary
+            Whether the data is sent in the binary COPY format instead of the text format.
+
+        Returns
+        -------
+            str: The COPY query.
+        """
+        column_list = ", ".join(self._quote_ident(column) for column in columns)
+        query = f"COPY {self._quote_ident(self.get_staging_table_name())} ({column_list}) FROM STDIN"
+        if binary:
+            query += " WITH (FORMAT binary)"
+        return query
+
+    def get_upsert_values_query(self, on_conflict: str = "nothing"):
+        """
+        Generates a multi-row upsert query. The single parameter stands for the whole list of rows
+        (e.g. as expanded by psycopg2's `execute_values`). The query returns one row per row written,
+        with a boolean that is true for inserted rows and false for updated rows.
+
+        Parameters
+        ----------
+        on_conflict
+            Either 'nothing' to keep existing rows, or 'update' to overwrite existing rows that changed.
+
         Returns
         -------
             str: The upsert query.
         """
-        return f"INSERT INTO {self._quoted_table_name()} (id, metadata, contents, embedding) VALUES ($1, $2, $3, $4) ON CONFLICT DO NOTHING"
+        return (
+            f"INSERT INTO {self._quoted_table_name()} AS t (id, metadata, contents, embedding) VALUES $1 "
+            f"{self._on_conflict_clause(on_conflict)} RETURNING (xmax = 0)"
+        )
+
+    def get_create_id_staging_table_query(self):
+        """
+        Generates a query to create a temporary staging table holding ids for bulk deletes. The table is
+        dropped at the end of the transaction.
+
+        Returns
+        -------
+            str: The staging table creation query.
+        """
+        staging_table_name = self._quote_ident(self.get_staging_table_name())
+        return f"CREATE TEMP TABLE {staging_table_name} (id {self.id_type}) ON COMMIT DROP"
+
+    def delete_by_ids_values_query(self):
+        """
+        Generates a multi-row delete by id query. The single parameter stands for the whole list of ids
+        (e.g. as expanded by psycopg2's `execute_values`).
+
+        Returns
+        -------
+            str: The delete query.
+        """
+        return (
+            f"DELETE FROM {self._quoted_table_name()} "
+            f"WHERE id IN (SELECT v.id::{self.id_type} FROM (VALUES $1) AS v(id))"
+        )
+
+    def delete_by_ids_staging_query(self):
+        """
+        Generates a query that deletes all rows whose id is in the id staging table.
+
+        Returns
+        -------
+            str: The delete query.
+        """
+        return (
+            f"DELETE FROM {self._quoted_table_name()} AS t "
+            f"USING {self._quote_ident(self.get_staging_table_name())} AS s WHERE t.id = s.id"
+        )
 
     def get_approx_count_query(self):
         """
@@ -672,33 +1451,7 @@ class QueryBuilder:
             hypertable_sql = f"""
                 CREATE EXTENSION IF NOT EXISTS timescaledb;
 
-                CREATE OR REPLACE FUNCTION public.uuid_timestamp(uuid UUID) RETURNS TIMESTAMPTZ AS $$
-                DECLARE
-                bytes bytea;
-                BEGIN
-                bytes := uuid_send(uuid);
-                if  (get_byte(bytes, 6) >> 4)::int2 != 1 then
-                    RAISE EXCEPTION 'UUID version is not 1';
-                end if;
-                RETURN to_timestamp(
-                            (
-                                (
-                                (get_byte(bytes, 0)::bigint << 24) |
-                                (get_byte(bytes, 1)::bigint << 16) |
-                                (get_byte(bytes, 2)::bigint <<  8) |
-                                (get_byte(bytes, 3)::bigint <<  0)
-                                ) + (
-                                ((get_byte(bytes, 4)::bigint << 8 |
-                                get_byte(bytes, 5)::bigint)) << 32
-                                ) + (
-                                (((get_byte(bytes, 6)::bigint & 15) << 8 | get_byte(bytes, 7)::bigint) & 4095) << 48
-                                ) - 122192928000000000
-                            ) / 10000 / 1000::double precision
-                        );
-                END
-                $$ LANGUAGE plpgsql
-                IMMUTABLE PARALLEL SAFE
-                RETURNS NULL ON NULL INPUT;
+                {self._get_uuid_timestamp_function_query()}
 
                 SELECT create_hypertable('{self._quoted_table_name()}', 
                     'id', 
@@ -715,20 +1468,143 @@ CREATE TABLE IF NOT EXISTS {table_name} (
     id {id_type} PRIMARY KEY,
     metadata JSONB,
     contents TEXT,
-    embedding VECTOR({dimensions})
+    embedding {embedding_type}
 );
 
 CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} USING GIN(metadata jsonb_path_ops);
 
+{text_search_sql}
+
+{indexed_fields_sql}
+
 {hypertable_sql}
 """.format(
             table_name=self._quoted_table_name(),
             id_type=self.id_type,
             index_name=self._quote_ident(self.table_name + "_meta_idx"),
-            dimensions=self.num_dimensions,
+            embedding_type=self.get_embedding_column_type(),
+            text_search_sql=self._get_text_search_column_query(),
+            indexed_fields_sql=self._get_indexed_fields_query(),
             hypertable_sql=hypertable_sql,
         )
 
+    def _get_uuid_timestamp_function_query(self) -> str:
+        """
+        Generates the statement creating the uuid_timestamp function, which extracts the timestamp of a UUID
+        Version 1.
+        """
+        return """
+                CREATE OR REPLACE FUNCTION public.uuid_timestamp(uuid UUID) RETURNS TIMESTAMPTZ AS $$
+                DECLARE
+                bytes bytea;
+                BEGIN
+                bytes := uuid_send(uuid);
+                if  (get_byte(bytes, 6) >> 4)::int2 != 1 then
+                    RAISE EXCEPTION 'UUID version is not 1';
+                end if;
+                RETURN to_timestamp(
+                            (
+                                (
+                                (get_byte(bytes, 0)::bigint << 24) |
+                                (get_byte(bytes, 1)::bigint << 16) |
+                                (get_byte(bytes, 2)::bigint <<  8) |
+                                (get_byte(bytes, 3)::bigint <<  0)
+                                ) + (
+                                ((get_byte(bytes, 4)::bigint << 8 |
+                                get_byte(bytes, 5)::bigint)) << 32
+                                ) + (
+                                (((get_byte(bytes, 6)::bigint & 15) << 8 | get_byte(bytes, 7)::bigint) & 4095) << 48
+                                ) - 122192928000000000
+                            ) / 10000 / 1000::double precision
+                        );
+                END
+                $$ LANGUAGE plpgsql
+                IMMUTABLE PARALLEL SAFE
+                RETURNS NULL ON NULL INPUT;
+"""
+
+    def _text_search_config_literal(self) -> str:
+        return "'{}'::regconfig".format(self.text_search_config.replace("'", "''"))
+
+    def _get_text_search_column_query(self) -> str:
+        """
+        Generates the statements adding the generated tsvector column over the contents and its GIN index, if
+        a text search configuration is set. The column is added to existing tables too.
+        """
+        if self.text_search_config is None:
+            return ""
+        return f"""
+ALTER TABLE {self._quoted_table_name()} ADD COLUMN IF NOT EXISTS contents_tsv TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector({self._text_search_config_literal()}, coalesce(contents, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS {self._quote_ident(self.table_name + "_contents_tsv_idx")}
+    ON {self._quoted_table_name()} USING GIN(contents_tsv);
+"""
+
+    def _indexed_column_name(self, field: str) -> str:
+        if field == "__uuid_timestamp":
+            return "id_timestamp"
+        return "metadata_" + field
+
+    def _get_indexed_fields_query(self) -> str:
+        """
+        Generates the statements adding the generated columns of the indexed metadata fields and their btree
+        indexes. The columns are added to existing tables too.
+
+        Generated columns only allow immutable expressions, while casting text to timestamptz depends on the
+        session's TimeZone and DateStyle. So timestamptz fields are parsed by a function that only accepts ISO 8601
+        timestamps (as written by `datetime.isoformat`) and reads those without a time zone offset as UTC.
+        """
+        statements = []
+        for field, field_type in self.indexed_metadata_fields.items():
+            column = self._indexed_column_name(field)
+            field_literal = "'{}'".format(field.replace("'", "''"))
+            if field == "__uuid_timestamp":
+                statements.append(self._get_uuid_timestamp_function_query())
+                expression = "public.uuid_timestamp(id)"
+            elif field_type == "timestamptz":
+                statements.append(
+                    """
+CREATE OR REPLACE FUNCTION public.timescale_vector_timestamptz(value TEXT) RETURNS TIMESTAMPTZ AS $$
+DECLARE
+    parts TEXT[] := regexp_match(
+        value,
+        '^([0-9]{4})-([0-9]{2})-([0-9]{2})(?:[Tt ]([0-9]{2}):([0-9]{2})(?::([0-9]{2}(?:[.][0-9]+)?))?)?'
+        '(?:([Zz])|([+-])([0-9]{2})(?::?([0-9]{2}))?)?$'
+    );
+    utc_offset INTERVAL := interval '0';
+BEGIN
+    IF parts IS NULL THEN
+        RAISE EXCEPTION 'invalid ISO 8601 timestamp: "%"', value USING ERRCODE = 'invalid_datetime_format';
+    END IF;
+    IF parts[8] IS NOT NULL THEN
+        utc_offset := make_interval(hours => parts[9]::int, mins => coalesce(parts[10], '0')::int);
+        IF parts[8] = '-' THEN
+            utc_offset := -utc_offset;
+        END IF;
+    END IF;
+    RETURN (make_timestamp(
+        parts[1]::int, parts[2]::int, parts[3]::int,
+        coalesce(parts[4], '0')::int, coalesce(parts[5], '0')::int, coalesce(parts[6], '0')::double precision
+    ) - utc_offset) AT TIME ZONE 'UTC';
+END
+$$ LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE RETURNS NULL ON NULL INPUT;
+"""
+                )
+                expression = f"public.timescale_vector_timestamptz(metadata->>{field_literal})"
+            else:
+                expression = f"(metadata->>{field_literal}){self.INDEXED_FIELD_CASTS[field_type]}"
+            statements.append(
+                f"""
+ALTER TABLE {self._quoted_table_name()} ADD COLUMN IF NOT EXISTS {self._quote_ident(column)} {field_type.upper()}
+    GENERATED ALWAYS AS ({expression}) STORED;
+
+CREATE INDEX IF NOT EXISTS {self._quote_ident(self.table_name + "_" + column + "_idx")}
+    ON {self._quoted_table_name()} ({self._quote_ident(column)});
+"""
+            )
+        return "".join(statements)
+
     def _get_embedding_index_name_quoted(self):
         return self._quote_ident(self.table_name + "_embedding_idx")
 
@@ -757,6 +1633,21 @@ CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} USING GIN(metadata jsonb
     def drop_table_query(self):
         return f"DROP TABLE IF EXISTS {self._quoted_table_name()};"
 
+    def get_pgvector_version_query(self) -> str:
+        """
+        Generates a query to get the installed version of the pgvector extension, no row if it is not installed.
+        """
+        return "SELECT extversion FROM pg_extension WHERE extname = 'vector'"
+
+    def get_embedding_index_type_query(self) -> tuple[str, list]:
+        """
+        Generates a query to get the access method (e.g. 'hnsw') of the embedding index, NULL if there is none.
+        """
+        query = (
+            "SELECT (SELECT am.amname FROM pg_class c JOIN pg_am am ON am.oid = c.relam WHERE c.oid = to_regclass($1))"
+        )
+        return (query, [self._get_schema_qualified_embedding_index_name_quoted()])
+
     def default_max_db_connection_query(self):
         """
         Generates a query to get the default max db connections. This uses a heuristic to determine the max connections based on the max_connections setting in postgres
@@ -787,6 +1678,7 @@ CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} USING GIN(metadata jsonb
             index_name_quoted,
             self.distance_type,
             num_records_callback,
+            embedding_type=self.embedding_type,
         )
         return query
 
@@ -798,12 +1690,12 @@ CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} USING GIN(metadata jsonb
 
         if isinstance(filter, dict):
             where = f"metadata @> ${len(params)+1}"
-            json_object = json.dumps(filter)
+            json_object = json.dumps(filter, sort_keys=True)
             params = params + [json_object]
         elif isinstance(filter, list):
             any_params = []
             for idx, filter_dict in enumerate(filter, start=len(params) + 1):
-                any_params.append(json.dumps(filter_dict))
+                any_params.append(json.dumps(filter_dict, sort_keys=True))
             where = f"metadata @> ANY(${len(params) + 1}::jsonb[])"
             params = params + [any_params]
         else:
@@ -818,22 +1710,356 @@ CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} USING GIN(metadata jsonb
         filter: dict[str, str] | list[dict[str, str]] | None = None,
         predicates: Predicates | None = None,
         uuid_time_filter: UUIDTimeRange | None = None,
+        include: Iterable[str] | None = None,
+        metadata_as_text: bool = False,
+        rerank_factor: int | None = None,
+        search_after: tuple[float, list[str], int] | None = None,
+        max_distance: float | None = None,
+        group_by: str | None = None,
+        per_group: int = 1,
+        groups: int | None = None,
+        recency_weight: float | None = None,
+        half_life: timedelta | None = None,
+        exact: bool = False,
     ) -> tuple[str, list]:
         """
-        Generates a similarity query.
+        Generates a similarity query. All values, including the limit, are passed as parameters, so the query
+        text only depends on the structure of the filters and can be prepared once and reused.
+
+        The result always has the columns of `SEARCH_RESULT_COLUMNS`. Columns that are not in `include` are
+        returned as NULL, so they are neither read nor sent. With `metadata_as_text` the metadata is returned as
+        JSON text instead of jsonb, leaving the decoding to the caller.
+
+        With `rerank_factor`, `limit * rerank_factor` candidates are taken from the index in its (approximate)
+        order and sorted again by their exact distance, computed from the stored embeddings, before the first
+        `limit` are returned.
+
+        With `search_after`, a (distance, ids, count) triple from a page token, only the records after the previous
+        page are returned: those farther than the distance, and those at the distance that are not among the ids
+        (ties already returned). The condition filters the rows coming out of the ordered index scan, so a page
+        still walks all the neighbours of the earlier pages, and an index scan that stops after its candidate
+        window (e.g. HNSW without an iterative scan, after `ef_search` records) returns short or empty pages
+        beyond it. The clients raise the window to the `count` records of the earlier pages plus the limit.
+
+        With `max_distance`, only the records within that distance are returned. The threshold is a filter on the
+        ordered index scan, so the index is still used as long as there is a limit.
+
+        With `group_by`, the `limit` nearest records are grouped by the value of that metadata field with window
+        functions, and the `per_group` nearest records of the `groups` nearest groups (all of them if None) are
+        returned. Groups are ranked by their nearest record. The result has an additional `group_key` column and is
+        ordered by group, then by distance.
+
+        With `recency_weight`, the candidates (`limit * rerank_factor` of them, or `4 * limit` without
+        `rerank_factor`) are ordered by `distance - recency_weight * 0.5 ^ (age / half_life)` instead, where the age
+        is the time since the UUID v1 timestamp of the id, read from the indexed `__uuid_timestamp` column if there
+        is one. The table must be partitioned by time or index `__uuid_timestamp`, so that `uuid_timestamp` exists.
+
+        With `exact`, the records are ordered by an expression that the embedding index cannot provide, so they are
+        sorted exactly after a full scan, while other indexes can still serve the filters.
 
         Returns:
             Tuple[str, List]: A tuple containing the query and parameters.
         """
         params: list[Any] = []
         if query_embedding is not None:
-            distance = f"embedding {self.distance_type} ${len(params)+1}"
+            distance = f"embedding {self.distance_type} ${len(params)+1}::{self.get_embedding_column_type()}"
             params = params + [query_embedding]
-            order_by_clause = f"ORDER BY {distance} ASC"
+            order_by_clause = f"ORDER BY ({distance}) + 0 ASC" if exact else f"ORDER BY {distance} ASC"
         else:
             distance = "-1.0"
             order_by_clause = ""
 
+        (where, params) = self._search_where_clause(params, filter, predicates, uuid_time_filter)
+        if max_distance is not None:
+            if query_embedding is None:
+                raise ValueError("max_distance requires a query embedding")
+            where = f"({where}) AND {distance} <= ${len(params)+1}"
+            params = params + [max_distance]
+        if search_after is not None:
+            if query_embedding is None:
+                raise ValueError("search_after requires a query embedding")
+            distance_param = f"${len(params)+1}"
+            ids_param = f"${len(params)+2}::{self.id_type}[]"
+            where = (
+                f"({where}) AND {distance} >= {distance_param} "
+                f"AND NOT ({distance} = {distance_param} AND id = ANY({ids_param}))"
+            )
+            params = params + [search_after[0], search_after[1]]
+        limit_param = f"${len(params)+1}"
+        params = params + [limit]
+
+        if recency_weight is not None:
+            if query_embedding is None or half_life is None or self.id_type != "uuid":
+                raise ValueError("recency_weight requires a query embedding, a half_life and uuid ids")
+            if search_after is not None:
+                raise ValueError("recency_weight cannot be combined with search_after")
+            if self.time_partition_interval is None and "__uuid_timestamp" not in self.indexed_metadata_fields:
+                raise ValueError(
+                    "recency_weight requires a table partitioned by time or an indexed __uuid_timestamp field"
+                )
+
+        if group_by is not None:
+            if rerank_factor is not None or search_after is not None or recency_weight is not None:
+                raise ValueError("group_by cannot be combined with rerank_factor, search_after or recency_weight")
+            if per_group < 1:
+                raise ValueError("per_group must be at least 1")
+            group_by_param = f"${len(params)+1}"
+            per_group_param = f"${len(params)+2}"
+            groups_param = f"${len(params)+3}"
+            # there are at most `limit` groups among the candidates
+            params = params + [group_by, per_group, limit if groups is None else groups]
+            return (
+                f"""
+        SELECT
+            {", ".join(SEARCH_RESULT_COLUMNS)}, group_key
+        FROM (
+            SELECT *, dense_rank() OVER (ORDER BY group_distance, group_key) AS group_idx
+            FROM (
+                SELECT
+                    *,
+                    row_number() OVER (PARTITION BY group_key ORDER BY exact_distance) AS group_rank,
+                    min(exact_distance) OVER (PARTITION BY group_key) AS group_distance
+                FROM (
+                    SELECT
+                        {self._search_select_list(include, distance, metadata_as_text)},
+                        metadata->>{group_by_param} AS group_key,
+                        {distance} AS exact_distance
+                    FROM
+                       {self._quoted_table_name()}
+                    WHERE
+                       {where}
+                    {order_by_clause}
+                    LIMIT {limit_param}
+                ) AS candidates
+            ) AS ranked
+            WHERE group_rank <= {per_group_param}
+        ) AS grouped
+        WHERE group_idx <= {groups_param}
+        ORDER BY group_idx, group_rank
+        """,
+                params,
+            )
+
+        if (rerank_factor is not None or recency_weight is not None) and query_embedding is not None:
+            if rerank_factor is not None and rerank_factor < 1:
+                raise ValueError("rerank_factor must be at least 1")
+            candidates_param = f"${len(params)+1}"
+            params = params + [limit * (4 if rerank_factor is None else rerank_factor)]
+            candidate_columns = f"{distance} AS exact_distance"
+            order_by = "exact_distance"
+            if recency_weight is not None:
+                # exponential decay with the age of the record, 1 for a new record and 0.5 after half_life
+                candidate_columns += f", {self._uuid_timestamp_column} AS id_time"
+                order_by = (
+                    f"exact_distance - ${len(params)+1}::float8 * "
+                    f"power(0.5, extract(epoch FROM now() - id_time) / ${len(params)+2}::float8)"
+                )
+                params = params + [recency_weight, half_life.total_seconds()]
+            return (
+                f"""
+        SELECT
+            {", ".join(SEARCH_RESULT_COLUMNS)}
+        FROM (
+            SELECT
+                {self._search_select_list(include, distance, metadata_as_text)}, {candidate_columns}
+            FROM
+               {self._quoted_table_name()}
+            WHERE
+               {where}
+            {order_by_clause}
+            LIMIT {candidates_param}
+        ) AS candidates
+        ORDER BY {order_by} ASC
+        LIMIT {limit_param}
+        """,
+                params,
+            )
+
+        query = f"""
+        SELECT
+            {self._search_select_list(include, distance, metadata_as_text)}
+        FROM
+           {self._quoted_table_name()}
+        WHERE 
+           {where}
+        {order_by_clause}
+        LIMIT {limit_param}
+        """
+        return (query, params)
+
+    def hybrid_search_query(
+        self,
+        query_text: str,
+        query_embedding: list[float] | np.ndarray,
+        limit: int = 10,
+        filter: dict[str, str] | list[dict[str, str]] | None = None,
+        predicates: Predicates | None = None,
+        uuid_time_filter: UUIDTimeRange | None = None,
+        fusion: str = "rrf",
+        rrf_k: int = 60,
+        vector_weight: float = 0.5,
+        num_candidates: int | None = None,
+        include: Iterable[str] | None = None,
+    ) -> tuple[str, list]:
+        """
+        Generates a hybrid search query. The `num_candidates` nearest records and the `num_candidates` records
+        best matching `query_text` (by `ts_rank_cd` over the tsvector column) are fused into a single ranking:
+
+        - 'rrf' (reciprocal rank fusion) scores a record with the sum of 1 / (rrf_k + rank) over both rankings.
+        - 'weighted' scores it with `vector_weight` times its min-max normalized similarity plus
+          1 - `vector_weight` times its text rank divided by the best text rank.
+
+        Records missing from one of the rankings get nothing from it. The result has the columns of
+        `SEARCH_RESULT_COLUMNS` followed by `score`, ordered by descending score. The distance is NULL for records
+        only found by the text search.
+
+        Returns:
+            Tuple[str, List]: A tuple containing the query and parameters.
+        """
+        if self.text_search_config is None:
+            raise ValueError("hybrid search requires a text_search_config")
+        if fusion not in ("rrf", "weighted"):
+            raise ValueError(f"unrecognized fusion {fusion}")
+        if num_candidates is None:
+            num_candidates = 4 * limit
+
+        params: list[Any] = [query_embedding, query_text]
+        distance = f"embedding {self.distance_type} $1::{self.get_embedding_column_type()}"
+        (where, params) = self._search_where_clause(params, filter, predicates, uuid_time_filter)
+        candidates_param = f"${len(params)+1}"
+        fusion_param = f"${len(params)+2}::float8"
+        limit_param = f"${len(params)+3}"
+        if fusion == "rrf":
+            params = params + [num_candidates, rrf_k, limit]
+            score = f"coalesce(1.0 / ({fusion_param} + v.rank), 0.0) + coalesce(1.0 / ({fusion_param} + t.rank), 0.0)"
+        else:
+            params = params + [num_candidates, vector_weight, limit]
+            score = (
+                f"{fusion_param} * coalesce(v.norm_score, 0.0) + (1.0 - {fusion_param}) * coalesce(t.norm_score, 0.0)"
+            )
+
+        query = f"""
+        WITH vector_search AS (
+            SELECT
+                id, distance, row_number() OVER (ORDER BY distance) AS rank,
+                coalesce(
+                    (max(distance) OVER () - distance) / nullif(max(distance) OVER () - min(distance) OVER (), 0), 1.0
+                ) AS norm_score
+            FROM (
+                SELECT id, {distance} AS distance
+                FROM {self._quoted_table_name()}
+                WHERE {where}
+                ORDER BY {distance} ASC
+                LIMIT {candidates_param}
+            ) AS c
+        ), text_search AS (
+            SELECT
+                id, row_number() OVER (ORDER BY text_rank DESC) AS rank,
+                coalesce(text_rank / nullif(max(text_rank) OVER (), 0), 1.0) AS norm_score
+            FROM (
+                SELECT id, ts_rank_cd(contents_tsv, text_query) AS text_rank
+                FROM {self._quoted_table_name()}, websearch_to_tsquery({self._text_search_config_literal()}, $2)
+                    AS text_query
+                WHERE contents_tsv @@ text_query AND {where}
+                ORDER BY text_rank DESC
+                LIMIT {candidates_param}
+            ) AS c
+        ), fused AS (
+            SELECT coalesce(v.id, t.id) AS id, v.distance, {score} AS score
+            FROM vector_search AS v FULL OUTER JOIN text_search AS t ON v.id = t.id
+            ORDER BY score DESC
+            LIMIT {limit_param}
+        )
+        SELECT
+            {self._search_select_list(include, "fused.distance")}, fused.score::float8 AS score
+        FROM
+            fused JOIN {self._quoted_table_name()} USING (id)
+        ORDER BY fused.score DESC
+        """
+        return (query, params)
+
+    def _search_select_list(self, include: Iterable[str] | None, distance: str, metadata_as_text: bool = False) -> str:
+        """
+        Generates the select list of a similarity query, with typed NULLs in place of the columns not included.
+        """
+        if include is None:
+            include = SEARCH_RESULT_COLUMNS
+        elif isinstance(include, str):
+            include = (include,)
+        unknown = set(include) - set(SEARCH_RESULT_COLUMNS)
+        if unknown:
+            raise ValueError(f"unknown search result columns {sorted(unknown)}, expected {SEARCH_RESULT_COLUMNS}")
+
+        column_types = {
+            "id": self.id_type,
+            "metadata": "text" if metadata_as_text else "jsonb",
+            "contents": "text",
+            "embedding": self.get_embedding_column_type(),
+            "distance": "float8",
+        }
+        columns = []
+        for column in SEARCH_RESULT_COLUMNS:
+            if column not in include:
+                columns.append(f"NULL::{column_types[column]} as {column}")
+            elif column == "distance":
+                columns.append(f"{distance} as distance")
+            elif column == "metadata" and metadata_as_text:
+                columns.append("metadata::text as metadata")
+            else:
+                columns.append(column)
+        return ", ".join(columns)
+
+    def search_many_query(
+        self,
+        query_embeddings: list,
+        limit: int = 10,
+        filter: dict[str, str] | list[dict[str, str]] | None = None,
+        predicates: Predicates | None = None,
+        uuid_time_filter: UUIDTimeRange | None = None,
+        include: Iterable[str] | None = None,
+        metadata_as_text: bool = False,
+    ) -> tuple[str, list]:
+        """
+        Generates a similarity query for several query embeddings at once. The query embeddings are passed as
+        a single array parameter and each one is searched in a LATERAL subquery, so all the searches run in one
+        statement. The result columns are those of `search_query` followed by `query_idx`, the 0-based position
+        of the query embedding. Rows come out grouped by `query_idx` in order and then by distance, as the lateral
+        subqueries are evaluated in a nested loop over the query embeddings.
+
+        Returns:
+            Tuple[str, List]: A tuple containing the query and parameters.
+        """
+        params: list[Any] = [query_embeddings]
+        distance = f"embedding {self.distance_type} q.query_embedding"
+        (where, params) = self._search_where_clause(params, filter, predicates, uuid_time_filter)
+        limit_param = f"${len(params)+1}"
+        params = params + [limit]
+
+        query = f"""
+        SELECT
+            r.id, r.metadata, r.contents, r.embedding, r.distance, q.idx - 1 as query_idx
+        FROM
+            unnest($1::{self.get_embedding_column_type()}[]) WITH ORDINALITY AS q(query_embedding, idx)
+        CROSS JOIN LATERAL (
+            SELECT
+                {self._search_select_list(include, distance, metadata_as_text)}
+            FROM
+               {self._quoted_table_name()}
+            WHERE
+               {where}
+            ORDER BY {distance} ASC
+            LIMIT {limit_param}
+        ) AS r
+        """
+        return (query, params)
+
+    def _search_where_clause(
+        self,
+        params: list,
+        filter: dict[str, str] | list[dict[str, str]] | None,
+        predicates: Predicates | None,
+        uuid_time_filter: UUIDTimeRange | None,
+    ) -> tuple[str, list]:
         if self.infer_filters:
             if uuid_time_filter is None and isinstance(filter, dict):
                 if "__start_date" in filter or "__end_date" in filter:
@@ -853,32 +2079,419 @@ CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} USING GIN(metadata jsonb
             where_clauses.append(where_filter)
 
         if predicates is not None:
-            (where_predicates, params) = predicates.build_query(params)
+            (where_predicates, params) = predicates.build_query(params, self.indexed_columns)
             where_clauses.append(where_predicates)
 
         if uuid_time_filter is not None:
             # if self.time_partition_interval is None:
             # raise ValueError("""uuid_time_filter is only supported when time_partitioning is enabled.""")
 
-            (where_time, params) = uuid_time_filter.build_query(params)
+            (where_time, params) = uuid_time_filter.build_query(params, self._uuid_timestamp_column)
             where_clauses.append(where_time)
 
         if len(where_clauses) > 0:
             where = " AND ".join(where_clauses)
         else:
             where = "TRUE"
+        return (where, params)
 
-        query = f"""
-        SELECT
-            id, metadata, contents, embedding, {distance} as distance
-        FROM
-           {self._quoted_table_name()}
-        WHERE 
-           {where}
-        {order_by_clause}
-        LIMIT {limit}
+
+class UpsertResult:
+    def __init__(self, inserted: int = 0, skipped: int = 0, updated: int = 0) -> None:
         """
-        return (query, params)
+        Counts of rows written by a bulk upsert.
+
+        Parameters
+        ----------
+        inserted
+            The number of new rows inserted.
+        skipped
+            The number of rows not written because a row with the same id already exists. With
+            `on_conflict='update'` these are the rows whose metadata, contents and embedding are unchanged.
+        updated
+            The number of existing rows overwritten because they changed (only with `on_conflict='update'`).
+        """
+        self.inserted = inserted
+        self.skipped = skipped
+        self.updated = updated
+
+    @property
+    def total(self) -> int:
+        return self.inserted + self.updated + self.skipped
+
+    def __add__(self, other: "UpsertResult") -> "UpsertResult":
+        return UpsertResult(self.inserted + other.inserted, self.skipped + other.skipped, self.updated + other.updated)
+
+    def __eq__(self, other):
+        if not isinstance(other, UpsertResult):
+            return False
+        return self.inserted == other.inserted and self.skipped == other.skipped and self.updated == other.updated
+
+    def __repr__(self):
+        return f"UpsertResult(inserted={self.inserted}, updated={self.updated}, skipped={self.skipped})"
+
+
+# the dtype of the decoded embeddings of each embedding type
+_EMBEDDING_DTYPES = {"vector": np.float32, "halfvec": np.float16, "sparsevec": np.float32, "bit": np.bool_}
+
+
+class SearchResultBatch:
+    def __init__(
+        self,
+        ids: list,
+        distances: np.ndarray | None,
+        embeddings: np.ndarray | None,
+        metadata: list[str | None],
+        contents: list[str | None],
+    ) -> None:
+        """
+        Search results in columnar form, for consumers working on arrays rather than on records.
+
+        Parameters
+        ----------
+        ids
+            The ids of the results.
+        distances
+            A float32 array of the distances of the results, or None if the distance was not fetched.
+        embeddings
+            A contiguous (k, num_dimensions) array of the embeddings of the results, or None if the embeddings were
+            not fetched.
+        metadata
+            The metadata of the results as JSON text. It is decoded on first access of `metadata`.
+        contents
+            The contents of the results.
+        """
+        self.ids = ids
+        self.distances = distances
+        self.embeddings = embeddings
+        self._metadata_json = metadata
+        self._metadata: list[dict[str, Any] | None] | None = None
+        self.contents = contents
+        self._page_after: tuple[float, list[str], int] | None = None
+
+    @classmethod
+    def from_records(
+        cls,
+        records: list,
+        num_dimensions: int,
+        embedding_type: str = "vector",
+        include: Iterable[str] | None = None,
+    ) -> "SearchResultBatch":
+        """
+        Converts search result records, fetched with the metadata as JSON text, to a batch. The distances and
+        embeddings are None if they are not in `include` (see `search`), otherwise they are arrays even without
+        any records: (0,) distances and (0, num_dimensions) embeddings of the dtype of `embedding_type`.
+        """
+        if include is None:
+            include = SEARCH_RESULT_COLUMNS
+        elif isinstance(include, str):
+            include = (include,)
+        if len(records) == 0:
+            columns: list[tuple] = [()] * len(SEARCH_RESULT_COLUMNS)
+        else:
+            columns = list(zip(*records, strict=True))
+        ids = columns[SEARCH_RESULT_ID_IDX]
+        metadata = columns[SEARCH_RESULT_METADATA_IDX]
+        contents = columns[SEARCH_RESULT_CONTENTS_IDX]
+        embeddings = columns[SEARCH_RESULT_EMBEDDING_IDX]
+        distances = columns[SEARCH_RESULT_DISTANCE_IDX]
+        distance_array = np.array(distances, dtype=np.float32) if "distance" in include else None
+        if "embedding" not in include:
+            embedding_matrix = None
+        elif len(embeddings) == 0:
+            embedding_matrix = np.empty((0, num_dimensions), dtype=_EMBEDDING_DTYPES[embedding_type])
+        else:
+            embedding_matrix = np.stack(embeddings)
+            embedding_matrix = embedding_matrix.astype(embedding_matrix.dtype.newbyteorder("="), order="C")
+        return cls(list(ids), distance_array, embedding_matrix, list(metadata), list(contents))
+
+    @property
+    def next_page_token(self) -> str | None:
+        """
+        An opaque token to pass as `search_after` to get the next page of results. See `SearchResults`.
+        """
+        return _encode_page_token(self._page_after)
+
+    @property
+    def metadata(self) -> list[dict[str, Any] | None]:
+        if self._metadata is None:
+            self._metadata = [None if value is None else json.loads(value) for value in self._metadata_json]
+        return self._metadata
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __repr__(self):
+        return f"SearchResultBatch(len={len(self)})"
+
+
+def _page_after(
+    records: list, search_after: tuple[float, list[str], int] | None
+) -> tuple[float, list[str], int] | None:
+    """
+    Gets the (distance, ids, count) position after the last of `records`: its distance, the ids of all the records
+    returned at that distance, including those of earlier pages when the ties span several pages, and the number of
+    records returned so far.
+    """
+    if len(records) == 0:
+        return search_after
+    last_distance = records[-1][SEARCH_RESULT_DISTANCE_IDX]
+    if last_distance is None or records[-1][SEARCH_RESULT_ID_IDX] is None:
+        return None
+    ids = []
+    for record in reversed(records):
+        if record[SEARCH_RESULT_DISTANCE_IDX] != last_distance:
+            break
+        ids.append(str(record[SEARCH_RESULT_ID_IDX]))
+    count = len(records)
+    if search_after is not None:
+        count += search_after[2]
+        if search_after[0] == last_distance:
+            ids = search_after[1] + ids
+    return (last_distance, ids, count)
+
+
+def _encode_page_token(page_after: tuple[float, list[str], int] | None) -> str | None:
+    if page_after is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(page_after).encode()).decode()
+
+
+def _decode_page_token(token: str) -> tuple[float, list[str], int]:
+    try:
+        distance, ids, count = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return (float(distance), [str(id) for id in ids], int(count))
+    except (ValueError, TypeError) as e:
+        raise ValueError("invalid page token") from e
+
+
+def _dense_embedding(value, embedding_type: str, num_dimensions: int) -> np.ndarray:
+    """
+    Converts an embedding given in any of the accepted input forms of `embedding_type` to a dense array.
+    """
+    if embedding_type == "bit":
+        return _bit_array(value)
+    if embedding_type == "sparsevec":
+        indices, values = _sparse_entries(value, num_dimensions)
+        dense = np.zeros(num_dimensions, dtype=np.float32)
+        dense[indices] = values
+        return dense
+    return np.asarray(value, dtype=np.float32)
+
+
+def _mmr_select(query_embedding, embeddings: np.ndarray, limit: int, lambda_mult: float) -> list[int]:
+    """
+    Selects `limit` rows of `embeddings` by maximal marginal relevance: each pick maximizes `lambda_mult` times its
+    cosine similarity to the query minus `1 - lambda_mult` times its highest cosine similarity to the rows already
+    picked. Returns the indices of the rows in the order they were picked.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), np.finfo(np.float32).tiny)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query = query / max(float(np.linalg.norm(query)), np.finfo(np.float32).tiny)
+
+    relevance = lambda_mult * (embeddings @ query)
+    redundancy = np.full(len(embeddings), -np.inf, dtype=np.float32)
+    available = np.ones(len(embeddings), dtype=bool)
+    selected: list[int] = []
+    for _ in range(min(limit, len(embeddings))):
+        # the redundancy is -inf until the first pick
+        scores = relevance - (1.0 - lambda_mult) * redundancy if selected else relevance.copy()
+        scores[~available] = -np.inf
+        idx = int(np.argmax(scores))
+        selected.append(idx)
+        available[idx] = False
+        redundancy = np.maximum(redundancy, embeddings @ embeddings[idx])
+    return selected
+
+
+class SearchResults(list):
+    def __init__(self, records: Iterable, page_after: tuple[float, list[str], int] | None = None) -> None:
+        """
+        The records returned by `search`, along with the token of the next page.
+        """
+        super().__init__(records)
+        self._page_after = page_after
+
+    @property
+    def next_page_token(self) -> str | None:
+        """
+        An opaque token to pass as `search_after` to get the next page of results, or None if the id or distance
+        column was not fetched.
+        """
+        return _encode_page_token(self._page_after)
+
+
+class CacheStats:
+    def __init__(self) -> None:
+        """
+        Hit, miss and eviction counters of a cache.
+        """
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def __repr__(self):
+        return f"CacheStats(hits={self.hits}, misses={self.misses}, evictions={self.evictions})"
+
+
+class SearchPlan:
+    def __init__(self, plan: dict[str, Any]) -> None:
+        """
+        A summary of the output of `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)` for a search.
+
+        The EXPLAIN is planned for the parameter values of the search, like a one-off query. `Async.search` runs
+        its query as a prepared statement that asyncpg caches, and after five executions Postgres may switch it to a
+        generic plan that does not look at the values, for example at how selective a filter is. So a search can run
+        with another plan than the one summarized here. Passing `QueryParams({"plan_cache_mode": "force_custom_plan"})`
+        to the search plans it for its values every time. `Sync` sends its parameters inline and is not affected.
+
+        Parameters
+        ----------
+        plan
+            The top-level object of the JSON plan, with the `Plan` tree and the planning and execution times.
+
+        Attributes
+        ----------
+        indexes
+            The names of the indexes scanned, in plan order.
+        sequential_scans
+            The names of the relations read with a sequential scan.
+        chunks_scanned
+            The number of distinct hypertable chunks scanned.
+        rows_removed_by_filter
+            The total number of rows read and then discarded by filters, across all loops.
+        shared_hit_blocks, shared_read_blocks
+            The number of buffers found in the shared buffer cache and read from disk or the OS cache.
+        planning_time, execution_time
+            In milliseconds.
+        """
+        self.plan = plan
+        self.indexes: list[str] = []
+        self.sequential_scans: list[str] = []
+        relations: set[str] = set()
+        self.rows_removed_by_filter = 0
+
+        nodes = [plan["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            if "Index Name" in node:
+                self.indexes.append(node["Index Name"])
+            if "Relation Name" in node:
+                relations.add(node["Relation Name"])
+                if node["Node Type"] == "Seq Scan":
+                    self.sequential_scans.append(node["Relation Name"])
+            loops = node.get("Actual Loops", 1)
+            self.rows_removed_by_filter += node.get("Rows Removed by Filter", 0) * loops
+            nodes.extend(reversed(node.get("Plans", [])))
+
+        self.chunks_scanned = sum(1 for relation in relations if relation.startswith("_hyper_"))
+        self.shared_hit_blocks = plan["Plan"].get("Shared Hit Blocks", 0)
+        self.shared_read_blocks = plan["Plan"].get("Shared Read Blocks", 0)
+        self.planning_time = plan.get("Planning Time")
+        self.execution_time = plan.get("Execution Time")
+
+    @classmethod
+    def from_explain(cls, output: str | list) -> "SearchPlan":
+        """
+        Creates the summary from the result of the EXPLAIN statement, as JSON text or decoded.
+        """
+        if isinstance(output, str):
+            output = json.loads(output)
+        return cls(output[0])
+
+    def __repr__(self):
+        return (
+            f"SearchPlan(indexes={self.indexes}, sequential_scans={self.sequential_scans}, "
+            f"chunks_scanned={self.chunks_scanned}, rows_removed_by_filter={self.rows_removed_by_filter}, "
+            f"shared_hit_blocks={self.shared_hit_blocks}, shared_read_blocks={self.shared_read_blocks}, "
+            f"execution_time={self.execution_time})"
+        )
+
+
+class SearchCache:
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0) -> None:
+        """
+        An opt-in cache of search results for the Async and Sync clients. Entries are evicted when they are older
+        than `ttl` seconds or, least recently used first, when there are more than `max_size` of them. The cache is
+        cleared by every write made through a client using it. Cached results are shared between callers and should
+        not be modified.
+
+        Parameters
+        ----------
+        max_size
+            The maximum number of cached results.
+        ttl
+            The number of seconds a result is cached for.
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self.generation = 0
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key_value(value) -> Any:
+        """
+        Normalizes a query parameter into a hashable value. Vectors are replaced by a digest of their float32 bytes.
+        """
+        if isinstance(value, np.ndarray) or (
+            isinstance(value, list | tuple) and len(value) > 0 and isinstance(value[0], int | float)
+        ):
+            return hashlib.blake2b(np.asarray(value, dtype=np.float32).tobytes(), digest_size=16).digest()
+        if isinstance(value, list | tuple):
+            return tuple(SearchCache._key_value(item) for item in value)
+        if isinstance(value, dict):
+            return json.dumps(value, sort_keys=True)
+        return value
+
+    def key(self, query: str, params: list, query_params: QueryParams | None = None, *extra) -> tuple:
+        """
+        Builds the cache key of a search from its query text, parameters and index parameters.
+        """
+        statements = tuple(query_params.get_statements()) if query_params is not None else ()
+        return (query, tuple(self._key_value(param) for param in params), statements, *extra)
+
+    def get(self, key: tuple) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, value: Any, generation: int) -> None:
+        """
+        Caches a result, unless the cache was cleared since `generation` was read (before the search started).
+        """
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
 
 class Async(QueryBuilder):
@@ -893,6 +2506,11 @@ class Async(QueryBuilder):
         max_db_connections: int | None = None,
         infer_filters: bool = True,
         schema_name: str | None = None,
+        embedding_type: str = "vector",
+        statement_cache_size: int = 128,
+        search_cache: SearchCache | None = None,
+        text_search_config: str | None = None,
+        indexed_metadata_fields: dict[str, str] | None = None,
     ) -> None:
         """
         Initializes a async client for storing vector data.
@@ -915,6 +2533,26 @@ class Async(QueryBuilder):
             Whether to infer start and end times from the special __start_date and __end_date filters.
         schema_name
             The schema name for the table (optional, uses the database's default schema if not specified).
+        embedding_type
+            The type of the embedding column. Can be 'vector', 'halfvec' (half precision), 'sparsevec' or 'bit'.
+            Bit embeddings require the 'hamming' or 'jaccard' distance type.
+        statement_cache_size
+            The number of statements asyncpg keeps prepared per connection (the `statement_cache_size` of its pool),
+            least recently used statements are evicted first. Search values, including the limit, are parameters, so
+            a statement is prepared once per shape of the filters. Set to 0 to disable, e.g. behind a transaction
+            pooler. The hits, misses and evictions of the search statements are counted in `statement_cache_stats`.
+        search_cache
+            A SearchCache to keep the results of `search` in (optional). It is cleared by the writes of this client,
+            writes made by other clients or directly in the database are only picked up once the entries expire.
+        text_search_config
+            The text search configuration (e.g. 'english') of a generated tsvector column over the contents, which
+            `create_tables` adds along with a GIN index. Required by `hybrid_search`. Disabled if None.
+        indexed_metadata_fields
+            The metadata fields that `create_tables` promotes to generated columns with btree indexes, mapped to their
+            type: 'int', 'numeric', 'timestamptz' or 'text'. Predicates comparing a field to values of the matching
+            type use the index. '__uuid_timestamp' indexes the timestamp of the ids for UUIDTimeRange filters on
+            tables that are not partitioned by time. Every upserted value of a field must be castable to its type;
+            timestamptz values must be ISO 8601 timestamps, which are read as UTC if they have no offset.
         """
         self.builder = QueryBuilder(
             table_name,
@@ -924,11 +2562,21 @@ class Async(QueryBuilder):
             time_partition_interval,
             infer_filters,
             schema_name,
+            embedding_type,
+            text_search_config,
+            indexed_metadata_fields,
         )
         self.service_url = service_url
         self.pool = None
         self.max_db_connections = max_db_connections
         self.time_partition_interval = time_partition_interval
+        self.statement_cache_size = statement_cache_size
+        self.statement_cache_stats = CacheStats()
+        # the texts of the search statements run on each connection, by server process id, least recently used first
+        self._prepared_statements: dict[int, OrderedDict[str, None]] = {}
+        self.search_cache = search_cache
+        self._embedding_index_type: str | None = None
+        self._pgvector_version: str | None = None
 
     async def _default_max_db_connections(self) -> int:
         """
@@ -957,7 +2605,31 @@ class Async(QueryBuilder):
                 self.max_db_connections = await self._default_max_db_connections()
 
             async def init(conn):
-                await register_vector(conn)
+                # a new connection has no prepared statements, even if a former one had the same process id
+                self._prepared_statements.pop(conn.get_server_pid(), None)
+                # decode to a float32 numpy view over the received bytes
+                await conn.set_type_codec(
+                    "vector", encoder=_encode_vector, decoder=_decode_vector, format="binary", schema="public"
+                )
+                embedding_type = self.builder.embedding_type
+                if embedding_type == "halfvec":
+                    await conn.set_type_codec(
+                        "halfvec", encoder=_encode_halfvec, decoder=_decode_halfvec, format="binary", schema="public"
+                    )
+                elif embedding_type == "sparsevec":
+                    num_dimensions = self.builder.num_dimensions
+                    await conn.set_type_codec(
+                        "sparsevec",
+                        encoder=lambda value: _encode_sparsevec(value, num_dimensions),
+                        decoder=_decode_sparsevec,
+                        format="binary",
+                        schema="public",
+                    )
+                elif embedding_type == "bit":
+                    # replaces asyncpg's BitString codec on the connections of this client
+                    await conn.set_type_codec(
+                        "bit", encoder=_encode_bit, decoder=_decode_bit, format="binary", schema="pg_catalog"
+                    )
                 # decode to a dict, but accept a string as input in upsert
                 await conn.set_type_codec("jsonb", encoder=str, decoder=json.loads, schema="pg_catalog")
 
@@ -966,6 +2638,7 @@ class Async(QueryBuilder):
                 init=init,
                 min_size=1,
                 max_size=self.max_db_connections,
+                statement_cache_size=self.statement_cache_size,
             )
         return self.pool.acquire()
 
@@ -973,6 +2646,29 @@ class Async(QueryBuilder):
         if self.pool != None:
             await self.pool.close()
 
+    def _invalidate_search_cache(self) -> None:
+        if self.search_cache is not None:
+            self.search_cache.clear()
+
+    def _count_statement(self, conn, query: str) -> None:
+        """
+        Counts a hit or a miss of asyncpg's statement cache in `statement_cache_stats` for a search statement about
+        to run on `conn`. The statement texts of each connection are kept in the least recently used order of the
+        cache, as a statement is prepared once per text.
+        """
+        if self.statement_cache_size == 0:
+            return
+        statements = self._prepared_statements.setdefault(conn.get_server_pid(), OrderedDict())
+        if query in statements:
+            statements.move_to_end(query)
+            self.statement_cache_stats.hits += 1
+            return
+        self.statement_cache_stats.misses += 1
+        statements[query] = None
+        if len(statements) > self.statement_cache_size:
+            statements.popitem(last=False)
+            self.statement_cache_stats.evictions += 1
+
     async def table_is_empty(self):
         """
         Checks if the table is empty.
@@ -998,7 +2694,7 @@ class Async(QueryBuilder):
             raise ValueError("Cannot mix dictionary and string metadata fields in the same upsert")
         return (item[0], json.dumps(item[1]), item[2], item[3])
 
-    async def upsert(self, records):
+    async def upsert(self, records, on_conflict: str = "nothing"):
         """
         Performs upsert operation for multiple records.
 
@@ -1006,15 +2702,175 @@ class Async(QueryBuilder):
         ----------
         records
             List of records to upsert. Each record is a tuple of the form (id, metadata, contents, embedding).
+        on_conflict
+            Either 'nothing' to keep existing rows with the same id, or 'update' to overwrite them if their
+            metadata, contents or embedding changed.
 
         Returns
         -------
             None
         """
         records = self.munge_record(records)
-        query = self.builder.get_upsert_query()
+        query = self.builder.get_upsert_query(on_conflict)
         async with await self.connect() as pool:
             await pool.executemany(query, records)
+        self._invalidate_search_cache()
+
+    async def bulk_upsert(self, records, on_conflict: str = "nothing") -> UpsertResult:
+        """
+        Performs upsert operation for multiple records using binary COPY. The records are streamed into a
+        temporary staging table and merged into the table with a single INSERT ... SELECT statement. This is
+        much faster than `upsert` for large numbers of records.
+
+        Parameters
+        ----------
+        records
+            List of records to upsert. Each record is a tuple of the form (id, metadata, contents, embedding).
+        on_conflict
+            Either 'nothing' to keep existing rows with the same id, or 'update' to overwrite them if their
+            metadata, contents or embedding changed.
+
+        Returns
+        -------
+            UpsertResult: The number of rows inserted, updated and skipped.
+        """
+        if len(records) == 0:
+            return UpsertResult()
+        records = self.munge_record(records)
+        return await self._upsert_from_staging(
+            lambda pool: pool.copy_records_to_table(
+                self.builder.get_staging_table_name(),
+                records=records,
+                columns=["id", "metadata", "contents", "embedding"],
+            ),
+            on_conflict,
+        )
+
+    async def upsert_columns(
+        self,
+        ids: list[uuid.UUID] | list[str],
+        metadata: list[dict[str, Any] | str | None],
+        contents: list[str | None],
+        embeddings: np.ndarray,
+        on_conflict: str = "nothing",
+    ) -> UpsertResult:
+        """
+        Upserts records given as columns. The embedding matrix is written to the database with binary COPY
+        without splitting it into per-record Python objects, which makes this the cheapest way to ingest
+        embeddings that are already in a numpy array.
+
+        Parameters
+        ----------
+        ids
+            The ids of the records.
+        metadata
+            The metadata of the records, as dictionaries or JSON strings.
+        contents
+            The contents of the records.
+        embeddings
+            A 2-dimensional array with one row per record and `num_dimensions` columns.
+        on_conflict
+            Either 'nothing' to keep existing rows with the same id, or 'update' to overwrite them if their
+            metadata, contents or embedding changed.
+
+        Returns
+        -------
+            UpsertResult: The number of rows inserted, updated and skipped.
+        """
+        data = _copy_binary_columns(
+            ids,
+            metadata,
+            contents,
+            embeddings,
+            self.builder.id_type,
+            self.builder.num_dimensions,
+            self.builder.embedding_type,
+        )
+        if len(ids) == 0:
+            return UpsertResult()
+        return await self._upsert_from_staging(
+            lambda pool: pool.copy_to_table(
+                self.builder.get_staging_table_name(),
+                source=io.BytesIO(data),
+                columns=["id", "metadata", "contents", "embedding"],
+                format="binary",
+            ),
+            on_conflict,
+        )
+
+    async def _upsert_from_staging(
+        self, copy: Callable[[Any], Awaitable[str]], on_conflict: str = "nothing"
+    ) -> UpsertResult:
+        """
+        Loads a temporary staging table with `copy` and merges it into the table.
+        """
+        merge_query = self.builder.get_merge_staging_query(on_conflict)
+        async with await self.connect() as pool, pool.transaction():
+            await pool.execute(self.builder.get_create_staging_table_query())
+            status = await copy(pool)
+            num_staged = int(status.split()[-1])
+            (num_inserted, num_updated) = await pool.fetchrow(merge_query)
+        self._invalidate_search_cache()
+        return UpsertResult(inserted=num_inserted, updated=num_updated, skipped=num_staged - num_inserted - num_updated)
+
+    async def upsert_stream(
+        self,
+        records: Iterable | AsyncIterable,
+        batch_size: int = 1000,
+        max_in_flight: int = 4,
+        on_progress: Callable[[UpsertResult], None] | None = None,
+        on_conflict: str = "nothing",
+    ) -> UpsertResult:
+        """
+        Upserts records from an iterable or async iterable without materializing it. The records are sliced
+        into batches that are written with `bulk_upsert` on separate pool connections. At most `max_in_flight`
+        batches are written concurrently; reading from `records` pauses until one of them finishes.
+
+        Parameters
+        ----------
+        records
+            Iterable or async iterable of records. Each record is a tuple of the form
+            (id, metadata, contents, embedding).
+        batch_size
+            The number of records per batch.
+        max_in_flight
+            The maximum number of batches being written at the same time.
+        on_progress
+            Called with the running totals after each batch is written.
+        on_conflict
+            The `bulk_upsert` conflict handling used to write each batch.
+
+        Returns
+        -------
+            UpsertResult: The total number of rows inserted, updated and skipped.
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+        result = UpsertResult()
+        in_flight: set[asyncio.Task] = set()
+
+        async def wait_for(return_when: str) -> None:
+            nonlocal result
+            done, _ = await asyncio.wait(in_flight, return_when=return_when)
+            in_flight.difference_update(done)
+            for task in done:
+                result = result + task.result()
+                if on_progress is not None:
+                    on_progress(result)
+
+        try:
+            async for batch in _abatched(records, batch_size):
+                if len(in_flight) >= max_in_flight:
+                    await wait_for(asyncio.FIRST_COMPLETED)
+                in_flight.add(asyncio.create_task(self.bulk_upsert(batch, on_conflict)))
+            if len(in_flight) > 0:
+                await wait_for(asyncio.ALL_COMPLETED)
+        finally:
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        return result
 
     async def create_tables(self):
         """
@@ -1043,6 +2899,7 @@ class Async(QueryBuilder):
         query = self.builder.delete_all_query()
         async with await self.connect() as pool:
             await pool.execute(query)
+        self._invalidate_search_cache()
 
     async def delete_by_ids(self, ids: list[uuid.UUID] | list[str]):
         """
@@ -1050,7 +2907,9 @@ class Async(QueryBuilder):
         """
         (query, params) = self.builder.delete_by_ids_query(ids)
         async with await self.connect() as pool:
-            return await pool.fetch(query, *params)
+            deleted = await pool.fetch(query, *params)
+        self._invalidate_search_cache()
+        return deleted
 
     async def delete_by_metadata(self, filter: dict[str, str] | list[dict[str, str]]):
         """
@@ -1058,7 +2917,9 @@ class Async(QueryBuilder):
         """
         (query, params) = self.builder.delete_by_metadata_query(filter)
         async with await self.connect() as pool:
-            return await pool.fetch(query, *params)
+            deleted = await pool.fetch(query, *params)
+        self._invalidate_search_cache()
+        return deleted
 
     async def drop_table(self):
         """
@@ -1071,6 +2932,8 @@ class Async(QueryBuilder):
         query = self.builder.drop_table_query()
         async with await self.connect() as pool:
             await pool.execute(query)
+        self._invalidate_search_cache()
+        self._embedding_index_type = None
 
     async def _get_approx_count(self):
         """
@@ -1096,6 +2959,7 @@ class Async(QueryBuilder):
         query = self.builder.drop_embedding_index_query()
         async with await self.connect() as pool:
             await pool.execute(query)
+        self._embedding_index_type = None
 
     async def create_embedding_index(self, index: BaseIndex):
         """
@@ -1116,6 +2980,27 @@ class Async(QueryBuilder):
 
         async with await self.connect() as pool:
             await pool.execute(query)
+        self._embedding_index_type = None
+
+    async def _get_embedding_index_type(self) -> str:
+        """
+        Gets the access method of the embedding index ('hnsw', 'ivfflat' or 'diskann'), or '' if there is none. It is
+        looked up once and kept until this client creates or drops the index or the table.
+        """
+        if self._embedding_index_type is None:
+            (query, params) = self.builder.get_embedding_index_type_query()
+            async with await self.connect() as pool:
+                self._embedding_index_type = await pool.fetchval(query, *params) or ""
+        return self._embedding_index_type
+
+    async def _get_pgvector_version(self) -> str:
+        """
+        Gets the installed version of the pgvector extension, looked up once.
+        """
+        if self._pgvector_version is None:
+            async with await self.connect() as pool:
+                self._pgvector_version = await pool.fetchval(self.builder.get_pgvector_version_query()) or ""
+        return self._pgvector_version
 
     async def search(
         self,
@@ -1125,6 +3010,18 @@ class Async(QueryBuilder):
         predicates: Predicates | None = None,
         uuid_time_filter: UUIDTimeRange | None = None,
         query_params: QueryParams | None = None,
+        include: Iterable[str] | None = None,
+        as_arrays: bool = False,
+        rerank_factor: int | None = None,
+        max_expansions: int = 0,
+        search_after: str | None = None,
+        max_distance: float | None = None,
+        group_by: str | None = None,
+        per_group: int = 1,
+        groups: int | None = None,
+        fan_out: int | None = None,
+        recency_weight: float | None = None,
+        half_life: timedelta | None = None,
     ):
         """
         Retrieves similar records using a similarity query.
@@ -1142,32 +3039,633 @@ class Async(QueryBuilder):
         uuid_time_filter
             A UUIDTimeRange object to filter the results by time using the id column.
         query_params
+            Index parameters for the query (optional).
+        include
+            The result columns to fetch, some of `SEARCH_RESULT_COLUMNS`. The other columns are returned as NULL.
+            Leaving out the embedding avoids reading and sending it. Defaults to all columns.
+        as_arrays
+            Whether to return the results as a `SearchResultBatch` of arrays instead of records.
+        rerank_factor
+            Takes `limit * rerank_factor` candidates from the index and returns the `limit` nearest of them by exact
+            distance, which makes up for the approximate order of a quantized or low-effort index scan. The index
+            must be allowed to return that many candidates, e.g. with an `ef_search` of at least that number.
+        max_expansions
+            The number of times a filtered search returning fewer than `limit` records is retried with a 4 times
+            larger candidate window of an HNSW or DiskANN embedding index (see `QueryParams.expanded`), for filters
+            too selective for the default windows. The retries stop when the window reaches its maximum or a retry
+            finds no more records than a previous attempt that found some. Not needed with iterative index scans (see
+            `HNSWIndexParams`); IVFFlat indexes are not retried.
+        search_after
+            The `next_page_token` of the previous page of results, to get the next `limit` results after it. The
+            records of earlier pages are filtered out of the ordered index scan rather than sent again, but the scan
+            still walks them, so a deep page costs about as much as one search for all the records up to it. The
+            candidate window of an HNSW or DiskANN index is raised to cover the earlier pages, up to the maximum
+            `ef_search` of 1000; deeper pages, and pages of an IVFFlat index, need iterative index scans (see
+            `HNSWIndexParams` and `IvfflatIndexParams`) or come back short.
+        max_distance
+            Only returns the records within this distance of the query embedding (at most `limit` of them). Use
+            `iter_search` to stream all the records within a distance.
+        group_by
+            A metadata field (e.g. a document id) to group the `limit` nearest records by, returning the `per_group`
+            nearest records of each of the `groups` nearest groups instead. The grouping is done in the database, the
+            records have an additional `group_key` column and come ordered by group. `limit` must be large enough
+            for the candidates to contain `groups` groups.
+        per_group
+            The number of records returned per group.
+        groups
+            The number of groups returned, or None for all the groups among the `limit` nearest records.
+        fan_out
+            Splits `uuid_time_filter` into up to this many chunk-aligned time slices (see `UUIDTimeRange.split`),
+            searches them concurrently on separate pool connections and merges their nearest records. Only for
+            time partitioned tables, and `fan_out` should not exceed `max_db_connections`.
+        recency_weight
+            Favors recent records: the candidates (`limit * rerank_factor`, or `4 * limit`, nearest records) are
+            ordered by their distance minus `recency_weight` times an exponential decay of their age, from 1 for a
+            new record to 0.5 at `half_life`. The age comes from the UUID v1 timestamp of the id, using the
+            `uuid_timestamp` function created for time partitioned tables, or the column of an indexed
+            `__uuid_timestamp` field. Other tables raise a ValueError.
+        half_life
+            The age at which the recency bonus is halved.
+
+        Returns
+        -------
+            SearchResults: List of similar records, or a SearchResultBatch if `as_arrays` is set.
+        """
+        page_after = None if search_after is None else _decode_page_token(search_after)
+        (query, params) = self.builder.search_query(
+            query_embedding,
+            limit,
+            filter,
+            predicates,
+            uuid_time_filter,
+            include,
+            metadata_as_text=as_arrays,
+            rerank_factor=rerank_factor,
+            search_after=page_after,
+            max_distance=max_distance,
+            group_by=group_by,
+            per_group=per_group,
+            groups=groups,
+            recency_weight=recency_weight,
+            half_life=half_life,
+        )
+        if page_after is not None:
+            # the index scan has to get past the records of the earlier pages before the page starts
+            index_type = await self._get_embedding_index_type()
+            query_params = (query_params or QueryParams({})).widened(page_after[2] + limit, index_type)
+        if self.search_cache is not None:
+            cache_key = self.search_cache.key(query, params, query_params, as_arrays, max_expansions, fan_out)
+            cached = self.search_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            generation = self.search_cache.generation
+
+        if fan_out is not None:
+            if group_by is not None or search_after is not None or recency_weight is not None:
+                raise ValueError("fan_out cannot be combined with group_by, search_after or recency_weight")
+            rows = await self._fan_out_search(
+                query_embedding,
+                limit,
+                filter,
+                predicates,
+                uuid_time_filter,
+                query_params,
+                include,
+                as_arrays,
+                rerank_factor,
+                max_distance,
+                fan_out,
+            )
+        else:
+            rows = await self._fetch_search(query, params, query_params)
+        filters = (filter, predicates, uuid_time_filter, page_after)
+        filtered = any(value is not None for value in filters)
+        if query_embedding is not None and filtered and group_by is None and fan_out is None:
+            index_type = await self._get_embedding_index_type() if max_expansions > 0 and len(rows) < limit else ""
+            # the probes of ivfflat have no upper bound to stop at, its iterative scan is the way to find more rows
+            for _ in range(max_expansions if index_type in ("hnsw", "diskann") else 0):
+                if len(rows) >= limit:
+                    break
+                query_params = (query_params or QueryParams({})).expanded(4, index_type)
+                if query_params is None:
+                    break
+                expanded_rows = await self._fetch_search(query, params, query_params)
+                # stop once a larger window finds no more rows, the filters likely match no more than that. Without
+                # any rows yet there is nothing to compare, so those retries only stop at the maximum window.
+                if len(rows) > 0 and len(expanded_rows) <= len(rows):
+                    break
+                rows = expanded_rows
+        page_after = None if query_embedding is None or group_by is not None else _page_after(rows, page_after)
+        if as_arrays:
+            result = SearchResultBatch.from_records(
+                rows, self.builder.num_dimensions, self.builder.embedding_type, include
+            )
+            result._page_after = page_after
+        else:
+            result = SearchResults(rows, page_after)
+        if self.search_cache is not None:
+            self.search_cache.put(cache_key, result, generation)
+        return result
+
+    async def explain_search(
+        self,
+        query_embedding: list[float] | None = None,
+        limit: int = 10,
+        filter: dict[str, str] | list[dict[str, str]] | None = None,
+        predicates: Predicates | None = None,
+        uuid_time_filter: UUIDTimeRange | None = None,
+        query_params: QueryParams | None = None,
+        include: Iterable[str] | None = None,
+        rerank_factor: int | None = None,
+        search_after: str | None = None,
+        max_distance: float | None = None,
+        group_by: str | None = None,
+        per_group: int = 1,
+        groups: int | None = None,
+        recency_weight: float | None = None,
+        half_life: timedelta | None = None,
+    ) -> SearchPlan:
+        """
+        Runs the query that `search` would send for these arguments under `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`,
+        with the same `query_params` settings, and summarizes the plan. This shows whether the embedding index was
+        used, how many hypertable chunks were scanned and how many rows the filters discarded. The query is executed.
+        The plan is made for these parameter values, while `search` may reuse a generic plan; see `SearchPlan`.
+
+        Parameters
+        ----------
+        query_embedding, limit, filter, predicates, uuid_time_filter, query_params, include
+            As for `search`.
+        rerank_factor, search_after, max_distance, group_by, per_group, groups, recency_weight, half_life
+            As for `search`.
+
+        Returns
+        -------
+            SearchPlan: The summary, with the full JSON plan in its `plan` attribute.
+        """
+        page_after = None if search_after is None else _decode_page_token(search_after)
+        (query, params) = self.builder.search_query(
+            query_embedding,
+            limit,
+            filter,
+            predicates,
+            uuid_time_filter,
+            include,
+            rerank_factor=rerank_factor,
+            search_after=page_after,
+            max_distance=max_distance,
+            group_by=group_by,
+            per_group=per_group,
+            groups=groups,
+            recency_weight=recency_weight,
+            half_life=half_life,
+        )
+        if page_after is not None:
+            index_type = await self._get_embedding_index_type()
+            query_params = (query_params or QueryParams({})).widened(page_after[2] + limit, index_type)
+        query = f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"
+        async with await self.connect() as pool, pool.transaction():
+            if query_params is not None:
+                for statement in query_params.get_statements():
+                    await pool.execute(statement)
+            return SearchPlan.from_explain(await pool.fetchval(query, *params))
+
+    async def _fan_out_search(
+        self,
+        query_embedding: list[float] | None,
+        limit: int,
+        filter: dict[str, str] | list[dict[str, str]] | None,
+        predicates: Predicates | None,
+        uuid_time_filter: UUIDTimeRange | None,
+        query_params: QueryParams | None,
+        include: Iterable[str] | None,
+        metadata_as_text: bool,
+        rerank_factor: int | None,
+        max_distance: float | None,
+        fan_out: int,
+    ) -> list[asyncpg.Record]:
+        """
+        Searches chunk-aligned slices of `uuid_time_filter` concurrently and merges the nearest records of the
+        slices, which come sorted by distance, with a heap.
+        """
+        if self.builder.time_partition_interval is None or uuid_time_filter is None:
+            raise ValueError("fan_out requires a time partitioned table and a uuid_time_filter")
+        if isinstance(include, str):
+            include = (include,)
+        if query_embedding is None or (include is not None and "distance" not in include):
+            raise ValueError("fan_out requires a query embedding and the distance column to merge the slices")
+
+        slices = uuid_time_filter.split(self.builder.time_partition_interval, fan_out)
+        queries = [
+            self.builder.search_query(
+                query_embedding,
+                limit,
+                filter,
+                predicates,
+                time_slice,
+                include,
+                metadata_as_text=metadata_as_text,
+                rerank_factor=rerank_factor,
+                max_distance=max_distance,
+            )
+            for time_slice in slices
+        ]
+        results = await asyncio.gather(*(self._fetch_search(query, params, query_params) for query, params in queries))
+        merged = heapq.merge(*results, key=lambda record: record[SEARCH_RESULT_DISTANCE_IDX])
+        return list(islice(merged, limit))
+
+    async def _fetch_search(self, query: str, params: list, query_params: QueryParams | None) -> list[asyncpg.Record]:
+        async with await self.connect() as pool:
+            self._count_statement(pool, query)
+            if query_params is None:
+                return await pool.fetch(query, *params)
+            async with pool.transaction():
+                # Looks like there is no way to pipeline this: https://github.com/MagicStack/asyncpg/issues/588
+                for statement in query_params.get_statements():
+                    await pool.execute(statement)
+                return await pool.fetch(query, *params)
+
+    async def hybrid_search(
+        self,
+        query_text: str,
+        query_embedding: list[float],
+        limit: int = 10,
+        filter: dict[str, str] | list[dict[str, str]] | None = None,
+        predicates: Predicates | None = None,
+        uuid_time_filter: UUIDTimeRange | None = None,
+        query_params: QueryParams | None = None,
+        fusion: str = "rrf",
+        rrf_k: int = 60,
+        vector_weight: float = 0.5,
+        num_candidates: int | None = None,
+        include: Iterable[str] | None = None,
+    ):
+        """
+        Retrieves records by combining a similarity search with a full-text search on the contents, fusing both
+        rankings in a single statement. Requires the client to be created with a `text_search_config`.
+
+        Parameters
+        ----------
+        query_text
+            The text query, in `websearch_to_tsquery` syntax (e.g. 'quick brown -fox' or '"exact phrase"').
+        query_embedding
+            The query embedding vector.
+        limit
+            The number of records to retrieve.
+        filter
+            A filter for metadata, applied to both searches. See `search`.
+        predicates
+            A Predicates object to filter the results, applied to both searches. See `search`.
+        uuid_time_filter
+            A UUIDTimeRange object to filter the results by time using the id column.
+        query_params
+            Index parameters for the similarity search (optional).
+        fusion
+            Either 'rrf' to fuse the rankings with reciprocal rank fusion, or 'weighted' to add up the normalized
+            similarity and text scores weighted by `vector_weight`.
+        rrf_k
+            The constant added to the ranks with 'rrf' fusion. Larger values flatten the difference between ranks.
+        vector_weight
+            The weight of the similarity score with 'weighted' fusion, the text score gets 1 - `vector_weight`.
+        num_candidates
+            The number of records taken from each search before fusing them. Defaults to 4 * `limit`.
+        include
+            The result columns to fetch, some of `SEARCH_RESULT_COLUMNS`. See `search`.
+
+        Returns
+        -------
+            List: List of records with an additional `score` column, best first. The distance is None for records
+            only found by the text search.
+        """
+        (query, params) = self.builder.hybrid_search_query(
+            query_text,
+            query_embedding,
+            limit,
+            filter,
+            predicates,
+            uuid_time_filter,
+            fusion,
+            rrf_k,
+            vector_weight,
+            num_candidates,
+            include,
+        )
+        async with await self.connect() as pool:
+            self._count_statement(pool, query)
+            if query_params is None:
+                return await pool.fetch(query, *params)
+            async with pool.transaction():
+                for statement in query_params.get_statements():
+                    await pool.execute(statement)
+                return await pool.fetch(query, *params)
+
+    async def mmr_search(
+        self,
+        query_embedding: list[float],
+        limit: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: dict[str, str] | list[dict[str, str]] | None = None,
+        predicates: Predicates | None = None,
+        uuid_time_filter: UUIDTimeRange | None = None,
+        query_params: QueryParams | None = None,
+    ) -> list:
+        """
+        Retrieves records that are both similar to the query and diverse, by maximal marginal relevance (MMR). The
+        `fetch_k` nearest records are fetched in one query and `limit` of them are selected on the client with
+        vectorized NumPy operations over their embeddings, using cosine similarity.
+
+        Parameters
+        ----------
+        query_embedding
+            The query embedding vector.
+        limit
+            The number of records to return.
+        fetch_k
+            The number of nearest records to select from.
+        lambda_mult
+            Between 0 and 1, the trade-off between similarity to the query (1) and diversity (0).
+        filter
+            A filter for metadata. See `search`.
+        predicates
+            A Predicates object to filter the results. See `search`.
+        uuid_time_filter
+            A UUIDTimeRange object to filter the results by time using the id column.
+        query_params
+            Index parameters for the query (optional).
+
+        Returns
+        -------
+            List: The selected records, in the order they were selected.
+        """
+        if not 0.0 <= lambda_mult <= 1.0:
+            raise ValueError("lambda_mult must be between 0 and 1")
+        candidates = await self.search(
+            query_embedding,
+            max(fetch_k, limit),
+            filter,
+            predicates,
+            uuid_time_filter,
+            query_params,
+        )
+        if len(candidates) == 0:
+            return []
+        embeddings = np.stack([record[SEARCH_RESULT_EMBEDDING_IDX] for record in candidates])
+        query = _dense_embedding(query_embedding, self.builder.embedding_type, self.builder.num_dimensions)
+        return [candidates[idx] for idx in _mmr_select(query, embeddings, limit, lambda_mult)]
+
+    async def iter_search(
+        self,
+        query_embedding: list[float] | None = None,
+        limit: int | None = None,
+        filter: dict[str, str] | list[dict[str, str]] | None = None,
+        predicates: Predicates | None = None,
+        uuid_time_filter: UUIDTimeRange | None = None,
+        query_params: QueryParams | None = None,
+        include: Iterable[str] | None = None,
+        fetch_size: int = 1000,
+        max_distance: float | None = None,
+        exact: bool = False,
+    ) -> AsyncIterator[asyncpg.Record]:
+        """
+        Iterates over the records of a similarity query (or a metadata-only scan if `query_embedding` is None)
+        through a server-side cursor. Only `fetch_size` records are held in memory at a time and the first records
+        are available as soon as the database produces them. A pool connection and a transaction are held open until
+        the iteration finishes.
+
+        Parameters
+        ----------
+        query_embedding
+            The query embedding vector, or None to iterate over the records matching the filters.
+        limit
+            The maximum number of records to return, or None for all of them.
+        filter
+            A filter for metadata. See `search`.
+        predicates
+            A Predicates object to filter the results. See `search`.
+        uuid_time_filter
+            A UUIDTimeRange object to filter the results by time using the id column.
+        query_params
+            Index parameters for the query (optional).
+        include
+            The result columns to fetch, some of `SEARCH_RESULT_COLUMNS`. See `search`.
+        fetch_size
+            The number of records fetched from the cursor per round trip.
+        max_distance
+            Only returns the records within this distance of the query embedding. With `limit` None this streams
+            every record within the distance.
+        exact
+            Whether to sort the records exactly instead of scanning the embedding index. This is a full scan that
+            reads and sorts every record matching the filters, though other indexes still serve the filters.
+
+        An index scan stops after its candidate window, so a similarity query without a `limit` over an HNSW or
+        IVFFlat index turns on its iterative scan (pgvector 0.8 or later) unless `query_params` set it:
+        `strict_order` for HNSW, and `relaxed_order` for IVFFlat, whose records are then only approximately ordered.
+        The stream is bounded by how far the iterative scan goes (e.g. `hnsw.max_scan_tuples`); use `exact` to
+        stream every matching record. With older pgvector versions such a query raises a ValueError unless it is
+        `exact`.
+
+        Returns
+        -------
+            AsyncIterator: The records, in the same order as `search` would return them.
+        """
+        if fetch_size < 1:
+            raise ValueError("fetch_size must be at least 1")
+        (query, params) = self.builder.search_query(
+            query_embedding,
+            limit,
+            filter,
+            predicates,
+            uuid_time_filter,
+            include,
+            max_distance=max_distance,
+            exact=exact,
+        )
+        if query_embedding is not None and limit is None and not exact:
+            query_params = _unbounded_stream_params(
+                query_params, await self._get_embedding_index_type(), await self._get_pgvector_version()
+            )
+        async with await self.connect() as pool, pool.transaction():
+            if query_params is not None:
+                for statement in query_params.get_statements():
+                    await pool.execute(statement)
+            async for record in pool.cursor(query, *params, prefetch=fetch_size):
+                yield record
+
+    async def search_many(
+        self,
+        query_embeddings: np.ndarray | list,
+        limit: int = 10,
+        filter: dict[str, str] | list[dict[str, str]] | None = None,
+        predicates: Predicates | None = None,
+        uuid_time_filter: UUIDTimeRange | None = None,
+        query_params: QueryParams | None = None,
+        include: Iterable[str] | None = None,
+        as_arrays: bool = False,
+    ) -> list[list[asyncpg.Record]] | list[SearchResultBatch]:
+        """
+        Retrieves similar records for several query embeddings with a single statement and round trip.
+
+        Parameters
+        ----------
+        query_embeddings
+            The query embeddings, as a 2-dimensional array with one row per query or a list of embeddings.
+        limit
+            The number of nearest neighbors to retrieve per query embedding.
+        filter
+            A filter for metadata, applied to every query. See `search`.
+        predicates
+            A Predicates object to filter the results, applied to every query. See `search`.
+        uuid_time_filter
+            A UUIDTimeRange object to filter the results by time using the id column.
+        query_params
+            Index parameters for the query (optional).
+        include
+            The result columns to fetch, some of `SEARCH_RESULT_COLUMNS`. The other columns are returned as NULL.
+            Leaving out the embedding avoids reading and sending it. Defaults to all columns.
+        as_arrays
+            Whether to return the results as a `SearchResultBatch` of arrays instead of records.
+
+        Returns
+        -------
+            List: One list of similar records per query embedding, in the order of `query_embeddings`. The records
+            have an additional `query_idx` column. With `as_arrays`, one SearchResultBatch per query embedding.
+        """
+        if len(query_embeddings) == 0:
+            return []
+        embeddings = _encode_embeddings(query_embeddings, self.builder.embedding_type, self.builder.num_dimensions)
+        (query, params) = self.builder.search_many_query(
+            embeddings, limit, filter, predicates, uuid_time_filter, include, metadata_as_text=as_arrays
+        )
+        async with await self.connect() as pool, pool.transaction():
+            self._count_statement(pool, query)
+            if query_params is not None:
+                for statement in query_params.get_statements():
+                    await pool.execute(statement)
+            rows = await pool.fetch(query, *params)
+
+        results: list[list[asyncpg.Record]] = [[] for _ in range(len(embeddings))]
+        for row in rows:
+            results[row["query_idx"]].append(row)
+        if as_arrays:
+            return [
+                SearchResultBatch.from_records(
+                    result, self.builder.num_dimensions, self.builder.embedding_type, include
+                )
+                for result in results
+            ]
+        return results
+
+
+import re
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+import numpy as np
+import psycopg2.extensions
+import psycopg2.extras
+import psycopg2.pool
+
+
+def _cast_vector(value: str | None, _cursor) -> np.ndarray | None:
+    """
+    Parses the text representation of a vector into a float32 numpy array.
+    """
+    if value is None:
+        return None
+    return np.fromstring(value[1:-1], sep=",", dtype=np.float32)
+
+
+def _cast_halfvec(value: str | None, _cursor) -> np.ndarray | None:
+    """
+    Parses the text representation of a halfvec into a float16 numpy array.
+    """
+    if value is None:
+        return None
+    return np.fromstring(value[1:-1], sep=",", dtype=np.float32).astype(np.float16)
+
+
+def _cast_sparsevec(value: str | None, _cursor) -> np.ndarray | None:
+    """
+    Parses the text representation of a sparsevec, e.g. '{1:0.5,3:2}/4', into a dense float32 numpy array.
+    """
+    if value is None:
+        return None
+    elements, dimensions = value.rsplit("/", 1)
+    dense = np.zeros(int(dimensions), dtype=np.float32)
+    if elements != "{}":
+        entries = np.fromstring(elements[1:-1].replace(":", ","), sep=",", dtype=np.float64).reshape(-1, 2)
+        dense[entries[:, 0].astype(np.int64) - 1] = entries[:, 1]
+    return dense
+
+
+def _cast_bit(value: str | None, _cursor) -> np.ndarray | None:
+    """
+    Parses the text representation of a bit string into a boolean numpy array.
+    """
+    if value is None:
+        return None
+    return _bit_array(value)
+
+
+_EMBEDDING_CASTS = {
+    "vector": _cast_vector,
+    "halfvec": _cast_halfvec,
+    "sparsevec": _cast_sparsevec,
+    "bit": _cast_bit,
+}
 
-        Returns
-        -------
-            List: List of similar records.
+
+def _sparsevec_literal(value: dict[int, float] | list[float] | np.ndarray, num_dimensions: int) -> str:
+    """
+    Formats a sparse vector as its text representation. pgvector's indices are 1-based.
+    """
+    indices, values = _sparse_entries(value, num_dimensions)
+    elements = ",".join(f"{index + 1}:{value}" for index, value in zip(indices.tolist(), values.tolist(), strict=True))
+    return "{" + elements + "}/" + str(num_dimensions)
+
+
+def _bit_literal(value: str | list[bool] | np.ndarray) -> str:
+    """
+    Formats a bit vector as its text representation, e.g. '1010'.
+    """
+    return (_bit_array(value).astype(np.uint8) + ord("0")).tobytes().decode()
+
+
+class _VectorAdapter:
+    def __init__(self, value: np.ndarray) -> None:
         """
-        (query, params) = self.builder.search_query(query_embedding, limit, filter, predicates, uuid_time_filter)
-        if query_params is not None:
-            async with await self.connect() as pool:
-                async with pool.transaction():
-                    # Looks like there is no way to pipeline this: https://github.com/MagicStack/asyncpg/issues/588
-                    statements = query_params.get_statements()
-                    for statement in statements:
-                        await pool.execute(statement)
-                    return await pool.fetch(query, *params)
-        else:
-            async with await self.connect() as pool:
-                return await pool.fetch(query, *params)
+        Adapts numpy arrays to the text representation of a vector.
+        """
+        self.value = value
 
+    def getquoted(self) -> bytes:
+        return ("'[" + ",".join(map(str, self.value.astype(np.float32).tolist())) + "]'").encode()
 
-import re
-from contextlib import contextmanager
 
-import numpy as np
-import pgvector.psycopg2
-import psycopg2.extras
-import psycopg2.pool
+_COPY_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_text_value(value) -> str:
+    """
+    Formats a value as a field of a text-format COPY row.
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, list | tuple | np.ndarray):
+        return "[" + ",".join(str(float(v)) for v in value) + "]"
+    return str(value).translate(_COPY_TEXT_ESCAPES)
+
+
+def _copy_text_rows(rows: Iterable[tuple]) -> io.StringIO:
+    """
+    Formats rows as a text-format COPY stream.
+    """
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_text_value(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
 
 
 class Sync:
@@ -1184,6 +3682,10 @@ class Sync:
         max_db_connections: int | None = None,
         infer_filters: bool = True,
         schema_name: str | None = None,
+        embedding_type: str = "vector",
+        search_cache: SearchCache | None = None,
+        text_search_config: str | None = None,
+        indexed_metadata_fields: dict[str, str] | None = None,
     ) -> None:
         """
         Initializes a sync client for storing vector data.
@@ -1206,6 +3708,21 @@ class Sync:
             Whether to infer start and end times from the special __start_date and __end_date filters.
         schema_name
             The schema name for the table (optional, uses the database's default schema if not specified).
+        embedding_type
+            The type of the embedding column. Can be 'vector', 'halfvec' (half precision), 'sparsevec' or 'bit'.
+            Bit embeddings require the 'hamming' or 'jaccard' distance type.
+        search_cache
+            A SearchCache to keep the results of `search` in (optional). It is cleared by the writes of this client,
+            writes made by other clients or directly in the database are only picked up once the entries expire.
+        text_search_config
+            The text search configuration (e.g. 'english') of a generated tsvector column over the contents, which
+            `create_tables` adds along with a GIN index. Required by `hybrid_search`. Disabled if None.
+        indexed_metadata_fields
+            The metadata fields that `create_tables` promotes to generated columns with btree indexes, mapped to their
+            type: 'int', 'numeric', 'timestamptz' or 'text'. Predicates comparing a field to values of the matching
+            type use the index. '__uuid_timestamp' indexes the timestamp of the ids for UUIDTimeRange filters on
+            tables that are not partitioned by time. Every upserted value of a field must be castable to its type;
+            timestamptz values must be ISO 8601 timestamps, which are read as UTC if they have no offset.
         """
         self.builder = QueryBuilder(
             table_name,
@@ -1215,12 +3732,22 @@ class Sync:
             time_partition_interval,
             infer_filters,
             schema_name,
+            embedding_type,
+            text_search_config,
+            indexed_metadata_fields,
         )
         self.service_url = service_url
         self.pool = None
+        self._pool_lock = threading.Lock()
+        self._pool_slots: threading.BoundedSemaphore | None = None
+        self._vector_types = None
         self.max_db_connections = max_db_connections
         self.time_partition_interval = time_partition_interval
+        self.search_cache = search_cache
+        self._embedding_index_type: str | None = None
+        self._pgvector_version: str | None = None
         psycopg2.extras.register_uuid()
+        psycopg2.extensions.register_adapter(np.ndarray, _VectorAdapter)
 
     def default_max_db_connections(self):
         """
@@ -1238,30 +3765,70 @@ class Sync:
         conn.close()
         return num_connections[0]
 
-    @contextmanager
-    def connect(self):
+    def _invalidate_search_cache(self) -> None:
+        if self.search_cache is not None:
+            self.search_cache.clear()
+
+    def _create_pool(self):
         """
-        Establishes a connection to a PostgreSQL database using psycopg2 and allows it's
-        use in a context manager.
+        Creates the connection pool if it doesn't exist yet. The pool is thread-safe so that the client can be
+        shared between threads. psycopg2's pool raises an error instead of waiting when all its connections are in
+        use, so a semaphore with a slot per connection makes `connect` wait for a free one.
         """
-        if self.pool == None:
-            if self.max_db_connections == None:
+        if self.pool is not None:
+            return
+        with self._pool_lock:
+            if self.pool is not None:
+                return
+            if self.max_db_connections is None:
                 self.max_db_connections = self.default_max_db_connections()
 
-            self.pool = psycopg2.pool.SimpleConnectionPool(
+            self._pool_slots = threading.BoundedSemaphore(self.max_db_connections)
+            self.pool = psycopg2.pool.ThreadedConnectionPool(
                 1,
                 self.max_db_connections,
                 dsn=self.service_url,
                 cursor_factory=psycopg2.extras.DictCursor,
             )
 
-        connection = self.pool.getconn()
-        pgvector.psycopg2.register_vector(connection)
+    def _register_vector(self, connection):
+        """
+        Registers the type casters of the vector type and of the embedding type on a connection. The type oids
+        are only looked up the first time.
+        """
+        if self._vector_types is None:
+            vector_types = []
+            for type_name in dict.fromkeys(["vector", self.builder.embedding_type]):
+                with connection.cursor() as cur:
+                    cur.execute("SELECT to_regtype(%s)::oid, to_regtype(%s)::oid", (type_name, "_" + type_name))
+                    (oid, array_oid) = cur.fetchone()
+                if oid is None:
+                    raise psycopg2.ProgrammingError(f"{type_name} type not found in the database")
+                caster = psycopg2.extensions.new_type((oid,), type_name.upper(), _EMBEDDING_CASTS[type_name])
+                array_caster = psycopg2.extensions.new_array_type((array_oid,), type_name.upper() + "ARRAY", caster)
+                vector_types += [caster, array_caster]
+            self._vector_types = vector_types
+        for caster in self._vector_types:
+            psycopg2.extensions.register_type(caster, connection)
+
+    @contextmanager
+    def connect(self):
+        """
+        Establishes a connection to a PostgreSQL database using psycopg2 and allows it's
+        use in a context manager. Waits for a pool connection to be returned if all of them are in use.
+        """
+        self._create_pool()
+        self._pool_slots.acquire()
         try:
-            yield connection
-            connection.commit()
+            connection = self.pool.getconn()
+            try:
+                self._register_vector(connection)
+                yield connection
+                connection.commit()
+            finally:
+                self.pool.putconn(connection)
         finally:
-            self.pool.putconn(connection)
+            self._pool_slots.release()
 
     def close(self):
         if self.pool != None:
@@ -1288,16 +3855,18 @@ class Sync:
         if query_string in self.translated_queries:
             return self.translated_queries[query_string], translated_params
 
-        dollar_params = re.findall(r"\$[0-9]+", query_string)
-        translated_string = query_string
-        for dollar_param in dollar_params:
+        def pyformat_param(match: re.Match) -> str:
+            # escape literal percent signs, e.g. of the <%> jaccard operator
+            if match.group(0) == "%":
+                return "%%"
             # Extract the number after the $
-            param_number = int(dollar_param[1:])
+            param_number = int(match.group(1))
             if params != None:
-                pyformat_param = "%s" if param_number == 0 else f"%({param_number})s"
-            else:
-                pyformat_param = "%s"
-            translated_string = translated_string.replace(dollar_param, pyformat_param)
+                return "%s" if param_number == 0 else f"%({param_number})s"
+            return "%s"
+
+        # substituted in one pass so that $1 does not clobber the prefix of $10
+        translated_string = re.sub(r"\$([0-9]+)|%", pyformat_param, query_string)
 
         self.translated_queries[query_string] = translated_string
         return self.translated_queries[query_string], translated_params
@@ -1321,15 +3890,30 @@ class Sync:
         metadata_is_dict = isinstance(records[0][1], dict)
         if metadata_is_dict:
             records = map(lambda item: Sync._convert_record_meta_to_json(item), records)
+        if self.builder.embedding_type in ("sparsevec", "bit"):
+            records = map(lambda item: (item[0], item[1], item[2], self._embedding_literal(item[3])), records)
 
         return records
 
+    def _embedding_literal(self, embedding):
+        """
+        Converts a sparsevec or bit embedding to its text representation. Other embeddings are sent as numpy
+        arrays or lists.
+        """
+        if embedding is None or isinstance(embedding, str):
+            return embedding
+        if self.builder.embedding_type == "sparsevec":
+            return _sparsevec_literal(embedding, self.builder.num_dimensions)
+        if self.builder.embedding_type == "bit":
+            return _bit_literal(embedding)
+        return embedding
+
     def _convert_record_meta_to_json(item):
         if not isinstance(item[1], dict):
             raise ValueError("Cannot mix dictionary and string metadata fields in the same upsert")
         return (item[0], json.dumps(item[1]), item[2], item[3])
 
-    def upsert(self, records):
+    def upsert(self, records, on_conflict: str = "nothing"):
         """
         Performs upsert operation for multiple records.
 
@@ -1337,17 +3921,195 @@ class Sync:
         ----------
         records
             Records to upsert.
+        on_conflict
+            Either 'nothing' to keep existing rows with the same id, or 'update' to overwrite them if their
+            metadata, contents or embedding changed.
 
         Returns
         -------
             None
         """
         records = self.munge_record(records)
-        query = self.builder.get_upsert_query()
+        query = self.builder.get_upsert_query(on_conflict)
         query, _ = self._translate_to_pyformat(query, None)
         with self.connect() as conn:
             with conn.cursor() as cur:
                 cur.executemany(query, records)
+        self._invalidate_search_cache()
+
+    def bulk_upsert(
+        self, records, method: str = "values", page_size: int = 1000, on_conflict: str = "nothing"
+    ) -> UpsertResult:
+        """
+        Performs upsert operation for multiple records using multi-row statements instead of one round trip
+        per record.
+
+        Parameters
+        ----------
+        records
+            Records to upsert.
+        method
+            Either 'values' to send pages of records as multi-row INSERT statements, or 'copy' to stream the records
+            into a temporary staging table with COPY and merge them into the table with a single statement.
+        page_size
+            The number of records sent per statement (or per COPY chunk).
+        on_conflict
+            Either 'nothing' to keep existing rows with the same id, or 'update' to overwrite them if their
+            metadata, contents or embedding changed.
+
+        Returns
+        -------
+            UpsertResult: The number of rows inserted, updated and skipped.
+        """
+        if method != "values" and method != "copy":
+            raise ValueError(f"unrecognized method {method}")
+        if len(records) == 0:
+            return UpsertResult()
+        records = self.munge_record(records)
+        num_staged = 0
+        num_inserted = 0
+        num_updated = 0
+        with self.connect() as conn, conn.cursor() as cur:
+            if method == "values":
+                query, _ = self._translate_to_pyformat(self.builder.get_upsert_values_query(on_conflict), None)
+                for page in _batched(records, page_size):
+                    num_staged += len(page)
+                    if on_conflict == "update":
+                        # a statement cannot update the same row twice, the last record for an id wins
+                        page = list({record[0]: record for record in page}.values())
+                    rows = psycopg2.extras.execute_values(cur, query, page, page_size=len(page), fetch=True)
+                    num_page_inserted = sum(1 for (inserted,) in rows if inserted)
+                    num_inserted += num_page_inserted
+                    num_updated += len(rows) - num_page_inserted
+            else:
+                merge_query = self.builder.get_merge_staging_query(on_conflict)
+                cur.execute(self.builder.get_create_staging_table_query())
+                copy_query = self.builder.get_copy_staging_query(["id", "metadata", "contents", "embedding"])
+                for page in _batched(records, page_size):
+                    cur.copy_expert(copy_query, _copy_text_rows(page))
+                    num_staged += len(page)
+                cur.execute(merge_query)
+                (num_inserted, num_updated) = cur.fetchone()
+        self._invalidate_search_cache()
+        return UpsertResult(inserted=num_inserted, updated=num_updated, skipped=num_staged - num_inserted - num_updated)
+
+    def upsert_columns(
+        self,
+        ids: list[uuid.UUID] | list[str],
+        metadata: list[dict[str, Any] | str | None],
+        contents: list[str | None],
+        embeddings: np.ndarray,
+        on_conflict: str = "nothing",
+    ) -> UpsertResult:
+        """
+        Upserts records given as columns. The embedding matrix is written to the database with binary COPY
+        without splitting it into per-record Python objects, which makes this the cheapest way to ingest
+        embeddings that are already in a numpy array.
+
+        Parameters
+        ----------
+        ids
+            The ids of the records.
+        metadata
+            The metadata of the records, as dictionaries or JSON strings.
+        contents
+            The contents of the records.
+        embeddings
+            A 2-dimensional array with one row per record and `num_dimensions` columns.
+        on_conflict
+            Either 'nothing' to keep existing rows with the same id, or 'update' to overwrite them if their
+            metadata, contents or embedding changed.
+
+        Returns
+        -------
+            UpsertResult: The number of rows inserted, updated and skipped.
+        """
+        data = _copy_binary_columns(
+            ids,
+            metadata,
+            contents,
+            embeddings,
+            self.builder.id_type,
+            self.builder.num_dimensions,
+            self.builder.embedding_type,
+        )
+        if len(ids) == 0:
+            return UpsertResult()
+        merge_query = self.builder.get_merge_staging_query(on_conflict)
+        with self.connect() as conn, conn.cursor() as cur:
+            cur.execute(self.builder.get_create_staging_table_query())
+            cur.copy_expert(
+                self.builder.get_copy_staging_query(["id", "metadata", "contents", "embedding"], binary=True),
+                io.BytesIO(data),
+            )
+            cur.execute(merge_query)
+            (num_inserted, num_updated) = cur.fetchone()
+        self._invalidate_search_cache()
+        return UpsertResult(inserted=num_inserted, updated=num_updated, skipped=len(ids) - num_inserted - num_updated)
+
+    def upsert_stream(
+        self,
+        records: Iterable,
+        batch_size: int = 1000,
+        max_in_flight: int = 4,
+        method: str = "values",
+        on_progress: Callable[[UpsertResult], None] | None = None,
+        on_conflict: str = "nothing",
+    ) -> UpsertResult:
+        """
+        Upserts records from an iterable without materializing it. The records are sliced into batches that are
+        written with `bulk_upsert` by worker threads, each on its own pool connection. At most `max_in_flight`
+        batches are written concurrently; reading from `records` pauses until one of them finishes. Workers and
+        other callers of the client wait for a free pool connection rather than failing when all are in use.
+
+        Parameters
+        ----------
+        records
+            Iterable of records. Each record is a tuple of the form (id, metadata, contents, embedding).
+        batch_size
+            The number of records per batch.
+        max_in_flight
+            The maximum number of batches being written at the same time. Capped at `max_db_connections`.
+        method
+            The `bulk_upsert` method used to write each batch.
+        on_progress
+            Called with the running totals after each batch is written.
+        on_conflict
+            The `bulk_upsert` conflict handling used to write each batch.
+
+        Returns
+        -------
+            UpsertResult: The total number of rows inserted, updated and skipped.
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self._create_pool()
+        max_in_flight = min(max_in_flight, self.max_db_connections)
+
+        result = UpsertResult()
+        in_flight = set()
+
+        def wait_for(return_when: str) -> None:
+            nonlocal result
+            done, _ = wait(in_flight, return_when=return_when)
+            in_flight.difference_update(done)
+            for future in done:
+                result = result + future.result()
+                if on_progress is not None:
+                    on_progress(result)
+
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            try:
+                for batch in _batched(records, batch_size):
+                    if len(in_flight) >= max_in_flight:
+                        wait_for(FIRST_COMPLETED)
+                    in_flight.add(executor.submit(self.bulk_upsert, batch, method, batch_size, on_conflict))
+                if len(in_flight) > 0:
+                    wait_for(ALL_COMPLETED)
+            finally:
+                for future in in_flight:
+                    future.cancel()
+        return result
 
     def create_tables(self):
         """
@@ -1379,6 +4141,7 @@ class Sync:
         with self.connect() as conn:
             with conn.cursor() as cur:
                 cur.execute(query)
+        self._invalidate_search_cache()
 
     def delete_by_ids(self, ids: list[uuid.UUID] | list[str]):
         """
@@ -1394,6 +4157,44 @@ class Sync:
         with self.connect() as conn:
             with conn.cursor() as cur:
                 cur.execute(query, params)
+        self._invalidate_search_cache()
+
+    def bulk_delete_by_ids(self, ids: list[uuid.UUID] | list[str], method: str = "values", page_size: int = 1000):
+        """
+        Delete records by id for very large lists of ids.
+
+        Parameters
+        ----------
+        ids
+            List of ids to delete.
+        method
+            Either 'values' to send pages of ids as multi-row VALUES lists, or 'copy' to stream the ids into a
+            temporary staging table with COPY and delete the matching rows with a single statement.
+        page_size
+            The number of ids sent per statement (or per COPY chunk).
+
+        Returns
+        -------
+            int: The number of rows deleted.
+        """
+        if method != "values" and method != "copy":
+            raise ValueError(f"unrecognized method {method}")
+        num_deleted = 0
+        with self.connect() as conn, conn.cursor() as cur:
+            if method == "values":
+                query, _ = self._translate_to_pyformat(self.builder.delete_by_ids_values_query(), None)
+                for page in _batched(ids, page_size):
+                    psycopg2.extras.execute_values(cur, query, [(id,) for id in page], page_size=len(page))
+                    num_deleted += cur.rowcount
+            else:
+                cur.execute(self.builder.get_create_id_staging_table_query())
+                copy_query = self.builder.get_copy_staging_query(["id"])
+                for page in _batched(ids, page_size):
+                    cur.copy_expert(copy_query, _copy_text_rows((id,) for id in page))
+                cur.execute(self.builder.delete_by_ids_staging_query())
+                num_deleted = cur.rowcount
+        self._invalidate_search_cache()
+        return num_deleted
 
     def delete_by_metadata(self, filter: dict[str, str] | list[dict[str, str]]):
         """
@@ -1404,6 +4205,7 @@ class Sync:
         with self.connect() as conn:
             with conn.cursor() as cur:
                 cur.execute(query, params)
+        self._invalidate_search_cache()
 
     def drop_table(self):
         """
@@ -1417,6 +4219,8 @@ class Sync:
         with self.connect() as conn:
             with conn.cursor() as cur:
                 cur.execute(query)
+        self._invalidate_search_cache()
+        self._embedding_index_type = None
 
     def _get_approx_count(self):
         """
@@ -1445,6 +4249,7 @@ class Sync:
         with self.connect() as conn:
             with conn.cursor() as cur:
                 cur.execute(query)
+        self._embedding_index_type = None
 
     def create_embedding_index(self, index: BaseIndex):
         """
@@ -1463,6 +4268,31 @@ class Sync:
         with self.connect() as conn:
             with conn.cursor() as cur:
                 cur.execute(query)
+        self._embedding_index_type = None
+
+    def _get_embedding_index_type(self) -> str:
+        """
+        Gets the access method of the embedding index ('hnsw', 'ivfflat' or 'diskann'), or '' if there is none. It is
+        looked up once and kept until this client creates or drops the index or the table.
+        """
+        if self._embedding_index_type is None:
+            (query, params) = self.builder.get_embedding_index_type_query()
+            query, params = self._translate_to_pyformat(query, params)
+            with self.connect() as conn, conn.cursor() as cur:
+                cur.execute(query, params)
+                self._embedding_index_type = cur.fetchone()[0] or ""
+        return self._embedding_index_type
+
+    def _get_pgvector_version(self) -> str:
+        """
+        Gets the installed version of the pgvector extension, looked up once.
+        """
+        if self._pgvector_version is None:
+            with self.connect() as conn, conn.cursor() as cur:
+                cur.execute(self.builder.get_pgvector_version_query())
+                row = cur.fetchone()
+                self._pgvector_version = "" if row is None else row[0]
+        return self._pgvector_version
 
     def search(
         self,
@@ -1472,6 +4302,17 @@ class Sync:
         predicates: Predicates | None = None,
         uuid_time_filter: UUIDTimeRange | None = None,
         query_params: QueryParams | None = None,
+        include: Iterable[str] | None = None,
+        as_arrays: bool = False,
+        rerank_factor: int | None = None,
+        max_expansions: int = 0,
+        search_after: str | None = None,
+        max_distance: float | None = None,
+        group_by: str | None = None,
+        per_group: int = 1,
+        groups: int | None = None,
+        recency_weight: float | None = None,
+        half_life: timedelta | None = None,
     ):
         """
         Retrieves similar records using a similarity query.
@@ -1486,19 +4327,179 @@ class Sync:
             A filter for metadata. Should be specified as a key-value object or a list of key-value objects (where any objects in the list are matched).
         predicates
             A Predicates object to filter the results. Predicates support more complex queries than the filter parameter. Predicates can be combined using logical operators (&, |, and ~).
+        include
+            The result columns to fetch, some of `SEARCH_RESULT_COLUMNS`. The other columns are returned as NULL.
+            Leaving out the embedding avoids reading and sending it. Defaults to all columns.
+        as_arrays
+            Whether to return the results as a `SearchResultBatch` of arrays instead of records.
+        rerank_factor
+            Takes `limit * rerank_factor` candidates from the index and returns the `limit` nearest of them by exact
+            distance. See `Async.search`.
+        max_expansions
+            The number of times a filtered search returning fewer than `limit` records is retried with larger index
+            candidate windows. See `Async.search`.
+        search_after
+            The `next_page_token` of the previous page of results, to get the next `limit` results after it. The
+            index scan still walks the records of the earlier pages, and pages beyond the candidate window of the
+            index come back short without iterative index scans. See `Async.search`.
+        max_distance
+            Only returns the records within this distance of the query embedding (at most `limit` of them).
+        group_by
+            A metadata field to group the `limit` nearest records by. See `Async.search`.
+        per_group
+            The number of records returned per group.
+        groups
+            The number of groups returned, or None for all the groups among the `limit` nearest records.
+        recency_weight
+            Favors recent records by ordering the candidates by distance minus `recency_weight` times an exponential
+            decay of their age. See `Async.search`.
+        half_life
+            The age at which the recency bonus is halved.
 
         Returns
         --------
-            List: List of similar records.
+            SearchResults: List of similar records, or a SearchResultBatch if `as_arrays` is set.
         """
-        if query_embedding is not None:
+        if query_embedding is None:
+            query_embedding_np = None
+        elif self.builder.embedding_type in ("sparsevec", "bit"):
+            query_embedding_np = self._embedding_literal(query_embedding)
+        else:
             query_embedding_np = np.array(query_embedding)
+
+        page_after = None if search_after is None else _decode_page_token(search_after)
+        (query, params) = self.builder.search_query(
+            query_embedding_np,
+            limit,
+            filter,
+            predicates,
+            uuid_time_filter,
+            include,
+            metadata_as_text=as_arrays,
+            rerank_factor=rerank_factor,
+            search_after=page_after,
+            max_distance=max_distance,
+            group_by=group_by,
+            per_group=per_group,
+            groups=groups,
+            recency_weight=recency_weight,
+            half_life=half_life,
+        )
+        if page_after is not None:
+            # the index scan has to get past the records of the earlier pages before the page starts
+            index_type = self._get_embedding_index_type()
+            query_params = (query_params or QueryParams({})).widened(page_after[2] + limit, index_type)
+        if self.search_cache is not None:
+            cache_key = self.search_cache.key(query, params, query_params, as_arrays, max_expansions)
+            cached = self.search_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            generation = self.search_cache.generation
+
+        query, params = self._translate_to_pyformat(query, params)
+        rows = self._fetch_search(query, params, query_params)
+        filters = (filter, predicates, uuid_time_filter, page_after)
+        filtered = any(value is not None for value in filters)
+        if query_embedding is not None and filtered and group_by is None:
+            index_type = self._get_embedding_index_type() if max_expansions > 0 and len(rows) < limit else ""
+            # the probes of ivfflat have no upper bound to stop at, its iterative scan is the way to find more rows
+            for _ in range(max_expansions if index_type in ("hnsw", "diskann") else 0):
+                if len(rows) >= limit:
+                    break
+                query_params = (query_params or QueryParams({})).expanded(4, index_type)
+                if query_params is None:
+                    break
+                expanded_rows = self._fetch_search(query, params, query_params)
+                # stop once a larger window finds no more rows, the filters likely match no more than that. Without
+                # any rows yet there is nothing to compare, so those retries only stop at the maximum window.
+                if len(rows) > 0 and len(expanded_rows) <= len(rows):
+                    break
+                rows = expanded_rows
+        page_after = None if query_embedding is None or group_by is not None else _page_after(rows, page_after)
+        if as_arrays:
+            result = SearchResultBatch.from_records(
+                rows, self.builder.num_dimensions, self.builder.embedding_type, include
+            )
+            result._page_after = page_after
         else:
+            result = SearchResults(rows, page_after)
+        if self.search_cache is not None:
+            self.search_cache.put(cache_key, result, generation)
+        return result
+
+    def explain_search(
+        self,
+        query_embedding: list[float] | None = None,
+        limit: int = 10,
+        filter: dict[str, str] | list[dict[str, str]] | None = None,
+        predicates: Predicates | None = None,
+        uuid_time_filter: UUIDTimeRange | None = None,
+        query_params: QueryParams | None = None,
+        include: Iterable[str] | None = None,
+        rerank_factor: int | None = None,
+        search_after: str | None = None,
+        max_distance: float | None = None,
+        group_by: str | None = None,
+        per_group: int = 1,
+        groups: int | None = None,
+        recency_weight: float | None = None,
+        half_life: timedelta | None = None,
+    ) -> SearchPlan:
+        """
+        Runs the query that `search` would send for these arguments under `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`,
+        with the same `query_params` settings, and summarizes the plan. This shows whether the embedding index was
+        used, how many hypertable chunks were scanned and how many rows the filters discarded. The query is executed.
+
+        Parameters
+        ----------
+        query_embedding, limit, filter, predicates, uuid_time_filter, query_params, include
+            As for `search`.
+        rerank_factor, search_after, max_distance, group_by, per_group, groups, recency_weight, half_life
+            As for `search`.
+
+        Returns
+        --------
+            SearchPlan: The summary, with the full JSON plan in its `plan` attribute.
+        """
+        if query_embedding is None:
             query_embedding_np = None
+        elif self.builder.embedding_type in ("sparsevec", "bit"):
+            query_embedding_np = self._embedding_literal(query_embedding)
+        else:
+            query_embedding_np = np.array(query_embedding)
 
-        (query, params) = self.builder.search_query(query_embedding_np, limit, filter, predicates, uuid_time_filter)
+        page_after = None if search_after is None else _decode_page_token(search_after)
+        (query, params) = self.builder.search_query(
+            query_embedding_np,
+            limit,
+            filter,
+            predicates,
+            uuid_time_filter,
+            include,
+            rerank_factor=rerank_factor,
+            search_after=page_after,
+            max_distance=max_distance,
+            group_by=group_by,
+            per_group=per_group,
+            groups=groups,
+            recency_weight=recency_weight,
+            half_life=half_life,
+        )
+        if page_after is not None:
+            index_type = self._get_embedding_index_type()
+            query_params = (query_params or QueryParams({})).widened(page_after[2] + limit, index_type)
+        query = f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"
         query, params = self._translate_to_pyformat(query, params)
 
+        if query_params is not None:
+            prefix = "; ".join(query_params.get_statements())
+            query = f"{prefix}; {query}"
+
+        with self.connect() as conn, conn.cursor() as cur:
+            cur.execute(query, params)
+            return SearchPlan.from_explain(cur.fetchone()[0])
+
+    def _fetch_search(self, query: str, params: dict, query_params: QueryParams | None) -> list:
         if query_params is not None:
             prefix = "; ".join(query_params.get_statements())
             query = f"{prefix}; {query}"
@@ -1507,3 +4508,300 @@ class Sync:
             with conn.cursor() as cur:
                 cur.execute(query, params)
                 return cur.fetchall()
+
+    def hybrid_search(
+        self,
+        query_text: str,
+        query_embedding: list[float],
+        limit: int = 10,
+        filter: dict[str, str] | list[dict[str, str]] | None = None,
+        predicates: Predicates | None = None,
+        uuid_time_filter: UUIDTimeRange | None = None,
+        query_params: QueryParams | None = None,
+        fusion: str = "rrf",
+        rrf_k: int = 60,
+        vector_weight: float = 0.5,
+        num_candidates: int | None = None,
+        include: Iterable[str] | None = None,
+    ):
+        """
+        Retrieves records by combining a similarity search with a full-text search on the contents, fusing both
+        rankings in a single statement. Requires the client to be created with a `text_search_config`.
+
+        Parameters
+        ----------
+        query_text
+            The text query, in `websearch_to_tsquery` syntax (e.g. 'quick brown -fox' or '"exact phrase"').
+        query_embedding
+            The query embedding vector.
+        limit
+            The number of records to retrieve.
+        filter
+            A filter for metadata, applied to both searches. See `search`.
+        predicates
+            A Predicates object to filter the results, applied to both searches. See `search`.
+        uuid_time_filter
+            A UUIDTimeRange object to filter the results by time using the id column.
+        query_params
+            Index parameters for the similarity search (optional).
+        fusion
+            Either 'rrf' to fuse the rankings with reciprocal rank fusion, or 'weighted' to add up the normalized
+            similarity and text scores weighted by `vector_weight`.
+        rrf_k
+            The constant added to the ranks with 'rrf' fusion. Larger values flatten the difference between ranks.
+        vector_weight
+            The weight of the similarity score with 'weighted' fusion, the text score gets 1 - `vector_weight`.
+        num_candidates
+            The number of records taken from each search before fusing them. Defaults to 4 * `limit`.
+        include
+            The result columns to fetch, some of `SEARCH_RESULT_COLUMNS`. See `search`.
+
+        Returns
+        --------
+            List: List of records with an additional `score` column, best first. The distance is None for records
+            only found by the text search.
+        """
+        if self.builder.embedding_type in ("sparsevec", "bit"):
+            query_embedding = self._embedding_literal(query_embedding)
+        else:
+            query_embedding = np.asarray(query_embedding)
+
+        (query, params) = self.builder.hybrid_search_query(
+            query_text,
+            query_embedding,
+            limit,
+            filter,
+            predicates,
+            uuid_time_filter,
+            fusion,
+            rrf_k,
+            vector_weight,
+            num_candidates,
+            include,
+        )
+        query, params = self._translate_to_pyformat(query, params)
+
+        if query_params is not None:
+            prefix = "; ".join(query_params.get_statements())
+            query = f"{prefix}; {query}"
+
+        with self.connect() as conn, conn.cursor() as cur:
+            cur.execute(query, params)
+            return cur.fetchall()
+
+    def mmr_search(
+        self,
+        query_embedding: list[float],
+        limit: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: dict[str, str] | list[dict[str, str]] | None = None,
+        predicates: Predicates | None = None,
+        uuid_time_filter: UUIDTimeRange | None = None,
+        query_params: QueryParams | None = None,
+    ) -> list:
+        """
+        Retrieves records that are both similar to the query and diverse, by maximal marginal relevance (MMR). The
+        `fetch_k` nearest records are fetched in one query and `limit` of them are selected on the client with
+        vectorized NumPy operations over their embeddings, using cosine similarity.
+
+        Parameters
+        ----------
+        query_embedding
+            The query embedding vector.
+        limit
+            The number of records to return.
+        fetch_k
+            The number of nearest records to select from.
+        lambda_mult
+            Between 0 and 1, the trade-off between similarity to the query (1) and diversity (0).
+        filter
+            A filter for metadata. See `search`.
+        predicates
+            A Predicates object to filter the results. See `search`.
+        uuid_time_filter
+            A UUIDTimeRange object to filter the results by time using the id column.
+        query_params
+            Index parameters for the query (optional).
+
+        Returns
+        --------
+            List: The selected records, in the order they were selected.
+        """
+        if not 0.0 <= lambda_mult <= 1.0:
+            raise ValueError("lambda_mult must be between 0 and 1")
+        candidates = self.search(
+            query_embedding,
+            max(fetch_k, limit),
+            filter,
+            predicates,
+            uuid_time_filter,
+            query_params,
+        )
+        if len(candidates) == 0:
+            return []
+        embeddings = np.stack([record[SEARCH_RESULT_EMBEDDING_IDX] for record in candidates])
+        query = _dense_embedding(query_embedding, self.builder.embedding_type, self.builder.num_dimensions)
+        return [candidates[idx] for idx in _mmr_select(query, embeddings, limit, lambda_mult)]
+
+    def iter_search(
+        self,
+        query_embedding: list[float] | None = None,
+        limit: int | None = None,
+        filter: dict[str, str] | list[dict[str, str]] | None = None,
+        predicates: Predicates | None = None,
+        uuid_time_filter: UUIDTimeRange | None = None,
+        query_params: QueryParams | None = None,
+        include: Iterable[str] | None = None,
+        fetch_size: int = 1000,
+        max_distance: float | None = None,
+        exact: bool = False,
+    ) -> Iterator:
+        """
+        Iterates over the records of a similarity query (or a metadata-only scan if `query_embedding` is None)
+        through a server-side (named) cursor. Only `fetch_size` records are held in memory at a time and the first
+        records are available as soon as the database produces them. A pool connection and a transaction are held
+        open until the iteration finishes.
+
+        Parameters
+        ----------
+        query_embedding
+            The query embedding vector, or None to iterate over the records matching the filters.
+        limit
+            The maximum number of records to return, or None for all of them.
+        filter
+            A filter for metadata. See `search`.
+        predicates
+            A Predicates object to filter the results. See `search`.
+        uuid_time_filter
+            A UUIDTimeRange object to filter the results by time using the id column.
+        query_params
+            Index parameters for the query (optional).
+        include
+            The result columns to fetch, some of `SEARCH_RESULT_COLUMNS`. See `search`.
+        fetch_size
+            The number of records fetched from the cursor per round trip.
+        max_distance
+            Only returns the records within this distance of the query embedding. With `limit` None this streams
+            every record within the distance.
+        exact
+            Whether to sort the records exactly instead of scanning the embedding index. This is a full scan that
+            reads and sorts every record matching the filters, though other indexes still serve the filters.
+
+        An index scan stops after its candidate window, so a similarity query without a `limit` over an HNSW or
+        IVFFlat index turns on its iterative scan (pgvector 0.8 or later) unless `query_params` set it:
+        `strict_order` for HNSW, and `relaxed_order` for IVFFlat, whose records are then only approximately ordered.
+        The stream is bounded by how far the iterative scan goes (e.g. `hnsw.max_scan_tuples`); use `exact` to
+        stream every matching record. With older pgvector versions such a query raises a ValueError unless it is
+        `exact`.
+
+        Returns
+        --------
+            Iterator: The records, in the same order as `search` would return them.
+        """
+        if fetch_size < 1:
+            raise ValueError("fetch_size must be at least 1")
+        if query_embedding is None:
+            query_embedding_np = None
+        elif self.builder.embedding_type in ("sparsevec", "bit"):
+            query_embedding_np = self._embedding_literal(query_embedding)
+        else:
+            query_embedding_np = np.array(query_embedding)
+
+        (query, params) = self.builder.search_query(
+            query_embedding_np,
+            limit,
+            filter,
+            predicates,
+            uuid_time_filter,
+            include,
+            max_distance=max_distance,
+            exact=exact,
+        )
+        query, params = self._translate_to_pyformat(query, params)
+        if query_embedding is not None and limit is None and not exact:
+            query_params = _unbounded_stream_params(
+                query_params, self._get_embedding_index_type(), self._get_pgvector_version()
+            )
+
+        with self.connect() as conn:
+            if query_params is not None:
+                # a named cursor can only run a single statement, so the settings are applied beforehand
+                with conn.cursor() as cur:
+                    for statement in query_params.get_statements():
+                        cur.execute(statement)
+            with conn.cursor(name=f"iter_search_{uuid.uuid4().hex}") as cur:
+                cur.itersize = fetch_size
+                cur.execute(query, params)
+                yield from cur
+
+    def search_many(
+        self,
+        query_embeddings: np.ndarray | list,
+        limit: int = 10,
+        filter: dict[str, str] | list[dict[str, str]] | None = None,
+        predicates: Predicates | None = None,
+        uuid_time_filter: UUIDTimeRange | None = None,
+        query_params: QueryParams | None = None,
+        include: Iterable[str] | None = None,
+        as_arrays: bool = False,
+    ):
+        """
+        Retrieves similar records for several query embeddings with a single statement and round trip.
+
+        Parameters
+        ----------
+        query_embeddings
+            The query embeddings, as a 2-dimensional array with one row per query or a list of embeddings.
+        limit
+            The number of nearest neighbors to retrieve per query embedding.
+        filter
+            A filter for metadata, applied to every query. See `search`.
+        predicates
+            A Predicates object to filter the results, applied to every query. See `search`.
+        uuid_time_filter
+            A UUIDTimeRange object to filter the results by time using the id column.
+        query_params
+            Index parameters for the query (optional).
+        include
+            The result columns to fetch, some of `SEARCH_RESULT_COLUMNS`. The other columns are returned as NULL.
+            Leaving out the embedding avoids reading and sending it. Defaults to all columns.
+        as_arrays
+            Whether to return the results as a `SearchResultBatch` of arrays instead of records.
+
+        Returns
+        --------
+            List: One list of similar records per query embedding, in the order of `query_embeddings`. The records
+            have an additional `query_idx` column. With `as_arrays`, one SearchResultBatch per query embedding.
+        """
+        if len(query_embeddings) == 0:
+            return []
+        if self.builder.embedding_type in ("sparsevec", "bit"):
+            embeddings = [self._embedding_literal(embedding) for embedding in query_embeddings]
+        else:
+            embeddings = [np.asarray(embedding) for embedding in query_embeddings]
+
+        (query, params) = self.builder.search_many_query(
+            embeddings, limit, filter, predicates, uuid_time_filter, include, metadata_as_text=as_arrays
+        )
+        query, params = self._translate_to_pyformat(query, params)
+
+        if query_params is not None:
+            prefix = "; ".join(query_params.get_statements())
+            query = f"{prefix}; {query}"
+
+        with self.connect() as conn, conn.cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+
+        results: list[list] = [[] for _ in range(len(embeddings))]
+        for row in rows:
+            results[row["query_idx"]].append(row)
+        if as_arrays:
+            return [
+                SearchResultBatch.from_records(
+                    result, self.builder.num_dimensions, self.builder.embedding_type, include
+                )
+                for result in results
+            ]
+        return results